@@ -0,0 +1,92 @@
+"""Compare the insert paths of SqlAlchemyPersistence on reddit_posts-like rows.
+
+Modes:
+    values       single INSERT ... VALUES statement (what set() does below the bulk threshold)
+    executemany  bulk_insert(method="executemany"), insertmanyvalues batches
+    copy         bulk_insert(method="copy"), COPY FROM STDIN, PostgreSQL + psycopg2 only
+
+Usage:
+    BENCH_DATABASE_URL=postgresql+psycopg2://... python -m benchmarks.bench_bulk_insert
+Without BENCH_DATABASE_URL a temporary SQLite database is used (no copy mode). On
+PostgreSQL the reddit_posts table must exist (alembic upgrade head); the benchmark
+rows are deleted afterwards.
+"""
+
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete
+
+from stock_ai.db.base import Base
+from stock_ai.db.models import RedditPost
+from stock_ai.db.session import _get_engine, get_session, reset_db
+from stock_ai.workflows.persistence.sql_alchemy_persistence import SqlAlchemyPersistence
+
+SIZES = [100, 1_000, 10_000]
+SELFTEXT = "Not financial advice. " * 150  # ~3KB, a typical DD post body
+
+
+def make_rows(run_id: str, n: int) -> list[dict]:
+    now = datetime.utcnow()
+    return [
+        {
+            "run_id": run_id,
+            "reddit_id": f"bench{i}",
+            "flair": ("News", "DD", "YOLO")[i % 3],
+            "title": f"Benchmark post {i}, with \"quotes\" and commas",
+            "selftext": SELFTEXT,
+            "score": i,
+            "num_comments": i // 2,
+            "upvote_ratio": 0.9,
+            "created": now - timedelta(minutes=i),
+            "url": f"https://www.reddit.com/r/wallstreetbets/comments/bench{i}",
+        }
+        for i in range(n)
+    ]
+
+
+def main():
+    url = os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        url = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    os.environ["DB_TARGET"] = "LOCAL"
+    os.environ["DATABASE_URL_LOCAL"] = url
+    reset_db()
+    engine = _get_engine()
+    if engine.dialect.name == "sqlite":
+        Base.metadata.create_all(engine, tables=[RedditPost.__table__])
+
+    persistence = SqlAlchemyPersistence({"reddit_posts": RedditPost})
+    modes = {
+        "values": lambda rows: persistence._insert_values(RedditPost, rows),
+        "executemany": lambda rows: persistence.bulk_insert("reddit_posts", rows, method="executemany"),
+    }
+    if engine.dialect.name == "postgresql" and engine.dialect.driver == "psycopg2":
+        modes["copy"] = lambda rows: persistence.bulk_insert("reddit_posts", rows, method="copy")
+
+    run_id = f"bench-bulk-{uuid.uuid4().hex[:8]}"
+    print(f"{engine.dialect.name}+{engine.dialect.driver}")
+    print(f"{'rows':>7} {'mode':>12} {'seconds':>9} {'rows/s':>10}")
+    try:
+        for n in SIZES:
+            rows = make_rows(run_id, n)
+            for mode, insert_fn in modes.items():
+                s = time.perf_counter()
+                try:
+                    insert_fn(rows)
+                except Exception as e:
+                    print(f"{n:>7} {mode:>12}    failed: {type(e).__name__}: {str(e).splitlines()[0][:80]}")
+                    continue
+                elapsed = time.perf_counter() - s
+                print(f"{n:>7} {mode:>12} {elapsed:>9.3f} {n / elapsed:>10.0f}")
+    finally:
+        with get_session() as s:
+            s.execute(delete(RedditPost).where(RedditPost.run_id == run_id))
+        reset_db()
+
+
+if __name__ == "__main__":
+    main()
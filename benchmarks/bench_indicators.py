@@ -0,0 +1,61 @@
+"""Compare the per-ticker snapshot path with the vectorized indicator engine.
+
+Both paths get the same synthetic year of daily bars, so only the indicator
+computation is timed (no Yahoo Finance calls).
+
+Usage:
+    python -m benchmarks.bench_indicators
+"""
+
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from stock_ai.yahoo_finance.history_store import OhlcvHistoryStore
+from stock_ai.yahoo_finance.indicators import compute_snapshots
+from stock_ai.yahoo_finance.yahoo_finance_client import YahooFinanceClient
+
+TICKER_COUNTS = [10, 100, 500]
+N_DAYS = 252
+
+
+def make_panel(n_tickers: int) -> dict[str, pd.DataFrame]:
+    rng = np.random.default_rng(42)
+    tickers = [f"T{i:04d}" for i in range(n_tickers)]
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=N_DAYS, name="Date")
+    close = 100 + np.cumsum(rng.normal(0, 2, size=(N_DAYS, n_tickers)), axis=0)
+    high = close + rng.uniform(0, 3, size=close.shape)
+    low = close - rng.uniform(0, 3, size=close.shape)
+    return {name: pd.DataFrame(values, index=index, columns=tickers)
+            for name, values in (("Close", close), ("High", high), ("Low", low))}
+
+
+def per_ticker(panel: dict[str, pd.DataFrame]) -> list:
+    client = YahooFinanceClient(history_store=OhlcvHistoryStore("unused"))
+    histories = {t: pd.DataFrame({col: panel[col][t] for col in ("Close", "High", "Low")})
+                 for t in panel["Close"].columns}
+    with patch.object(client, "get_history", side_effect=lambda t, start, end: histories[t]):
+        return [client.get_yf_snapshot(t) for t in histories]
+
+
+def vectorized(panel: dict[str, pd.DataFrame]) -> list:
+    return compute_snapshots(panel["Close"], panel["High"], panel["Low"])
+
+
+def main():
+    print(f"{'tickers':>8} {'per-ticker s':>13} {'vectorized s':>13} {'speedup':>8}")
+    for n in TICKER_COUNTS:
+        panel = make_panel(n)
+        s = time.perf_counter()
+        per_ticker(panel)
+        per_ticker_s = time.perf_counter() - s
+        s = time.perf_counter()
+        vectorized(panel)
+        vectorized_s = time.perf_counter() - s
+        print(f"{n:>8} {per_ticker_s:>13.4f} {vectorized_s:>13.4f} {per_ticker_s / vectorized_s:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
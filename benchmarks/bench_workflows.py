@@ -0,0 +1,288 @@
+"""End-to-end benchmark of the reddit stock, weekly trade and daily performance workflows.
+
+Every external service is local: FakeReddit and FakeYFinance (benchmarks.fakes)
+replace PRAW and yfinance, the agents run on the simulated LLM backend
+(LLM_BACKEND=simulated) and Discord notifications go to a local webhook sink.
+Each scenario runs in a fresh process against a fresh database and reports:
+
+    wall      seconds from init_workflow to the end of the run
+    steps     duration of every workflow step (ms), from the run's spans
+    db        DB round trips (statements sent to the database)
+    rss       peak resident memory of the process (MB)
+
+Scenarios are parameterized by post count (reddit), ticker count (reddit:
+tickers mentioned in the posts, trade: final recommendations) and position
+count (trade, daily).
+
+Usage:
+    python -m benchmarks.bench_workflows --posts 100,1000 --tickers 5,20 --positions 10,100
+    python -m benchmarks.bench_workflows --json baseline.json
+    python -m benchmarks.bench_workflows --compare baseline.json --tolerance 0.2
+
+--compare exits with status 1 if a scenario's wall time or DB round trips grew
+by more than the tolerance. Without BENCH_DATABASE_URL every scenario gets a
+temporary SQLite database; a Postgres URL must point at a scratch database
+migrated to head (alembic upgrade head). Simulated latencies come from
+LLM_SIM_LATENCY (default constant:0.05), BENCH_REDDIT_LATENCY (per listing page,
+default 0.05), BENCH_YAHOO_LATENCY and BENCH_DISCORD_LATENCY (per call, default
+0.02). WORKFLOW_ASYNC=1 benchmarks Workflow.arun.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from unittest.mock import patch
+
+WORKFLOWS = ["reddit", "trade", "daily"]
+
+
+@dataclass
+class Scenario:
+    workflow: str
+    posts: int = 0
+    tickers: int = 0
+    positions: int = 0
+
+    @property
+    def key(self) -> str:
+        return f"{self.workflow} posts={self.posts} tickers={self.tickers} positions={self.positions}"
+
+
+def scenarios(workflows: list[str], posts: list[int], tickers: list[int], positions: list[int]) -> list[Scenario]:
+    """Only the parameters a workflow depends on are varied for it."""
+    out = []
+    for workflow in workflows:
+        if workflow == "reddit":
+            out += [Scenario(workflow, posts=p, tickers=t) for p in posts for t in tickers]
+        elif workflow == "trade":
+            out += [Scenario(workflow, tickers=t, positions=n) for t in tickers for n in positions]
+        elif workflow == "daily":
+            out += [Scenario(workflow, positions=n) for n in positions]
+        else:
+            raise ValueError(f"Unknown workflow: {workflow}")
+    return out
+
+
+def ticker_names(n: int) -> list[str]:
+    return [f"T{i:04d}" for i in range(n)]
+
+
+class RoundTrips:
+    """Counts statements sent to any engine (before_cursor_execute)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def run_scenario(scenario: Scenario, database_url: str | None, verbose: bool = False) -> dict:
+    """Run one scenario in this process. Meant for a fresh process: it sets env vars
+    read at import time and the process-wide clients and caches start empty."""
+    with contextlib.redirect_stdout(sys.stdout if verbose else io.StringIO()):
+        return _run_scenario(scenario, database_url)
+
+
+def _run_scenario(scenario: Scenario, database_url: str | None) -> dict:
+    tmp = tempfile.mkdtemp(prefix="bench-workflows-")
+    suffix = f"bench{uuid.uuid4().hex[:8]}"
+    os.environ["DB_TARGET"] = "LOCAL"
+    os.environ["DATABASE_URL_LOCAL"] = database_url or f"sqlite:///{tmp}/bench.db"
+    os.environ["LLM_BACKEND"] = "simulated"
+    os.environ.setdefault("LLM_SIM_LATENCY", "constant:0.05")
+    os.environ["YAHOO_HISTORY_DIR"] = f"{tmp}/yahoo_history"
+    os.environ["PORTFOLIO_NAME"] = f"portfolio_{suffix}"
+    os.environ.pop("PRICE_CACHE_PATH", None)
+    os.environ.pop("ENVIRONMENT", None)
+
+    from sqlalchemy import Engine, event
+
+    from benchmarks.fakes import DiscordSink, FakeReddit, FakeYFinance
+    from stock_ai.db.base import Base
+    from stock_ai.db.session import _get_engine
+    from stock_ai.reddit.reddit_scraper import RedditScraper
+    from stock_ai.workflows.persistence.sql_alchemy_persistence import SqlAlchemyPersistence
+    from stock_ai.workflows.run_id_generator import RunIdType
+
+    engine = _get_engine()
+    if engine.dialect.name == "sqlite":
+        Base.metadata.create_all(engine)
+
+    if scenario.workflow == "reddit":
+        from stock_ai.main import REGISTRY
+        from stock_ai.workflows.reddit_stock_workflow import init_workflow
+        run_id = f"{RunIdType.REDDIT_STOCK_RECOMMENDATION.value}_{suffix}"
+    elif scenario.workflow == "trade":
+        from stock_ai.main_trade import REGISTRY
+        from stock_ai.workflows.weekly_trade_workflow import init_workflow
+        run_id = f"{RunIdType.REDDIT_STOCK_TRADE.value}_{suffix}"
+    else:
+        from stock_ai.main_daily_performance import REGISTRY
+        from stock_ai.workflows.daily_performance_workflow import init_workflow
+        run_id = f"{RunIdType.DAILY_PERF.value}_{suffix}"
+    persistence = SqlAlchemyPersistence(registry=REGISTRY)
+    _seed(persistence, scenario, suffix)
+
+    scraper = RedditScraper.__new__(RedditScraper)
+    scraper.reddit = FakeReddit(scenario.posts, ticker_names(max(scenario.tickers, 1)),
+                                page_latency=float(os.getenv("BENCH_REDDIT_LATENCY") or 0.05))
+    yf = FakeYFinance(latency=float(os.getenv("BENCH_YAHOO_LATENCY") or 0.02))
+    round_trips = RoundTrips()
+    event.listen(Engine, "before_cursor_execute", round_trips)
+    try:
+        with DiscordSink(latency=float(os.getenv("BENCH_DISCORD_LATENCY") or 0.02)) as sink, \
+                patch.dict(os.environ, {"DISCORD_WEBHOOK_URL_TEST": sink.url}), \
+                patch("stock_ai.yahoo_finance.yahoo_finance_client.yf", yf), \
+                patch("stock_ai.workflows.reddit_stock_workflow.get_reddit_scraper", return_value=scraper):
+            start = time.perf_counter()
+            workflow = init_workflow(run_id, persistence)
+            if os.getenv("WORKFLOW_ASYNC") == "1":
+                asyncio.run(workflow.arun())
+            else:
+                workflow.run()
+            wall = time.perf_counter() - start
+    finally:
+        event.remove(Engine, "before_cursor_execute", round_trips)
+
+    from stock_ai.agents.llm_backend import get_default_llm_backend
+
+    spans = workflow.tracer.spans
+    return {
+        "scenario": asdict(scenario),
+        "key": scenario.key,
+        "wall_seconds": round(wall, 3),
+        "steps_ms": {s.name: round(s.duration_ms or 0.0, 1) for s in spans if s.kind == "step"},
+        "step_fns": sum(1 for s in spans if s.kind == "step_fn"),
+        "db_round_trips": round_trips.count,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "llm_requests": get_default_llm_backend(None).requests,
+        "yahoo_calls": yf.calls,
+        "discord_messages": len(sink.messages),
+    }
+
+
+def _seed(persistence, scenario: Scenario, suffix: str) -> None:
+    """Inputs the workflow reads from earlier runs: final recommendations, a portfolio and its positions."""
+    from sqlalchemy import text
+
+    from stock_ai.workflows.run_id_generator import RunIdType
+
+    tickers = ticker_names(scenario.tickers)
+    if scenario.workflow == "trade":
+        # the trade workflow reads the recommendations of the reddit run with the same suffix
+        persistence.set("final_recommendations", [{
+            "run_id": f"{RunIdType.REDDIT_STOCK_RECOMMENDATION.value}_{suffix}",
+            "ticker": t,
+            "reason": f"Benchmark recommendation for {t}",
+            "confidence": "high",
+            "reddit_post_url": f"https://reddit.com/r/wallstreetbets/comments/{t.lower()}/",
+        } for t in tickers])
+    if scenario.workflow in ("trade", "daily"):
+        # positions partly overlap the recommendations, like a portfolio built by earlier runs
+        position_tickers = ticker_names(scenario.tickers // 2 + scenario.positions)[scenario.tickers // 2:]
+        cash = 1_000_000.0
+        capital = cash + 10 * 100.0 * len(position_tickers)
+        persistence.set("portfolios", [{
+            "name": os.environ["PORTFOLIO_NAME"],
+            "cash_balance": cash,
+            "total_value": capital,
+            "initial_capital": capital,
+            "last_update_run_id": "seed",
+        }])
+        portfolio_id = persistence.query(text("SELECT id FROM portfolios WHERE name = :name"),
+                                         {"name": os.environ["PORTFOLIO_NAME"]})[0].id
+        persistence.set("positions", [{
+            "portfolio_id": portfolio_id,
+            "ticker": t,
+            "quantity": 10,
+            "avg_entry_price": 100.0,
+            "current_price": 100.0,
+            "unrealized_pnl": 0.0,
+        } for t in position_tickers])
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_isolated(scenario: Scenario, database_url: str | None, verbose: bool) -> dict:
+    """run_scenario in a new process, so peak RSS and process-wide state are per scenario."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(run_scenario, scenario, database_url, verbose).result()
+
+
+def print_result(r: dict) -> None:
+    print(f"{r['key']}: wall={r['wall_seconds']:.2f}s db={r['db_round_trips']} rss={r['peak_rss_mb']:.0f}MB "
+          f"step_fns={r['step_fns']} llm={r['llm_requests']} yahoo={r['yahoo_calls']} "
+          f"discord={r['discord_messages']}")
+    for name, ms in r["steps_ms"].items():
+        print(f"    {ms:>9.1f}ms  {name}")
+
+
+def compare(results: list[dict], baseline_path: str, tolerance: float) -> list[str]:
+    """Scenarios whose wall time or DB round trips grew by more than tolerance over the baseline."""
+    with open(baseline_path) as f:
+        baseline = {r["key"]: r for r in json.load(f)}
+    regressions = []
+    for r in results:
+        base = baseline.get(r["key"])
+        if base is None:
+            continue
+        for metric in ("wall_seconds", "db_round_trips"):
+            if base[metric] and r[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f"{r['key']}: {metric} {base[metric]} -> {r[metric]}")
+    return regressions
+
+
+def _ints(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end workflow benchmark with fake external services")
+    parser.add_argument("--workflows", default=",".join(WORKFLOWS))
+    parser.add_argument("--posts", type=_ints, default=[100, 1000])
+    parser.add_argument("--tickers", type=_ints, default=[5, 20])
+    parser.add_argument("--positions", type=_ints, default=[10, 100])
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="results file of an earlier run to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--verbose", action="store_true", help="show the workflows' own output")
+    args = parser.parse_args()
+
+    database_url = os.getenv("BENCH_DATABASE_URL")
+    results = []
+    for scenario in scenarios(args.workflows.split(","), args.posts, args.tickers, args.positions):
+        result = run_isolated(scenario, database_url, args.verbose)
+        print_result(result)
+        results.append(result)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {len(results)} results to {args.json}")
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions over {args.compare} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
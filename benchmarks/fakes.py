@@ -0,0 +1,201 @@
+"""Local stand-ins for the external services of the workflows, for benchmarks.
+
+- FakeReddit: the praw.Reddit surface RedditScraper uses (subreddit().new()).
+- FakeYFinance: the yfinance module surface YahooFinanceClient uses (download, Ticker).
+- DiscordSink: a local HTTP server accepting Discord webhook posts.
+
+Data is synthetic and deterministic for a given seed. Each fake can add a fixed
+latency per call (per listing page for Reddit) to model network round trips.
+"""
+
+import json
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+FLAIRS = ["News", "DD", "YOLO", "Discussion", "Meme"]
+
+
+@dataclass
+class FakeSubmission:
+    id: str
+    title: str
+    selftext: str
+    link_flair_text: str
+    score: int
+    num_comments: int
+    upvote_ratio: float
+    created_utc: float
+    permalink: str
+
+
+class FakeSubreddit:
+    PAGE_SIZE = 100  # PRAW fetches listings 100 items per request
+
+    def __init__(self, submissions: list[FakeSubmission], page_latency: float):
+        self.submissions = submissions
+        self.page_latency = page_latency
+
+    def new(self, limit: int = 100):
+        for i, submission in enumerate(self.submissions[:limit]):
+            if i % self.PAGE_SIZE == 0 and self.page_latency:
+                time.sleep(self.page_latency)
+            yield submission
+
+
+class FakeReddit:
+    def __init__(self, posts: int, tickers: list[str], page_latency: float = 0.0, seed: int = 0):
+        self.submissions = make_submissions(posts, tickers, seed)
+        self.page_latency = page_latency
+
+    def subreddit(self, name: str) -> FakeSubreddit:
+        return FakeSubreddit(self.submissions, self.page_latency)
+
+
+def make_submissions(n: int, tickers: list[str], seed: int = 0) -> list[FakeSubmission]:
+    """n posts, newest first, spread over the last 6 days, mentioning the tickers as cashtags."""
+    rng = np.random.default_rng(seed)
+    now = datetime.now(timezone.utc).timestamp()
+    step = 6 * 24 * 3600 / max(n, 1)
+    submissions = []
+    for i in range(n):
+        ticker = tickers[i % len(tickers)]
+        flair = FLAIRS[i % len(FLAIRS)]
+        submissions.append(FakeSubmission(
+            id=f"fake{i:06d}",
+            title=f"${ticker} {flair.lower()} post {i}",
+            # every tenth post has no body, the scraper skips those
+            selftext="" if i % 10 == 9 else f"Why ${ticker} is going to move this week. " * int(rng.integers(5, 60)),
+            link_flair_text=flair,
+            score=int(rng.pareto(1.5) * 50),
+            num_comments=int(rng.integers(0, 500)),
+            upvote_ratio=round(float(rng.uniform(0.5, 1.0)), 2),
+            created_utc=now - i * step,
+            permalink=f"/r/wallstreetbets/comments/fake{i:06d}/",
+        ))
+    return submissions
+
+
+class FakeTicker:
+    def __init__(self, yf: "FakeYFinance", ticker: str):
+        self._yf = yf
+        self.ticker = ticker
+
+    def history(self, start=None, end=None, period=None, **kwargs) -> pd.DataFrame:
+        self._yf.call()
+        bars = self._yf.bars(self.ticker, start, end, period)
+        bars.index = bars.index.tz_localize("America/New_York")
+        return bars
+
+    @property
+    def info(self) -> dict:
+        self._yf.call()
+        return {"currentPrice": float(self._yf.series(self.ticker)["Close"].iloc[-1])}
+
+
+class FakeYFinance:
+    """Daily random-walk bars per ticker over the last two years of business days."""
+
+    def __init__(self, latency: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.seed = seed
+        self.calls = 0
+        self._series: dict[str, pd.DataFrame] = {}
+        self._lock = threading.Lock()
+
+    def call(self) -> None:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def series(self, ticker: str) -> pd.DataFrame:
+        with self._lock:
+            bars = self._series.get(ticker)
+            if bars is None:
+                bars = self._series[ticker] = self._make_series(ticker)
+            return bars
+
+    def _make_series(self, ticker: str) -> pd.DataFrame:
+        rng = np.random.default_rng([self.seed, zlib.crc32(ticker.encode())])
+        index = pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=504, name="Date")
+        start = 5000.0 if ticker.startswith("^") else float(rng.uniform(10, 500))
+        close = start * np.exp(np.cumsum(rng.normal(0, 0.02, len(index))))
+        high = close * (1 + rng.uniform(0, 0.02, len(index)))
+        low = close * (1 - rng.uniform(0, 0.02, len(index)))
+        return pd.DataFrame({
+            "Open": (high + low) / 2, "High": high, "Low": low, "Close": close, "Adj Close": close,
+            "Volume": rng.integers(100_000, 10_000_000, len(index)).astype("float64"),
+            "Dividends": 0.0, "Stock Splits": 0.0,
+        }, index=index)
+
+    def bars(self, ticker: str, start=None, end=None, period=None) -> pd.DataFrame:
+        bars = self.series(ticker)
+        if period is not None:
+            return bars.iloc[-int(period.rstrip("d")):].copy()
+        if start is not None:
+            bars = bars[bars.index >= _day(start)]
+        if end is not None:
+            bars = bars[bars.index < _day(end) + timedelta(days=1)]
+        return bars.copy()
+
+    def download(self, tickers, start=None, end=None, period=None, **kwargs) -> pd.DataFrame:
+        """yf.download layout: (field, ticker) columns, tz-naive dates."""
+        self.call()
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        frames = {t: self.bars(t, start, end, period).drop(columns=["Dividends", "Stock Splits"]) for t in tickers}
+        df = pd.concat(frames, axis=1)
+        return df.swaplevel(axis=1).sort_index(axis=1)
+
+    def Ticker(self, ticker: str) -> FakeTicker:
+        return FakeTicker(self, ticker)
+
+
+def _day(value) -> pd.Timestamp:
+    ts = pd.Timestamp(value)
+    if ts.tz is not None:
+        ts = ts.tz_convert(None)
+    return ts.normalize()
+
+
+class DiscordSink:
+    """Accepts webhook POSTs on a local port and keeps their JSON bodies. Use as a context manager."""
+
+    def __init__(self, latency: float = 0.0):
+        self.messages: list[dict] = []
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if latency:
+                    time.sleep(latency)
+                sink.messages.append(json.loads(body or b"{}"))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/webhook"
+
+    def __enter__(self) -> "DiscordSink":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
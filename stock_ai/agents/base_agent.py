@@ -1,6 +1,17 @@
+import asyncio
+import time
 from typing import Any
 from abc import ABC, abstractmethod
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+from pydantic import BaseModel
+
+from stock_ai.agents.batch_runner import BatchRequest, OpenAIBatchRunner
+from stock_ai.agents.llm_backend import LLMBackend, LLMResponse, get_default_llm_backend
+from stock_ai.agents.rate_limiter import TokenBucketLimiter, estimate_tokens, get_default_rate_limiter
+from stock_ai.agents.resilience import (
+    RetryPolicy, UnparseableResponseError, acall_with_retries, call_with_retries, get_latency_tracker)
+from stock_ai.agents.response_cache import ResponseCache, cache_key, get_default_response_cache
+from stock_ai.workflows.tracing import record_external_call
 
 class BaseAgent(ABC):
     """Abstract base class for AI agents that use OpenAI client.
@@ -10,10 +21,26 @@ class BaseAgent(ABC):
         "AGENTIC_BALANCE": """# Agentic Balance:
 - Proceed autonomously to generate recommendations; in all cases, do not stop to request clarification even if critical decision information is missing. Continue based on the best available data and your established criteria."""
     }
+    MODEL = "gpt-5"
 
-    def __init__(self, open_ai_client: OpenAI):
+    def __init__(self, open_ai_client: OpenAI | None, response_cache: ResponseCache | None = None,
+                 async_open_ai_client: AsyncOpenAI | None = None, rate_limiter: TokenBucketLimiter | None = None,
+                 retry_policy: RetryPolicy | None = None, backend: LLMBackend | None = None):
+        """
+        response_cache: parsed responses by request content, defaults to get_default_response_cache() (off unless LLM_CACHE is set).
+        async_open_ai_client: used by aact, defaults to the shared get_async_openai_client().
+        rate_limiter: RPM/TPM limits shared by all agents, defaults to get_default_rate_limiter().
+        retry_policy: retries, deadline and hedging of OpenAI calls, defaults to RetryPolicy.from_env().
+        backend: where requests go, defaults to get_default_llm_backend() (OpenAI on the clients above unless LLM_BACKEND is set).
+        open_ai_client may be None when the backend doesn't need it (no Batch API execution then).
+        """
         super().__init__()
         self.open_ai_client = open_ai_client
+        self.response_cache = response_cache if response_cache is not None else get_default_response_cache()
+        self.async_open_ai_client = async_open_ai_client
+        self.rate_limiter = rate_limiter if rate_limiter is not None else get_default_rate_limiter()
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy.from_env()
+        self.backend = backend if backend is not None else get_default_llm_backend(open_ai_client, async_open_ai_client)
 
     @property
     @abstractmethod
@@ -36,3 +63,158 @@ class BaseAgent(ABC):
         Open to implementation, can either fix the result, or run a while loop until satisfactory
         """
         pass
+
+    async def aact(self, context: Any, **kwargs) -> Any:
+        """Async act. Agents that support it override this with a real AsyncOpenAI call,
+        the default runs act in a thread."""
+        return await asyncio.to_thread(self.act, context, **kwargs)
+
+    def _parse(self, user_prompt: str, text_format: type[BaseModel], reasoning: dict | None = None,
+               tools: list[dict] | None = None) -> BaseModel:
+        """responses.parse on the agent's backend with its system prompt, served from the response cache when possible.
+
+        Transient errors are retried per retry_policy, each attempt waits for the shared rate limiter.
+        Raises UnparseableResponseError if no attempt's response can be parsed into text_format.
+        """
+        params, key = self._request(user_prompt, text_format, reasoning, tools)
+        cached = self._cached(key, text_format)
+        if cached is not None:
+            return cached
+
+        tokens = estimate_tokens(params["instructions"], user_prompt)
+
+        def attempt(timeout: float | None) -> BaseModel:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(tokens)
+            start = time.perf_counter()
+            resp = self.backend.parse(params, timeout)
+            return self._result(resp, tokens, time.perf_counter() - start)
+
+        agent_cls = self.__class__.__name__
+        result = call_with_retries(attempt, self.retry_policy, get_latency_tracker(agent_cls), name=agent_cls)
+        self._store(key, result)
+        return result
+
+    async def _aparse(self, user_prompt: str, text_format: type[BaseModel], reasoning: dict | None = None,
+                      tools: list[dict] | None = None) -> BaseModel:
+        """Async _parse using the backend's aparse; waits for the rate limiter without blocking the loop."""
+        params, key = self._request(user_prompt, text_format, reasoning, tools)
+        cached = self._cached(key, text_format)
+        if cached is not None:
+            return cached
+
+        tokens = estimate_tokens(params["instructions"], user_prompt)
+
+        async def attempt(timeout: float | None) -> BaseModel:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.aacquire(tokens)
+            start = time.perf_counter()
+            resp = await self.backend.aparse(params, timeout)
+            return self._result(resp, tokens, time.perf_counter() - start)
+
+        agent_cls = self.__class__.__name__
+        result = await acall_with_retries(attempt, self.retry_policy, get_latency_tracker(agent_cls), name=agent_cls)
+        self._store(key, result)
+        return result
+
+    def _parse_batch(self, user_prompts: dict[str, str], text_format: type[BaseModel], runner: OpenAIBatchRunner,
+                     reasoning: dict | None = None, tools: list[dict] | None = None) -> dict[str, BaseModel | Exception]:
+        """Like _parse for many prompts (by id) at once through the OpenAI Batch API.
+
+        Prompts found in the response cache are not submitted. Returns the parsed
+        result per id, or the exception for ids whose request failed.
+        """
+        results: dict[str, BaseModel | Exception] = {}
+        requests = []
+        keys = {}
+        for custom_id, user_prompt in user_prompts.items():
+            params, key = self._request(user_prompt, text_format, reasoning, tools)
+            cached = self._cached(key, text_format)
+            if cached is not None:
+                results[custom_id] = cached
+                continue
+            keys[custom_id] = key
+            body = {k: v for k, v in params.items() if k != "text_format"}
+            body["text"] = {"format": _text_format_param(text_format)}
+            requests.append(BatchRequest(custom_id=custom_id, body=body, text_format=text_format))
+
+        for custom_id, result in runner.run(requests).items():
+            if not isinstance(result, Exception):
+                self._store(keys[custom_id], result)
+            results[custom_id] = result
+        return results
+
+    def _request(self, user_prompt: str, text_format: type[BaseModel], reasoning: dict | None,
+                 tools: list[dict] | None) -> tuple[dict, str | None]:
+        """responses.parse params and their response cache key (None without a cache)."""
+        params = {
+            "model": self.MODEL,
+            "instructions": self.system_prompt,
+            "input": user_prompt,
+            "text_format": text_format,
+        }
+        if reasoning is not None:
+            params["reasoning"] = reasoning
+        if tools is not None:
+            params["tools"] = tools
+        key = None
+        if self.response_cache is not None:
+            key = cache_key(self.MODEL, params["instructions"], user_prompt, text_format, reasoning, tools)
+        return params, key
+
+    def _cached(self, key: str | None, text_format: type[BaseModel]) -> BaseModel | None:
+        if key is None:
+            return None
+        cached = self.response_cache.get(key, text_format)
+        if cached is not None:
+            print(f"{self.__class__.__name__} response served from cache")
+        return cached
+
+    def _store(self, key: str | None, result: BaseModel) -> None:
+        """Put a response in the cache; a failed write is logged, the paid response is still used."""
+        if key is None:
+            return
+        try:
+            self.response_cache.set(key, result)
+        except Exception as e:
+            print(f"{self.__class__.__name__} response not cached: {e!r}")
+
+    def _result(self, resp: LLMResponse, reserved_tokens: int, seconds: float) -> BaseModel:
+        agent_cls = self.__class__.__name__
+        record_external_call(self.backend.name, seconds)
+        print(f"{agent_cls} completed in {seconds:.2f}s")
+        if self.rate_limiter is not None:
+            self.rate_limiter.reconcile(reserved_tokens, resp.total_tokens)
+
+        result = resp.output_parsed
+        if not result:
+            raise UnparseableResponseError(f"{agent_cls} result failed to parse")
+        return result
+
+
+def _text_format_param(text_format: type[BaseModel]) -> dict:
+    """The json_schema text.format that responses.parse sends for a pydantic model."""
+    return {
+        "type": "json_schema",
+        "strict": True,
+        "name": text_format.__name__,
+        "schema": _strict_schema(text_format.model_json_schema()),
+    }
+
+
+def _strict_schema(schema: dict) -> dict:
+    """Structured Outputs' strict mode: every object closed and all its properties required."""
+    # every property is required, a default of None only says it is nullable
+    schema = {k: v for k, v in schema.items() if not (k == "default" and v is None)}
+    if "properties" in schema:
+        schema["properties"] = {name: _strict_schema(s) for name, s in schema["properties"].items()}
+        schema["required"] = list(schema["properties"])
+        schema["additionalProperties"] = False
+    if "$defs" in schema:
+        schema["$defs"] = {name: _strict_schema(s) for name, s in schema["$defs"].items()}
+    if "items" in schema:
+        schema["items"] = _strict_schema(schema["items"])
+    for key in ("anyOf", "allOf"):
+        if key in schema:
+            schema[key] = [_strict_schema(s) for s in schema[key]]
+    return schema
@@ -0,0 +1,102 @@
+"""OpenAI Batch API execution for agent calls that can wait.
+
+All requests of a step are written as one JSONL file of /v1/responses calls,
+submitted as a batch, polled until it finishes, and the output lines are
+parsed back into the requests' text_format models. Batches are billed at a
+discount and run against a separate quota, at the cost of latency (up to the
+24h completion window).
+"""
+
+import json
+import os
+import time
+from dataclasses import dataclass
+
+from openai import OpenAI
+from pydantic import BaseModel
+
+from stock_ai.workflows.tracing import record_external_call
+
+_FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+@dataclass
+class BatchRequest:
+    custom_id: str
+    body: dict  # /v1/responses request body
+    text_format: type[BaseModel]
+
+
+class OpenAIBatchRunner:
+    def __init__(self, client: OpenAI, poll_interval: float | None = None, timeout: float | None = None):
+        """poll_interval / timeout in seconds, default OPENAI_BATCH_POLL_SECONDS (30)
+        and OPENAI_BATCH_TIMEOUT_SECONDS (25h, the 24h window plus finalizing)."""
+        self.client = client
+        self.poll_interval = poll_interval if poll_interval is not None else float(
+            os.getenv("OPENAI_BATCH_POLL_SECONDS") or 30)
+        self.timeout = timeout if timeout is not None else float(os.getenv("OPENAI_BATCH_TIMEOUT_SECONDS") or 25 * 3600)
+
+    def run(self, requests: list[BatchRequest]) -> dict[str, BaseModel | Exception]:
+        """Parsed result per custom_id, or the exception describing why that request has none."""
+        if not requests:
+            return {}
+        start = time.perf_counter()
+        jsonl = "\n".join(json.dumps({
+            "custom_id": r.custom_id,
+            "method": "POST",
+            "url": "/v1/responses",
+            "body": r.body,
+        }, ensure_ascii=False) for r in requests) + "\n"
+        input_file = self.client.files.create(file=("batch.jsonl", jsonl.encode("utf-8")), purpose="batch")
+        batch = self.client.batches.create(input_file_id=input_file.id, endpoint="/v1/responses",
+                                           completion_window="24h")
+        print(f"Submitted OpenAI batch {batch.id} with {len(requests)} requests")
+
+        batch = self._wait(batch.id)
+        print(f"OpenAI batch {batch.id} {batch.status} after {time.perf_counter() - start:.0f}s")
+        record_external_call("openai_batch", time.perf_counter() - start)
+
+        by_id = {r.custom_id: r for r in requests}
+        results: dict[str, BaseModel | Exception] = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if line.strip():
+                    item = json.loads(line)
+                    request = by_id.get(item.get("custom_id"))
+                    if request is not None:
+                        results[request.custom_id] = _parse_output_line(item, request.text_format)
+        for custom_id in by_id:
+            results.setdefault(custom_id, RuntimeError(f"No result for {custom_id} in batch {batch.id} ({batch.status})"))
+        return results
+
+    def _wait(self, batch_id: str):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status in _FINAL_STATUSES:
+                return batch
+            if time.monotonic() > deadline:
+                self.client.batches.cancel(batch_id)
+                raise TimeoutError(f"OpenAI batch {batch_id} still {batch.status} after {self.timeout:.0f}s, cancelled")
+            time.sleep(self.poll_interval)
+
+
+def _parse_output_line(item: dict, text_format: type[BaseModel]) -> BaseModel | Exception:
+    if item.get("error"):
+        return RuntimeError(f"Batch request failed: {item['error']}")
+    response = item.get("response") or {}
+    if response.get("status_code") != 200:
+        return RuntimeError(f"Batch request failed with status {response.get('status_code')}: {response.get('body')}")
+    texts = [
+        content["text"]
+        for output in response["body"].get("output", []) if output.get("type") == "message"
+        for content in output.get("content", []) if content.get("type") == "output_text"
+    ]
+    if not texts:
+        return ValueError("Batch response has no output text")
+    try:
+        return text_format.model_validate_json(texts[-1])
+    except ValueError as e:
+        return e
@@ -0,0 +1,323 @@
+"""Where BaseAgent sends its structured-output requests.
+
+OpenAIBackend calls responses.parse. SimulatedBackend answers locally: after a
+latency drawn from a configurable distribution it returns a schema-valid
+instance of the requested text_format, built from the model's fields and
+constraints. Tickers and post URLs are taken from the request's input where
+possible. The content is deterministic per request (same prompt, same
+answer); latencies and injected failures come from one seeded random stream.
+
+LLM_BACKEND=simulated switches every agent to the simulated backend, which
+makes the workflows runnable offline for load tests and benchmarks.
+"""
+
+import asyncio
+import hashlib
+import math
+import os
+import random
+import re
+import threading
+import time
+import types
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Literal, Union, get_args, get_origin
+
+import annotated_types
+import httpx
+import openai
+from openai import AsyncOpenAI, OpenAI
+from pydantic import BaseModel
+from pydantic.fields import FieldInfo
+
+
+@dataclass
+class LLMResponse:
+    output_parsed: BaseModel | None
+    total_tokens: int | None = None
+
+
+class LLMBackend(ABC):
+    """Runs responses.parse style requests. params are the responses.parse keyword arguments
+    (model, instructions, input, text_format, reasoning, tools). Implementations must be thread-safe."""
+
+    name: str
+
+    @abstractmethod
+    def parse(self, params: dict, timeout: float | None = None) -> LLMResponse:
+        pass
+
+    @abstractmethod
+    async def aparse(self, params: dict, timeout: float | None = None) -> LLMResponse:
+        pass
+
+
+class OpenAIBackend(LLMBackend):
+    name = "openai"
+
+    def __init__(self, client: OpenAI | None, async_client: AsyncOpenAI | None = None):
+        """async_client defaults to the shared get_async_openai_client() on first aparse.
+
+        The SDK's own retries are turned off: call_with_retries is the only layer
+        retrying, so AGENT_RETRY_ATTEMPTS and the call deadline hold.
+        """
+        self.client = _without_retries(client)
+        self.async_client = _without_retries(async_client)
+
+    def parse(self, params: dict, timeout: float | None = None) -> LLMResponse:
+        resp = self.client.responses.parse(**params, **_timeout_param(timeout))
+        return _response(resp)
+
+    async def aparse(self, params: dict, timeout: float | None = None) -> LLMResponse:
+        if self.async_client is None:
+            from stock_ai.workflows.common.api_clients import get_async_openai_client
+            self.async_client = _without_retries(get_async_openai_client())
+        resp = await self.async_client.responses.parse(**params, **_timeout_param(timeout))
+        return _response(resp)
+
+
+def _without_retries(client):
+    # a copy sharing the client's connection pool
+    return None if client is None else client.with_options(max_retries=0)
+
+
+def _response(resp: Any) -> LLMResponse:
+    usage = getattr(resp, "usage", None)
+    return LLMResponse(output_parsed=resp.output_parsed, total_tokens=getattr(usage, "total_tokens", None))
+
+
+def _timeout_param(timeout: float | None) -> dict:
+    # timeout=None would mean no timeout at all to the OpenAI client, leave its default instead
+    return {} if timeout is None else {"timeout": timeout}
+
+
+@dataclass
+class LatencyDistribution:
+    """Simulated response time in seconds.
+
+    kind: constant (always `median`), lognormal (median `median`, shape `sigma`)
+    or exponential (median `median`). Samples are capped at max_seconds.
+    """
+    kind: str = "lognormal"
+    median: float = 1.0
+    sigma: float = 0.5
+    max_seconds: float = 120.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyDistribution":
+        """From "kind:median[:sigma]", e.g. "lognormal:2.5:0.6" or "constant:0.1"."""
+        kind, *values = spec.split(":")
+        dist = cls(kind=kind)
+        if values:
+            dist.median = float(values[0])
+        if len(values) > 1:
+            dist.sigma = float(values[1])
+        return dist
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "constant":
+            seconds = self.median
+        elif self.kind == "lognormal":
+            seconds = rng.lognormvariate(math.log(self.median), self.sigma) if self.median > 0 else 0.0
+        elif self.kind == "exponential":
+            seconds = rng.expovariate(math.log(2) / self.median) if self.median > 0 else 0.0
+        else:
+            raise ValueError(f"Unknown latency distribution: {self.kind}")
+        return min(seconds, self.max_seconds)
+
+
+# used when the request's input names no tickers
+DEFAULT_TICKERS = ["AAPL", "MSFT", "NVDA", "AMZN", "GOOGL", "META", "TSLA", "AMD", "PLTR", "JPM"]
+
+_TICKER_FIELD = re.compile(r'"ticker":\s*"([A-Za-z0-9.^\-]{1,10})"')
+_CASHTAG = re.compile(r"\$([A-Z]{1,5})\b")
+_URL = re.compile(r"https?://[^\s\"'\\]+")
+
+_WORDS = ("simulated", "catalyst", "earnings", "guidance", "momentum", "valuation", "volume",
+          "support", "breakout", "sector", "revenue", "margin", "demand", "risk")
+
+
+class SimulatedBackend(LLMBackend):
+    name = "simulated_llm"
+
+    def __init__(self, latency: LatencyDistribution | None = None,
+                 latencies: dict[str, LatencyDistribution] | None = None,
+                 failure_rate: float = 0.0, seed: int = 0):
+        """
+        latency: default response time distribution.
+        latencies: per text_format class name, e.g. {"StockRecommendationTickerList": ...}.
+        failure_rate: share of requests failing with a 503, to exercise retries.
+        """
+        self.latency = latency or LatencyDistribution()
+        self.latencies = latencies or {}
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def parse(self, params: dict, timeout: float | None = None) -> LLMResponse:
+        seconds, fail = self._draw(params)
+        if timeout is not None and seconds > timeout:
+            time.sleep(timeout)
+            raise openai.APITimeoutError(request=_SIMULATED_REQUEST)
+        time.sleep(seconds)
+        return self._respond(params, fail)
+
+    async def aparse(self, params: dict, timeout: float | None = None) -> LLMResponse:
+        seconds, fail = self._draw(params)
+        if timeout is not None and seconds > timeout:
+            await asyncio.sleep(timeout)
+            raise openai.APITimeoutError(request=_SIMULATED_REQUEST)
+        await asyncio.sleep(seconds)
+        return self._respond(params, fail)
+
+    def _draw(self, params: dict) -> tuple[float, bool]:
+        latency = self.latencies.get(params["text_format"].__name__, self.latency)
+        with self._lock:
+            self.requests += 1
+            return latency.sample(self._rng), self._rng.random() < self.failure_rate
+
+    def _respond(self, params: dict, fail: bool) -> LLMResponse:
+        if fail:
+            raise openai.InternalServerError(
+                "simulated failure", response=httpx.Response(503, request=_SIMULATED_REQUEST), body=None)
+        text = f"{params.get('instructions', '')}\n{params['input']}"
+        digest = hashlib.sha256(f"{self.seed}\n{params.get('model')}\n{text}\n{params['text_format'].__name__}"
+                                .encode("utf-8")).digest()
+        generator = _Generator(random.Random(digest), text)
+        output = generator.model(params["text_format"])
+        tokens = len(text) // 4 + len(output.model_dump_json()) // 4
+        return LLMResponse(output_parsed=output, total_tokens=tokens)
+
+
+_SIMULATED_REQUEST = httpx.Request("POST", "https://simulated.local/v1/responses")
+
+
+@dataclass
+class _Generator:
+    """Builds pydantic model instances from field types and Field constraints."""
+    rng: random.Random
+    text: str
+    tickers: list[str] = field(init=False)
+    urls: list[str] = field(init=False)
+    _unused_tickers: list[str] = field(init=False)
+
+    def __post_init__(self):
+        found = _TICKER_FIELD.findall(self.text) or _CASHTAG.findall(self.text)
+        self.tickers = list(dict.fromkeys(t.upper() for t in found)) or list(DEFAULT_TICKERS)
+        self.urls = list(dict.fromkeys(_URL.findall(self.text)))
+        self._unused_tickers = self.rng.sample(self.tickers, len(self.tickers))
+
+    def model(self, cls: type[BaseModel]) -> BaseModel:
+        values = {name: self.value(name, info.annotation, info) for name, info in cls.model_fields.items()}
+        return cls.model_validate(values)
+
+    def value(self, name: str, annotation: Any, info: FieldInfo | None) -> Any:
+        origin = get_origin(annotation)
+        if origin in (Union, types.UnionType):
+            options = [a for a in get_args(annotation) if a is not type(None)]
+            return self.value(name, options[0], info)
+        if origin is Literal:
+            return self.rng.choice(get_args(annotation))
+        if origin is list:
+            (item,) = get_args(annotation)
+            return [self.value(name, item, None) for _ in range(self._list_length(name, item, info))]
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            return self.model(annotation)
+        if annotation is bool:
+            return self.rng.random() < 0.5
+        if annotation is int:
+            low, high = self._bounds(info, integer=True)
+            # a quantity of 0 is rarely what a schema with ge=0 expects
+            return self.rng.randint(max(low, 1) if high >= 1 else low, high)
+        if annotation is float:
+            low, high = self._bounds(info, integer=False)
+            return round(self.rng.uniform(low, high), 2)
+        if annotation is str:
+            return self._string(name, info)
+        raise TypeError(f"SimulatedBackend can't generate {annotation!r} for field {name}")
+
+    def _list_length(self, name: str, item: Any, info: FieldInfo | None) -> int:
+        low, high = 1, 3
+        for m in info.metadata if info else []:
+            if isinstance(m, annotated_types.MinLen):
+                low = max(low, m.min_length)
+            elif isinstance(m, annotated_types.MaxLen):
+                high = m.max_length
+        low = min(low, high)
+        has_ticker = isinstance(item, type) and issubclass(item, BaseModel) and "ticker" in item.model_fields
+        if name == "tickers" or has_ticker:
+            # one entry per ticker, as a model would answer
+            high = max(low, min(high, len(self.tickers)))
+        return self.rng.randint(low, high)
+
+    def _bounds(self, info: FieldInfo | None, integer: bool) -> tuple[float, float]:
+        step = 1 if integer else 0.01
+        low, high = None, None
+        for m in info.metadata if info else []:
+            if isinstance(m, annotated_types.Ge):
+                low = m.ge
+            elif isinstance(m, annotated_types.Gt):
+                low = m.gt + step
+            elif isinstance(m, annotated_types.Le):
+                high = m.le
+            elif isinstance(m, annotated_types.Lt):
+                high = m.lt - step
+        if low is None:
+            low = 1 if high is None else high - 100 * step
+        if high is None:
+            high = low + (19 if integer else 200.0)
+        return low, high
+
+    def _string(self, name: str, info: FieldInfo | None) -> str:
+        if name in ("ticker", "tickers"):
+            if not self._unused_tickers:
+                self._unused_tickers = self.rng.sample(self.tickers, len(self.tickers))
+            return self._unused_tickers.pop()
+        if "url" in name:
+            return self.rng.choice(self.urls) if self.urls else "https://www.reddit.com/"
+        min_length, max_length = 1, None
+        for m in info.metadata if info else []:
+            if isinstance(m, annotated_types.MinLen):
+                min_length = m.min_length
+            elif isinstance(m, annotated_types.MaxLen):
+                max_length = m.max_length
+        words = " ".join(self.rng.choice(_WORDS) for _ in range(self.rng.randint(8, 30)))
+        while len(words) < min_length:
+            words += " " + self.rng.choice(_WORDS)
+        return words[:max_length].strip() if max_length else words
+
+
+def get_llm_backend_name() -> str:
+    """LLM_BACKEND: openai (default) or simulated."""
+    return (os.getenv("LLM_BACKEND") or "openai").lower()
+
+
+_default_simulated: SimulatedBackend | None = None
+_default_simulated_lock = threading.Lock()
+
+
+def get_default_llm_backend(open_ai_client: OpenAI | None,
+                            async_open_ai_client: AsyncOpenAI | None = None) -> LLMBackend:
+    """OpenAIBackend on the given clients, or with LLM_BACKEND=simulated the process-wide SimulatedBackend.
+
+    The simulated backend reads LLM_SIM_LATENCY ("kind:median[:sigma]", default
+    lognormal:1.0:0.5), LLM_SIM_FAILURE_RATE (default 0) and LLM_SIM_SEED (default 0).
+    """
+    global _default_simulated
+    backend = get_llm_backend_name()
+    if backend == "openai":
+        return OpenAIBackend(open_ai_client, async_open_ai_client)
+    if backend != "simulated":
+        raise ValueError(f"Unknown LLM_BACKEND: {backend}")
+    with _default_simulated_lock:
+        if _default_simulated is None:
+            _default_simulated = SimulatedBackend(
+                latency=LatencyDistribution.parse(os.getenv("LLM_SIM_LATENCY") or "lognormal:1.0:0.5"),
+                failure_rate=float(os.getenv("LLM_SIM_FAILURE_RATE") or 0),
+                seed=int(os.getenv("LLM_SIM_SEED") or 0),
+            )
+            print("LLM backend: simulated")
+        return _default_simulated
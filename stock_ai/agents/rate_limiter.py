@@ -0,0 +1,42 @@
+"""Token bucket limiter for OpenAI requests per minute and tokens per minute.
+
+One limiter is shared by every agent in the process, sync and async. A call
+reserves one request and its estimated tokens up front and then waits until
+both buckets have refilled enough, so callers above the limit queue up in the
+order they arrived instead of failing with 429s. The token reservation is
+corrected with the real usage once the response is back.
+"""
+
+import os
+import threading
+
+from stock_ai.workflows.common.token_bucket import TokenBucketLimiter
+
+# reasoning and web search make the output side hard to guess, err on the high side
+DEFAULT_OUTPUT_TOKENS_ESTIMATE = 4000
+
+
+def estimate_tokens(*texts: str, output_tokens: int = DEFAULT_OUTPUT_TOKENS_ESTIMATE) -> int:
+    """Rough token count of a request: ~4 characters per input token plus the expected output."""
+    return sum(len(t) for t in texts) // 4 + output_tokens
+
+
+_default_limiter: TokenBucketLimiter | None = None
+_default_limiter_lock = threading.Lock()
+
+
+def get_default_rate_limiter() -> TokenBucketLimiter | None:
+    """Process-wide limiter from OPENAI_RPM_LIMIT (default 500) and OPENAI_TPM_LIMIT (default 500000).
+
+    Set them to the limits of the account's usage tier; OPENAI_RATE_LIMIT=0 disables limiting.
+    """
+    global _default_limiter
+    if os.getenv("OPENAI_RATE_LIMIT", "1") == "0":
+        return None
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            _default_limiter = TokenBucketLimiter(
+                requests_per_minute=float(os.getenv("OPENAI_RPM_LIMIT") or 500),
+                tokens_per_minute=float(os.getenv("OPENAI_TPM_LIMIT") or 500_000),
+            )
+        return _default_limiter
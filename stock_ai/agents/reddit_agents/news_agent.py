@@ -5,8 +5,8 @@ import json
 
 
 class NewsAgent(RedditBaseAgent):
-    def __init__(self, open_ai_client: OpenAI):
-        super().__init__(open_ai_client)
+    def __init__(self, open_ai_client: OpenAI, **kwargs):
+        super().__init__(open_ai_client, **kwargs)
 
     @property
     def system_prompt(self) -> str:
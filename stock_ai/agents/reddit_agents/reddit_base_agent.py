@@ -1,7 +1,8 @@
 from stock_ai.agents.base_agent import BaseAgent
+from stock_ai.agents.batch_runner import OpenAIBatchRunner
+from stock_ai.agents.rate_limiter import estimate_tokens
 from stock_ai.reddit.types import RedditPost
 from stock_ai.agents.reddit_agents.pydantic_models import StockRecommendation, StockRecommendations
-import time
 
 class RedditBaseAgent(BaseAgent):
     """Base class for agents that analyze Reddit posts and provide stock recommendations.
@@ -21,40 +22,78 @@ If data is not available, continue with qualitative reasoning.
 - If you pick a ticker that was indirectly mentioned (e.g., a supplier or competitor), clearly explain the linkage in the reason.
 - Explicitly specify the catalyst (e.g., “FDA approval of new product X” or “Q3 revenue beat and guidance raise”)."""
 
+    # appended to the user prompt when several posts are analyzed in one call
+    MULTI_POST_PROMPT: str = """# Multiple posts
+- The ITEMS are independent posts. Analyze each one on its own.
+- Set reddit_post_url of every recommendation to the post_url of the item it is based on.
+- A ticker found in several items gets one recommendation per item."""
+
+    REASONING = {"effort": "medium"}
+    # include=["web_search_call.action.sources"],
+    TOOLS = [{"type": "web_search"}]
+
     def act(self, posts: list[RedditPost]) -> StockRecommendations:
         agent_cls_name = self.__class__.__name__
-        print(f"{agent_cls_name} acting on posts...")
+        print(f"{agent_cls_name} acting on {len(posts)} posts...")
+        user_prompt = self._posts_prompt(posts)
+        result = self._parse(user_prompt, StockRecommendations, reasoning=self.REASONING, tools=self.TOOLS)
+        return result
+
+    async def aact(self, posts: list[RedditPost]) -> StockRecommendations:
+        print(f"{self.__class__.__name__} acting on {len(posts)} posts (async)...")
+        user_prompt = self._posts_prompt(posts)
+        return await self._aparse(user_prompt, StockRecommendations, reasoning=self.REASONING, tools=self.TOOLS)
+
+    def act_batch(self, post_groups: list[list[RedditPost]],
+                  runner: OpenAIBatchRunner) -> list[StockRecommendations | Exception]:
+        """act for every group of posts, submitted together as one OpenAI batch. Results in group order."""
+        print(f"{self.__class__.__name__} batching {len(post_groups)} calls...")
+        prompts = {str(i): self._posts_prompt(posts) for i, posts in enumerate(post_groups)}
+        results = self._parse_batch(prompts, StockRecommendations, runner, reasoning=self.REASONING, tools=self.TOOLS)
+        return [results[str(i)] for i in range(len(post_groups))]
+
+    def _posts_prompt(self, posts: list[RedditPost]) -> str:
         user_prompt = self.user_prompt(posts)
-        start = time.perf_counter()
-        resp = self.open_ai_client.responses.parse(
-            model="gpt-5",
-            instructions=self.system_prompt,
-            input=user_prompt,
-            text_format=StockRecommendations,
-            reasoning={"effort": "medium"},
-            # include=["web_search_call.action.sources"],
-            tools=[{"type": "web_search"}],
-        )
-        end = time.perf_counter()
-        print(f"{agent_cls_name} act() completed in {end - start:.2f} seconds.")
-        # print(resp.output)
+        if len(posts) > 1:
+            user_prompt += "\n\n" + self.MULTI_POST_PROMPT
+        return user_prompt
 
-        # print(f"\nWeb Searches Performed:")
-        # web_searches = [item for item in resp.output if item.type == 'web_search_call']
-        # for i, search in enumerate(web_searches, 1):
-        #     print(f"\n  Search {i}:")
-        #     print(f"    Query: {search.action.query}")
-        #     print(f"    Status: {search.status}")
-        #     if hasattr(search.action, 'sources') and search.action.sources:
-        #         print(f"    Sources: {len(search.action.sources)}")
-        #         for src in search.action.sources:
-        #             print(f"      - {src.url}")
+    def pack_posts(self, posts: list[RedditPost], token_budget: int, max_posts: int) -> list[list[RedditPost]]:
+        """Group posts, in order, into batches whose user prompt fits token_budget (estimated)
+        and that hold at most max_posts. A post over the budget on its own gets its own batch.
+        """
+        batches: list[list[RedditPost]] = []
+        batch: list[RedditPost] = []
+        batch_tokens = 0
+        for p in posts:
+            tokens = estimate_tokens(self.user_prompt([p]), output_tokens=0)
+            if batch and (batch_tokens + tokens > token_budget or len(batch) >= max_posts):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            batch.append(p)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
 
-        result = resp.output_parsed
-        if not result:
-            raise ValueError(f"{agent_cls_name} result failed to parse")
+    def split_by_post(self, result: StockRecommendations, posts: list[RedditPost]) -> dict[str, StockRecommendations]:
+        """Recommendations of a multi-post call per reddit_id, matched on reddit_post_url.
 
-        return result
+        With a single post every recommendation belongs to it. Recommendations
+        that point to none of the posts are dropped.
+        """
+        by_post = {p.reddit_id: StockRecommendations(recommendations=[]) for p in posts}
+        if len(posts) == 1:
+            by_post[posts[0].reddit_id].recommendations.extend(result.recommendations)
+            return by_post
+        by_url = {_normalize_url(p.url): p.reddit_id for p in posts}
+        for rec in result.recommendations:
+            reddit_id = by_url.get(_normalize_url(rec.reddit_post_url or ""))
+            if reddit_id is None:
+                print(f"{self.__class__.__name__}: dropping {rec.ticker}, unknown reddit_post_url {rec.reddit_post_url!r}")
+                continue
+            by_post[reddit_id].recommendations.append(rec)
+        return by_post
 
     def evaluate(self, result: StockRecommendations, actual_reddit_post_url: str) -> StockRecommendations:
         out = StockRecommendations(recommendations=[])
@@ -67,4 +106,8 @@ If data is not available, continue with qualitative reasoning.
                 reddit_post_url=actual_reddit_post_url
             )
             out.recommendations.append(rec_copy)
-        return out
\ No newline at end of file
+        return out
+
+
+def _normalize_url(url: str) -> str:
+    return url.strip().rstrip("/").lower()
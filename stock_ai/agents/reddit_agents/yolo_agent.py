@@ -4,8 +4,8 @@ from stock_ai.agents.reddit_agents.reddit_base_agent import RedditBaseAgent
 import json
 
 class YoloAgent(RedditBaseAgent):
-    def __init__(self, open_ai_client: OpenAI):
-        super().__init__(open_ai_client)
+    def __init__(self, open_ai_client: OpenAI, **kwargs):
+        super().__init__(open_ai_client, **kwargs)
 
     @property
     def system_prompt(self) -> str:
@@ -0,0 +1,235 @@
+"""Retries with backoff, deadlines and hedged requests for agent calls.
+
+call_with_retries / acall_with_retries run an attempt function until it
+succeeds, the error is not transient, the attempts run out, or the call's
+deadline passes. Waits between attempts use exponential backoff with full
+jitter. Each attempt gets the time left until the deadline as its timeout.
+
+Hedging: once enough latencies of an agent have been seen, an attempt still
+running after their `hedge_percentile` gets a duplicate request, and the
+first of the two to succeed wins. It trims the slow tail at the cost of a few
+extra requests.
+"""
+
+import asyncio
+import concurrent.futures as cf
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import TypeVar
+
+import openai
+import pydantic
+
+T = TypeVar("T")
+
+_hedge_pool = cf.ThreadPoolExecutor(max_workers=8, thread_name_prefix="agent-hedge")
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 4
+    base_delay: float = 1.0  # seconds, doubled every attempt
+    max_delay: float = 30.0
+    deadline: float | None = None  # seconds for the whole call, all attempts included
+    hedge_percentile: float | None = None  # e.g. 0.95, None disables hedging
+    hedge_min_samples: int = 20
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        """AGENT_RETRY_ATTEMPTS, AGENT_RETRY_BASE_DELAY, AGENT_CALL_DEADLINE_SECONDS, AGENT_HEDGE_PERCENTILE."""
+        deadline = os.getenv("AGENT_CALL_DEADLINE_SECONDS")
+        hedge = os.getenv("AGENT_HEDGE_PERCENTILE")
+        return cls(
+            max_attempts=int(os.getenv("AGENT_RETRY_ATTEMPTS") or 4),
+            base_delay=float(os.getenv("AGENT_RETRY_BASE_DELAY") or 1.0),
+            deadline=float(deadline) if deadline else None,
+            hedge_percentile=float(hedge) if hedge else None,
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: uniform in [0, min(max_delay, base_delay * 2^attempt)]."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class LatencyTracker:
+    """Latencies of the last `size` successful attempts. Thread-safe."""
+
+    def __init__(self, size: int = 200):
+        self._samples: deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float, min_samples: int) -> float | None:
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+class UnparseableResponseError(ValueError):
+    """The model's response didn't parse into the requested output schema."""
+
+
+def is_transient(e: BaseException) -> bool:
+    """Errors worth retrying: timeouts, connection errors, 408/409/429 and 5xx, unparseable output."""
+    if isinstance(e, (openai.APITimeoutError, openai.APIConnectionError, TimeoutError)):
+        return True
+    if isinstance(e, openai.APIStatusError):
+        return e.status_code in (408, 409, 429) or e.status_code >= 500
+    # the model returned something that doesn't parse into the schema, a new sample usually does;
+    # other ValueErrors are configuration or programming errors a retry won't fix
+    return isinstance(e, (UnparseableResponseError, pydantic.ValidationError))
+
+
+def call_with_retries(attempt: Callable[[float | None], T], policy: RetryPolicy,
+                      latencies: LatencyTracker | None = None, name: str = "call") -> T:
+    """Run attempt(timeout) with retries. timeout is the time left until the deadline (None without one)."""
+    deadline = time.monotonic() + policy.deadline if policy.deadline else None
+    for n in range(policy.max_attempts):
+        timeout = _remaining(deadline)
+        try:
+            return _hedged(attempt, timeout, policy, latencies)
+        except Exception as e:
+            delay = _next_delay(e, n, policy, deadline, name)
+            if delay is None:
+                raise
+            time.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+async def acall_with_retries(attempt: Callable[[float | None], Awaitable[T]], policy: RetryPolicy,
+                             latencies: LatencyTracker | None = None, name: str = "call") -> T:
+    """Async call_with_retries; the deadline also cancels a running attempt."""
+    deadline = time.monotonic() + policy.deadline if policy.deadline else None
+    for n in range(policy.max_attempts):
+        timeout = _remaining(deadline)
+        try:
+            return await asyncio.wait_for(_ahedged(attempt, timeout, policy, latencies), timeout)
+        except Exception as e:
+            delay = _next_delay(e, n, policy, deadline, name)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+def _remaining(deadline: float | None) -> float | None:
+    if deadline is None:
+        return None
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("call deadline exceeded")
+    return remaining
+
+
+def _next_delay(e: Exception, n: int, policy: RetryPolicy, deadline: float | None, name: str) -> float | None:
+    """Seconds to wait before retrying after error e, None to give up and raise it."""
+    if not is_transient(e) or n + 1 >= policy.max_attempts:
+        return None
+    delay = policy.backoff(n)
+    if deadline is not None and time.monotonic() + delay >= deadline:
+        return None
+    print(f"[retry] {name} attempt {n + 1} failed ({type(e).__name__}: {e}), retrying in {delay:.1f}s")
+    return delay
+
+
+def _hedge_after(policy: RetryPolicy, latencies: LatencyTracker | None) -> float | None:
+    if policy.hedge_percentile is None or latencies is None:
+        return None
+    return latencies.percentile(policy.hedge_percentile, policy.hedge_min_samples)
+
+
+def _timed(attempt: Callable[[float | None], T], timeout: float | None, latencies: LatencyTracker | None) -> T:
+    start = time.perf_counter()
+    result = attempt(timeout)
+    if latencies is not None:
+        latencies.record(time.perf_counter() - start)
+    return result
+
+
+def _hedged(attempt: Callable[[float | None], T], timeout: float | None, policy: RetryPolicy,
+            latencies: LatencyTracker | None) -> T:
+    hedge_after = _hedge_after(policy, latencies)
+    if hedge_after is None or (timeout is not None and hedge_after >= timeout):
+        return _timed(attempt, timeout, latencies)
+
+    # each attempt records its external call in the caller's trace span
+    primary = _hedge_pool.submit(contextvars.copy_context().run, _timed, attempt, timeout, latencies)
+    try:
+        return primary.result(timeout=hedge_after)
+    except cf.TimeoutError:
+        pass
+    print(f"[hedge] no response after {hedge_after:.1f}s, sending a duplicate request")
+    backup = _hedge_pool.submit(contextvars.copy_context().run, _timed, attempt,
+                                _remaining_from(timeout, hedge_after), latencies)
+    pending = {primary, backup}
+    error = None
+    while pending:
+        done, pending = cf.wait(pending, return_when=cf.FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                # the loser can't be interrupted, its result is dropped
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+async def _ahedged(attempt: Callable[[float | None], Awaitable[T]], timeout: float | None, policy: RetryPolicy,
+                   latencies: LatencyTracker | None) -> T:
+    async def timed(t: float | None) -> T:
+        start = time.perf_counter()
+        result = await attempt(t)
+        if latencies is not None:
+            latencies.record(time.perf_counter() - start)
+        return result
+
+    hedge_after = _hedge_after(policy, latencies)
+    if hedge_after is None or (timeout is not None and hedge_after >= timeout):
+        return await timed(timeout)
+
+    primary = asyncio.ensure_future(timed(timeout))
+    done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+    if done:
+        return primary.result()
+    print(f"[hedge] no response after {hedge_after:.1f}s, sending a duplicate request")
+    backup = asyncio.ensure_future(timed(_remaining_from(timeout, hedge_after)))
+    pending = {primary, backup}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def _remaining_from(timeout: float | None, elapsed: float) -> float | None:
+    return None if timeout is None else max(0.001, timeout - elapsed)
+
+
+_trackers: dict[str, LatencyTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def get_latency_tracker(name: str) -> LatencyTracker:
+    """Process-wide latencies per name (the agent class), shared by its instances."""
+    with _trackers_lock:
+        tracker = _trackers.get(name)
+        if tracker is None:
+            tracker = _trackers[name] = LatencyTracker()
+        return tracker
@@ -0,0 +1,223 @@
+"""Content-addressed cache of parsed LLM responses.
+
+The key is a hash of everything that determines a responses.parse call: model,
+instructions, input, the text_format JSON schema, reasoning settings and tools.
+Values are stored as the JSON of the parsed pydantic object and validated back
+into the text_format model on a hit.
+
+Backends:
+- InMemoryResponseCache: LRU bounded by max_entries, per process.
+- SqlResponseCache: the llm_responses table, in a local SQLite file or in the
+  app database (Postgres).
+
+The cache is opt-in, see get_default_response_cache.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any
+
+from pydantic import BaseModel
+from sqlalchemy import Engine, create_engine, delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from stock_ai.db.models.llm_response import LlmResponse
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+
+def cache_key(model: str, instructions: str, input: Any, text_format: type[BaseModel],
+              reasoning: dict | None = None, tools: list[dict] | None = None) -> str:
+    """sha256 over the canonical JSON of the request parameters."""
+    payload = {
+        "model": model,
+        "instructions": instructions,
+        "input": input,
+        "text_format": {"name": text_format.__name__, "schema": text_format.model_json_schema()},
+        "reasoning": reasoning,
+        "tools": tools,
+    }
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache(ABC):
+    """Parsed responses by cache_key. Implementations must be thread-safe."""
+
+    def __init__(self, ttl_seconds: float | None = DEFAULT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, text_format: type[BaseModel]) -> BaseModel | None:
+        raw = self._get(key)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return text_format.model_validate_json(raw)
+
+    def set(self, key: str, value: BaseModel) -> None:
+        self._set(key, value.model_dump_json())
+
+    def _expires_at(self) -> datetime | None:
+        if self.ttl_seconds is None:
+            return None
+        return datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+
+    @abstractmethod
+    def _get(self, key: str) -> str | None:
+        """Stored JSON for key, None if missing or expired."""
+        pass
+
+    @abstractmethod
+    def _set(self, key: str, raw: str) -> None:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+
+class InMemoryResponseCache(ResponseCache):
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float | None = DEFAULT_TTL_SECONDS):
+        super().__init__(ttl_seconds)
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[str, datetime | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            raw, expires_at = entry
+            if expires_at is not None and expires_at <= datetime.utcnow():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return raw
+
+    def _set(self, key: str, raw: str) -> None:
+        with self._lock:
+            self._entries[key] = (raw, self._expires_at())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SqlResponseCache(ResponseCache):
+    """llm_responses table on the given engine.
+
+    Expired rows are deleted every `purge_every` writes, and the least recently
+    used rows above max_entries (if set) with them.
+    """
+
+    def __init__(self, engine: Engine, max_entries: int | None = None,
+                 ttl_seconds: float | None = DEFAULT_TTL_SECONDS, create_table: bool = False, purge_every: int = 100):
+        super().__init__(ttl_seconds)
+        self.engine = engine
+        self.max_entries = max_entries
+        self.purge_every = purge_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._table = LlmResponse.__table__
+        if create_table:
+            # the app database gets the table from alembic, a local SQLite file needs it created here
+            self._table.create(engine, checkfirst=True)
+
+    def _get(self, key: str) -> str | None:
+        t = self._table
+        now = datetime.utcnow()
+        with self.engine.begin() as conn:
+            row = conn.execute(select(t.c.response, t.c.expires_at).where(t.c.key == key)).first()
+            if row is None:
+                return None
+            if row.expires_at is not None and row.expires_at <= now:
+                conn.execute(delete(t).where(t.c.key == key))
+                return None
+            conn.execute(t.update().where(t.c.key == key).values(last_used_at=now))
+            return row.response
+
+    def _set(self, key: str, raw: str) -> None:
+        t = self._table
+        now = datetime.utcnow()
+        dialect_insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(self.engine.dialect.name)
+        if dialect_insert is None:
+            raise ValueError(f"SqlResponseCache does not support {self.engine.dialect.name}")
+        stmt = dialect_insert(t).values(key=key, response=raw, created_at=now, last_used_at=now,
+                                        expires_at=self._expires_at())
+        # one statement, two agents storing the same key can't both insert it
+        stmt = stmt.on_conflict_do_update(index_elements=[t.c.key], set_={
+            "response": stmt.excluded.response, "created_at": stmt.excluded.created_at,
+            "last_used_at": stmt.excluded.last_used_at, "expires_at": stmt.excluded.expires_at})
+        with self.engine.begin() as conn:
+            conn.execute(stmt)
+        with self._lock:
+            self._writes += 1
+            purge = self._writes % self.purge_every == 0
+        if purge:
+            self.purge()
+
+    def purge(self) -> int:
+        """Delete expired rows and the least recently used ones above max_entries. Returns rows deleted."""
+        t = self._table
+        with self.engine.begin() as conn:
+            deleted = conn.execute(delete(t).where(t.c.expires_at <= datetime.utcnow())).rowcount
+            if self.max_entries is not None:
+                count = conn.execute(select(func.count()).select_from(t)).scalar_one()
+                if count > self.max_entries:
+                    oldest = select(t.c.key).order_by(t.c.last_used_at).limit(count - self.max_entries)
+                    deleted += conn.execute(delete(t).where(t.c.key.in_(oldest.scalar_subquery()))).rowcount
+        return deleted
+
+    def clear(self) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(delete(self._table))
+
+
+_default_cache: ResponseCache | None = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_response_cache() -> ResponseCache | None:
+    """Cache selected by LLM_CACHE: unset/off (default, no caching), memory, sqlite or postgres.
+
+    LLM_CACHE_TTL_SECONDS (default 7 days, 0 for no expiry) and
+    LLM_CACHE_MAX_ENTRIES (default 1024 for memory, unbounded otherwise) apply
+    to all backends. sqlite uses the file LLM_CACHE_PATH (default
+    .cache/llm_responses.sqlite); postgres uses the app database.
+    """
+    global _default_cache
+    backend = (os.getenv("LLM_CACHE") or "off").lower()
+    if backend in ("off", "0", ""):
+        return None
+    with _default_cache_lock:
+        if _default_cache is not None:
+            return _default_cache
+        ttl = float(os.getenv("LLM_CACHE_TTL_SECONDS") or DEFAULT_TTL_SECONDS) or None
+        max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES") or 0) or None
+        if backend == "memory":
+            _default_cache = InMemoryResponseCache(max_entries=max_entries or 1024, ttl_seconds=ttl)
+        elif backend == "sqlite":
+            path = os.getenv("LLM_CACHE_PATH") or ".cache/llm_responses.sqlite"
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            _default_cache = SqlResponseCache(create_engine(f"sqlite:///{path}"), max_entries=max_entries,
+                                              ttl_seconds=ttl, create_table=True)
+        elif backend == "postgres":
+            from stock_ai.db.session import _get_engine
+
+            _default_cache = SqlResponseCache(_get_engine(), max_entries=max_entries, ttl_seconds=ttl)
+        else:
+            raise ValueError(f"Unknown LLM_CACHE backend: {backend}")
+        print(f"LLM response cache: {backend}")
+        return _default_cache
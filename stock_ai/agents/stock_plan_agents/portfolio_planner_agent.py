@@ -1,4 +1,4 @@
-import os, json, time
+import os, json
 
 from stock_ai.agents.base_agent import BaseAgent
 from stock_ai.agents.stock_plan_agents.pydantic_models import TradePlans
@@ -55,32 +55,30 @@ produce practical one trade plan for each candidate with entries, stops, take-pr
         print(f"{agent_cls} generating trade plans...")
         user = self.user_prompt(ticker_snapshots)
 
-        start = time.perf_counter()
-        resp = self.open_ai_client.responses.parse(
-            model="gpt-5",
-            instructions=self.system_prompt,
-            input=user,
-            text_format=TradePlans,
-            reasoning={"effort": "medium"},
-        )
-        end = time.perf_counter()
-        print(f"{agent_cls} completed in {end - start:.2f}s")
-
-        result = resp.output_parsed
-        if not result:
-            raise ValueError(f"{agent_cls} result failed to parse")
+        result = self._parse(user, TradePlans, reasoning={"effort": "medium"})
         
         # a fallback in case the LLM returns multiple plans for the same ticker
         if remove_dup_tickers:
-            seen = set()
-            unique_plans = []
-            for plan in result.plans:
-                if plan.ticker not in seen:
-                    seen.add(plan.ticker)
-                    unique_plans.append(plan)
-            result.plans = unique_plans
+            self._remove_dup_tickers(result)
 
         return result
+
+    async def aact(self, ticker_snapshots: list[StockSnapshot], remove_dup_tickers: bool = True) -> TradePlans:
+        print(f"{self.__class__.__name__} generating trade plans (async)...")
+        user = self.user_prompt(ticker_snapshots)
+        result = await self._aparse(user, TradePlans, reasoning={"effort": "medium"})
+        if remove_dup_tickers:
+            self._remove_dup_tickers(result)
+        return result
+
+    def _remove_dup_tickers(self, result: TradePlans) -> None:
+        seen = set()
+        unique_plans = []
+        for plan in result.plans:
+            if plan.ticker not in seen:
+                seen.add(plan.ticker)
+                unique_plans.append(plan)
+        result.plans = unique_plans
     
     def evaluate(self, result: TradePlans, **kwargs) -> TradePlans:
         return result
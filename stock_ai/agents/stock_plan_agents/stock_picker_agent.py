@@ -1,4 +1,4 @@
-import os, json, time
+import os, json
 
 from stock_ai.agents.base_agent import BaseAgent
 from stock_ai.agents.reddit_agents.data_classes import StockRecommendation
@@ -88,23 +88,15 @@ When reviewing each recommendation, assess:
         print(f"{agent_cls} selecting top stocks from {len(recommendations)} recommendations...")
         user = self.user_prompt(recommendations)
 
-        start = time.perf_counter()
-        resp = self.open_ai_client.responses.parse(
-            model="gpt-5",
-            instructions=self.system_prompt,
-            input=user,
-            text_format=StockRecommendationTickerList,
-            reasoning={"effort": "high"},
-        )
-        end = time.perf_counter()
-        print(f"{agent_cls} completed in {end - start:.2f}s")
-
-        result = resp.output_parsed
-        if not result:
-            raise ValueError(f"{agent_cls} result failed to parse")
+        result = self._parse(user, StockRecommendationTickerList, reasoning={"effort": "high"})
 
         return result
 
+    async def aact(self, recommendations: list[StockRecommendation]) -> StockRecommendationTickerList:
+        print(f"{self.__class__.__name__} selecting top stocks from {len(recommendations)} recommendations (async)...")
+        user = self.user_prompt(recommendations)
+        return await self._aparse(user, StockRecommendationTickerList, reasoning={"effort": "high"})
+
     def evaluate(self, result: list[str], valid_tickers: list[str]) -> bool:
         """
         Validate the stock picker results.
@@ -1,5 +1,4 @@
 import json
-import time
 from stock_ai.agents.base_agent import BaseAgent
 from stock_ai.agents.trade_agents.pydantic_models import TradeDecisions
 
@@ -139,20 +138,25 @@ Consider both new recommendations and existing positions.
 
         user_prompt = self.user_prompt(recommendations, prices, portfolio_cash, existing_positions)
 
-        start = time.perf_counter()
-        resp = self.open_ai_client.responses.parse(
-            model="gpt-5",
-            instructions=self.system_prompt,
-            input=user_prompt,
-            text_format=TradeDecisions,
-            reasoning={"effort": "medium"},
-        )
-        end = time.perf_counter()
-        print(f"{agent_cls} completed in {end - start:.2f}s")
-
-        result = resp.output_parsed
-        if not result:
-            raise ValueError(f"{agent_cls} result failed to parse")
+        result = self._parse(user_prompt, TradeDecisions, reasoning={"effort": "medium"})
+
+        print(f"{agent_cls} generated {len(result.decisions)} trade decisions")
+        return result
+
+    async def aact(
+        self,
+        recommendations: list[dict],
+        prices: dict[str, float],
+        portfolio_cash: float,
+        existing_positions: list[dict]
+    ) -> TradeDecisions:
+        """Async act, same inputs and result."""
+        agent_cls = self.__class__.__name__
+        print(f"{agent_cls} analyzing portfolio and generating trade decisions (async)...")
+
+        user_prompt = self.user_prompt(recommendations, prices, portfolio_cash, existing_positions)
+
+        result = await self._aparse(user_prompt, TradeDecisions, reasoning={"effort": "medium"})
 
         print(f"{agent_cls} generated {len(result.decisions)} trade decisions")
         return result
@@ -11,4 +11,9 @@ from stock_ai.db.models.trade.portfolio import Portfolio
 from stock_ai.db.models.trade.position import Position
 from stock_ai.db.models.trade.trade import Trade
 from stock_ai.db.models.trade.performance_snapshot import PerformanceSnapshot
-from stock_ai.db.models.trade.trade_input import TradeInput
\ No newline at end of file
+from stock_ai.db.models.trade.trade_input import TradeInput
+from stock_ai.db.models.run_metric import RunMetric
+from stock_ai.db.models.step_checkpoint import StepCheckpoint
+from stock_ai.db.models.indicator_state import IndicatorState
+from stock_ai.db.models.llm_response import LlmResponse
+from stock_ai.db.models.reddit_cursor import RedditCursor
@@ -0,0 +1,25 @@
+"""Database model for Indicator States."""
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from stock_ai.db.base import Base
+
+
+class IndicatorState(Base):
+    """Incremental indicator state of a ticker (see stock_ai.yahoo_finance.indicator_state).
+
+    One row per ticker, updated in place by every run that takes a snapshot of it,
+    so the next run only has to apply the bars after last_date.
+    """
+
+    __tablename__ = "indicator_states"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    ticker: Mapped[str] = mapped_column(String, nullable=False, unique=True)
+    last_date: Mapped[str] = mapped_column(String, nullable=False)  # ISO date of the last bar in the state
+    state: Mapped[str] = mapped_column(Text, nullable=False)  # IndicatorState.to_json()
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
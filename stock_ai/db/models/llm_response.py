@@ -0,0 +1,20 @@
+"""Database model for cached LLM responses."""
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from stock_ai.db.base import Base
+
+
+class LlmResponse(Base):
+    """A parsed agent response, keyed by the hash of its request (see stock_ai.agents.response_cache)."""
+
+    __tablename__ = "llm_responses"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)  # sha256 hex of the request
+    response: Mapped[str] = mapped_column(Text, nullable=False)  # JSON of the parsed pydantic object
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+    last_used_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    expires_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, index=True)
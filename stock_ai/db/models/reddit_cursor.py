@@ -0,0 +1,25 @@
+"""Database model for Reddit scrape cursors."""
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, Float, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from stock_ai.db.base import Base
+
+
+class RedditCursor(Base):
+    """High-water mark of the `new` listing of a subreddit (see RedditScraper.scrape_since).
+
+    One row per subreddit, updated in place by every incremental scrape, so the
+    next one stops at the first post it has already seen.
+    """
+
+    __tablename__ = "reddit_cursors"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    subreddit: Mapped[str] = mapped_column(String, nullable=False, unique=True)
+    created_utc: Mapped[float] = mapped_column(Float, nullable=False)  # of the newest post seen
+    reddit_id: Mapped[str] = mapped_column(String, nullable=False)  # id of the newest post seen
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
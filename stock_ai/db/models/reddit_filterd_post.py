@@ -18,5 +18,6 @@ class RedditFilteredPost(Base):
     upvote_ratio: Mapped[float] = mapped_column(Float)
     created: Mapped[datetime] = mapped_column(DateTime)
     url: Mapped[str] = mapped_column(String)
+    subreddit: Mapped[str] = mapped_column(String, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
\ No newline at end of file
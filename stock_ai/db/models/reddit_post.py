@@ -2,10 +2,12 @@ from datetime import datetime
 from stock_ai.db.base import Base
 
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import Identity, String, Text, Integer, Float, DateTime
+from sqlalchemy import Identity, Index, String, Text, Integer, Float, DateTime
 
 class RedditPost(Base):
     __tablename__ = "reddit_posts"
+    # the latest run's posts of a subreddit, see _stored_posts in reddit_stock_workflow
+    __table_args__ = (Index("ix_reddit_posts_subreddit_id", "subreddit", "id"),)
 
     id: Mapped[int] = mapped_column(Integer, Identity(), primary_key=True)
     run_id: Mapped[str] = mapped_column(String, index=True)
@@ -18,5 +20,6 @@ class RedditPost(Base):
     upvote_ratio: Mapped[float] = mapped_column(Float)
     created: Mapped[datetime] = mapped_column(DateTime)
     url: Mapped[str] = mapped_column(String)
+    subreddit: Mapped[str] = mapped_column(String, nullable=True)  # of the source that scraped it
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
\ No newline at end of file
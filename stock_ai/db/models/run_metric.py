@@ -0,0 +1,37 @@
+"""Database model for Run Metrics."""
+
+from datetime import datetime
+
+from sqlalchemy import JSON, Boolean, DateTime, Float, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from stock_ai.db.base import Base
+
+
+class RunMetric(Base):
+    """One timing span recorded by the workflow engine.
+
+    Every step, factory and StepFn of a run gets a row, linked to its parent
+    step through parent_span_id.
+    """
+
+    __tablename__ = "run_metrics"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    run_id: Mapped[str] = mapped_column(String, nullable=False, index=True)
+    span_id: Mapped[str] = mapped_column(String, nullable=False)
+    parent_span_id: Mapped[str] = mapped_column(String, nullable=True)
+    name: Mapped[str] = mapped_column(String, nullable=False)
+    kind: Mapped[str] = mapped_column(String, nullable=False)  # step, factory, step_fn
+    step: Mapped[str] = mapped_column(String, nullable=False)
+    start_time: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    end_time: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    duration_ms: Mapped[float] = mapped_column(Float, nullable=True)
+    thread: Mapped[str] = mapped_column(String, nullable=True)
+    success: Mapped[bool] = mapped_column(Boolean, nullable=True)
+    error: Mapped[str] = mapped_column(Text, nullable=True)
+    rows_read: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    rows_written: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    external_calls: Mapped[dict] = mapped_column(JSON, nullable=False)  # service -> number of calls
+    attributes: Mapped[dict] = mapped_column(JSON, nullable=False)  # e.g. reddit_id of a per-post StepFn
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,25 @@
+"""Database model for Step Checkpoints."""
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from stock_ai.db.base import Base
+
+
+class StepCheckpoint(Base):
+    """A finished unit of work inside a step, e.g. one agent call for one Reddit post.
+
+    A resumed run skips the work units that already have a checkpoint instead of
+    skipping or redoing the whole step.
+    """
+
+    __tablename__ = "step_checkpoints"
+    __table_args__ = (UniqueConstraint("run_id", "step", "work_unit"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    run_id: Mapped[str] = mapped_column(String, nullable=False, index=True)
+    step: Mapped[str] = mapped_column(String, nullable=False)  # e.g. "News agent"
+    work_unit: Mapped[str] = mapped_column(String, nullable=False)  # e.g. reddit_id of the post
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
@@ -1,7 +1,11 @@
 import os
+import threading
+import time
 from contextlib import contextmanager
-from sqlalchemy import create_engine
+from dataclasses import dataclass
+from sqlalchemy import URL, create_engine, event, exc, make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, QueuePool
 
 
 # Global variables to hold engine and session factory
@@ -9,27 +13,204 @@ _engine = None
 _SessionLocal = None
 
 
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return value.lower() in ("1", "true", "yes")
+
+
+def _env_int(name: str, default: int | None) -> int | None:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+@dataclass
+class EngineConfig:
+    """Connection pool and engine settings, read from env by from_env().
+
+    pgbouncer: set when DATABASE_URL points at a transaction-mode pooler (e.g. PgBouncer,
+        Supabase port 6543). The pooler owns the pooling, so the engine opens a connection
+        per checkout (NullPool), and the statement timeout is set per transaction instead
+        of per connection, since session state does not survive between transactions.
+    """
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: int = 30  # seconds to wait for a free connection before failing
+    pool_pre_ping: bool = True
+    pool_recycle: int = 1800  # seconds, recycle before Supabase/PgBouncer drops idle connections
+    statement_timeout_ms: int | None = None
+    # psycopg2 only, "values_plus_batch" also pages executemany UPDATE/DELETE (update_many)
+    # instead of one round trip per row; "values_only" is the SQLAlchemy default
+    executemany_mode: str | None = "values_plus_batch"
+    pgbouncer: bool = False
+
+    @classmethod
+    def from_env(cls) -> "EngineConfig":
+        default = cls()
+        return cls(
+            pool_size=_env_int("DB_POOL_SIZE", default.pool_size),
+            max_overflow=_env_int("DB_MAX_OVERFLOW", default.max_overflow),
+            pool_timeout=_env_int("DB_POOL_TIMEOUT", default.pool_timeout),
+            pool_pre_ping=_env_bool("DB_POOL_PRE_PING", default.pool_pre_ping),
+            pool_recycle=_env_int("DB_POOL_RECYCLE", default.pool_recycle),
+            statement_timeout_ms=_env_int("DB_STATEMENT_TIMEOUT_MS", default.statement_timeout_ms),
+            executemany_mode=os.getenv("DB_EXECUTEMANY_MODE") or default.executemany_mode,
+            pgbouncer=_env_bool("DB_PGBOUNCER", default.pgbouncer),
+        )
+
+
+_config: EngineConfig | None = None
+
+
+@dataclass
+class PoolMetrics:
+    """Connection pool counters since the engine was created.
+
+    A checkout is a hit when it reuses a pooled connection and a miss when it has
+    to open a new one.
+    """
+    checkouts: int = 0
+    misses: int = 0
+    timeouts: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    status: str = ""
+
+    @property
+    def hits(self) -> int:
+        return self.checkouts - self.misses
+
+    @property
+    def avg_wait_ms(self) -> float:
+        return self.total_wait_seconds / self.checkouts * 1000 if self.checkouts else 0.0
+
+    def __str__(self) -> str:
+        return (f"db pool: {self.checkouts} checkouts, {self.hits} hits, {self.misses} misses, "
+                f"{self.timeouts} timeouts, wait avg {self.avg_wait_ms:.1f}ms "
+                f"max {self.max_wait_seconds * 1000:.1f}ms ({self.status})")
+
+
+_pool_metrics = PoolMetrics()
+_pool_metrics_lock = threading.Lock()
+
+
+class _CheckoutTimingMixin:
+    """Times how long each checkout waits for a connection, including opening a new one."""
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()  # type: ignore[misc]
+        except exc.TimeoutError:
+            with _pool_metrics_lock:
+                _pool_metrics.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with _pool_metrics_lock:
+                _pool_metrics.total_wait_seconds += waited
+                _pool_metrics.max_wait_seconds = max(_pool_metrics.max_wait_seconds, waited)
+
+
+class _InstrumentedQueuePool(_CheckoutTimingMixin, QueuePool):
+    pass
+
+
+class _InstrumentedNullPool(_CheckoutTimingMixin, NullPool):
+    pass
+
+
+def get_engine_config() -> EngineConfig:
+    global _config
+    if _config is None:
+        _config = EngineConfig.from_env()
+    return _config
+
+
+def get_pool_metrics() -> PoolMetrics:
+    """Snapshot of the pool counters of the sync engine."""
+    with _pool_metrics_lock:
+        metrics = PoolMetrics(**{k: getattr(_pool_metrics, k) for k in
+                                 ("checkouts", "misses", "timeouts", "total_wait_seconds", "max_wait_seconds")})
+    metrics.status = _engine.pool.status() if _engine is not None else "no engine"
+    return metrics
+
+
+def _engine_kwargs(url: URL, config: EngineConfig) -> dict:
+    """create_engine arguments for the pool and driver settings in config."""
+    kwargs: dict = {}
+    is_postgres = url.get_backend_name() == "postgresql"
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # an in-memory database only exists on its single connection
+        return kwargs
+
+    if config.pgbouncer:
+        kwargs["poolclass"] = _InstrumentedNullPool
+    else:
+        kwargs["poolclass"] = _InstrumentedQueuePool
+        kwargs.update(
+            pool_size=config.pool_size,
+            max_overflow=config.max_overflow,
+            pool_timeout=config.pool_timeout,
+            pool_recycle=config.pool_recycle,
+        )
+    kwargs["pool_pre_ping"] = config.pool_pre_ping
+
+    if is_postgres and url.get_driver_name() == "psycopg2":
+        if config.executemany_mode:
+            kwargs["executemany_mode"] = config.executemany_mode
+        if config.statement_timeout_ms and not config.pgbouncer:
+            # transaction-mode poolers reject startup options, see _set_local_statement_timeout
+            kwargs["connect_args"] = {"options": f"-c statement_timeout={config.statement_timeout_ms}"}
+    return kwargs
+
+
+def _instrument_engine(engine, config: EngineConfig) -> None:
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        with _pool_metrics_lock:
+            _pool_metrics.misses += 1
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        with _pool_metrics_lock:
+            _pool_metrics.checkouts += 1
+
+    if config.pgbouncer and config.statement_timeout_ms and engine.dialect.name == "postgresql":
+        @event.listens_for(engine, "begin")
+        def _set_local_statement_timeout(conn):
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(config.statement_timeout_ms)}")
+
+
+def _get_database_url() -> str:
+    db_target = os.getenv("DB_TARGET", "LOCAL")
+    database_url = None
+    if db_target == "LOCAL":
+        database_url = os.getenv("DATABASE_URL_LOCAL")
+    elif db_target == "REMOTE":
+        database_url = os.getenv("DATABASE_URL_REMOTE")
+    elif db_target == "REMOTE_GH_WORKER":
+        database_url = os.getenv("DATABASE_URL_REMOTE_GH_WORKER")
+
+    if not database_url:
+        raise ValueError("DATABASE_URL environment variable is required")
+    return database_url
+
+
 def _get_engine():
     """Get or create the database engine."""
     global _engine
     if _engine is None:
-        db_target = os.getenv("DB_TARGET", "LOCAL")
-        if db_target == "LOCAL":
-            database_url = os.getenv("DATABASE_URL_LOCAL")
-        elif db_target == "REMOTE":
-            database_url = os.getenv("DATABASE_URL_REMOTE")
-        elif db_target == "REMOTE_GH_WORKER":
-            database_url = os.getenv("DATABASE_URL_REMOTE_GH_WORKER")
-        
-        if not database_url:
-            raise ValueError("DATABASE_URL environment variable is required")
-        
+        url = make_url(_get_database_url())
+        config = get_engine_config()
         _engine = create_engine(
-            database_url,
+            url,
             # for logging SQL queries, set environment variable SQL_ECHO=1
             echo=os.getenv("SQL_ECHO", "") == "1",
+            **_engine_kwargs(url, config),
         )
-        print("db engine created")
+        _instrument_engine(_engine, config)
+        print(f"db engine created ({'pgbouncer' if config.pgbouncer else f'pool_size={config.pool_size}'})")
     return _engine
 
 
@@ -57,8 +238,9 @@ def get_session():
         session.close()
 
 
-def init_db(database_url: str | None = None):
-    global _engine, _SessionLocal
+def init_db(database_url: str | None = None, config: EngineConfig | None = None):
+    """Create the engine and session factory. config defaults to EngineConfig.from_env()."""
+    global _engine, _SessionLocal, _config
     
     if database_url:
         os.environ["DATABASE_URL"] = database_url
@@ -66,6 +248,7 @@ def init_db(database_url: str | None = None):
     # Reset globals to force recreation
     _engine = None
     _SessionLocal = None
+    _config = config
     
     # Trigger creation
     _get_engine()
@@ -74,10 +257,13 @@ def init_db(database_url: str | None = None):
 
 def reset_db():
     """Reset database connection. Useful for testing."""
-    global _engine, _SessionLocal
+    global _engine, _SessionLocal, _config, _pool_metrics
     
     if _engine:
         _engine.dispose()
     
     _engine = None
-    _SessionLocal = None
\ No newline at end of file
+    _SessionLocal = None
+    _config = None
+    with _pool_metrics_lock:
+        _pool_metrics = PoolMetrics()
@@ -1,3 +1,4 @@
+import asyncio
 import os
 from dotenv import load_dotenv
 import time
@@ -5,28 +6,33 @@ from datetime import date, timedelta
 
 from stock_ai.db.models import (
     RedditPost, RedditFilteredPost, DdRecommendation, YoloRecommendation, RunMetaData,
-    NewsRecommendation, FinancialSnapshot, PortfolioPlan, FinalRecommendation)
+    NewsRecommendation, FinancialSnapshot, PortfolioPlan, FinalRecommendation, RunMetric, StepCheckpoint, RedditCursor)
 from stock_ai.workflows.persistence.sql_alchemy_persistence import SqlAlchemyPersistence
 from stock_ai.workflows.reddit_stock_workflow import init_workflow
-from stock_ai.db.session import init_db
+from stock_ai.db.session import get_pool_metrics, init_db
 from stock_ai.workflows.run_id_generator import RunIdType
 
+# table name -> ORM model of the tables the workflow uses
+REGISTRY = {
+    "run_metadata": RunMetaData,
+    "reddit_posts": RedditPost,
+    "reddit_cursors": RedditCursor,
+    "reddit_filtered_posts": RedditFilteredPost,
+    "news_recommendations": NewsRecommendation,
+    "dd_recommendations": DdRecommendation,
+    "yolo_recommendations": YoloRecommendation,
+    "financial_snapshots": FinancialSnapshot,
+    "portfolio_plans": PortfolioPlan,
+    "final_recommendations": FinalRecommendation,
+    "run_metrics": RunMetric,
+    "step_checkpoints": StepCheckpoint,
+}
+
+
 def main():
     s = time.perf_counter()
     init_db()
-    persistence = SqlAlchemyPersistence(
-        registry={
-            "run_metadata": RunMetaData,
-            "reddit_posts": RedditPost,
-            "reddit_filtered_posts": RedditFilteredPost,
-            "news_recommendations": NewsRecommendation,
-            "dd_recommendations": DdRecommendation,
-            "yolo_recommendations": YoloRecommendation,
-            "financial_snapshots": FinancialSnapshot,
-            "portfolio_plans": PortfolioPlan,
-            "final_recommendations": FinalRecommendation
-        },
-    )
+    persistence = SqlAlchemyPersistence(registry=REGISTRY)
     is_test_env = os.getenv("ENVIRONMENT") == "TEST" 
 
     # use sunday + 1 day (Monday) so the trade workflow is easier to fetch the id
@@ -37,7 +43,13 @@ def main():
     if is_test_env:
         run_id = os.getenv("TEST_RUN_ID", run_id)
 
-    init_workflow(run_id, persistence).run()
+    workflow = init_workflow(run_id, persistence)
+    # WORKFLOW_ASYNC=1 runs the steps on one event loop instead of worker threads
+    if os.getenv("WORKFLOW_ASYNC") == "1":
+        asyncio.run(workflow.arun())
+    else:
+        workflow.run()
+    print(get_pool_metrics())
     e = time.perf_counter()
     print(f"Workflow completed in {e - s:.2f} seconds.")
 
@@ -1,29 +1,34 @@
+import asyncio
 import os
 from dotenv import load_dotenv
 import time
 from datetime import date
 
 from stock_ai.db.models import (
-    RunMetaData, Portfolio, Position, PerformanceSnapshot
+    RunMetaData, Portfolio, Position, PerformanceSnapshot, FinancialSnapshot, RunMetric, IndicatorState
 )
 from stock_ai.workflows.persistence.sql_alchemy_persistence import SqlAlchemyPersistence
 from stock_ai.workflows.daily_performance_workflow import init_workflow
-from stock_ai.db.session import init_db
+from stock_ai.db.session import get_pool_metrics, init_db
 from stock_ai.workflows.run_id_generator import RunIdType
 
+# table name -> ORM model of the tables the workflow uses
+REGISTRY = {
+    "run_metadata": RunMetaData,
+    "portfolios": Portfolio,
+    "positions": Position,
+    "performance_snapshots": PerformanceSnapshot,
+    "financial_snapshots": FinancialSnapshot,
+    "indicator_states": IndicatorState,
+    "run_metrics": RunMetric,
+}
+
 
 def main():
     s = time.perf_counter()
     init_db()
     
-    persistence = SqlAlchemyPersistence(
-        registry={
-            "run_metadata": RunMetaData,
-            "portfolios": Portfolio,
-            "positions": Position,
-            "performance_snapshots": PerformanceSnapshot,
-        },
-    )
+    persistence = SqlAlchemyPersistence(registry=REGISTRY)
     is_test_env = os.getenv("ENVIRONMENT") == "TEST" 
     
     run_id = RunIdType.DAILY_PERF.value + "_" + date.today().strftime("%Y%m%d")
@@ -32,7 +37,14 @@ def main():
         run_id = os.getenv("TEST_RUN_ID", run_id)
     
     print(f"Starting daily performance workflow with run_id: {run_id}")
-    init_workflow(run_id, persistence).run()
+    workflow = init_workflow(run_id, persistence)
+    # WORKFLOW_ASYNC=1 runs the steps on one event loop instead of worker threads
+    if os.getenv("WORKFLOW_ASYNC") == "1":
+        asyncio.run(workflow.arun())
+    else:
+        workflow.run()
+    
+    print(get_pool_metrics())
     
     e = time.perf_counter()
     print(f"Daily performance workflow completed in {e - s:.2f} seconds.")
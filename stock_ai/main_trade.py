@@ -1,3 +1,4 @@
+import asyncio
 import os
 from dotenv import load_dotenv
 import time
@@ -5,30 +6,34 @@ from datetime import date
 
 from stock_ai.db.models import (
     RunMetaData, FinalRecommendation,
-    Portfolio, Position, Trade, PerformanceSnapshot, TradeInput
+    Portfolio, Position, Trade, PerformanceSnapshot, TradeInput, FinancialSnapshot, RunMetric, IndicatorState
 )
 from stock_ai.workflows.persistence.sql_alchemy_persistence import SqlAlchemyPersistence
 from stock_ai.workflows.weekly_trade_workflow import init_workflow
-from stock_ai.db.session import init_db
+from stock_ai.db.session import get_pool_metrics, init_db
 from stock_ai.workflows.run_id_generator import RunIdType
 
+# table name -> ORM model of the tables the workflow uses
+REGISTRY = {
+    "run_metadata": RunMetaData,
+    "final_recommendations": FinalRecommendation,
+    "portfolios": Portfolio,
+    "positions": Position,
+    "trades": Trade,
+    "performance_snapshots": PerformanceSnapshot,
+    "trade_inputs": TradeInput,
+    "financial_snapshots": FinancialSnapshot,
+    "indicator_states": IndicatorState,
+    "run_metrics": RunMetric,
+}
+
 
 def main():
     """Run the weekly trade workflow."""
     s = time.perf_counter()
     init_db()
     
-    persistence = SqlAlchemyPersistence(
-        registry={
-            "run_metadata": RunMetaData,
-            "final_recommendations": FinalRecommendation,
-            "portfolios": Portfolio,
-            "positions": Position,
-            "trades": Trade,
-            "performance_snapshots": PerformanceSnapshot,
-            "trade_inputs": TradeInput,
-        },
-    )
+    persistence = SqlAlchemyPersistence(registry=REGISTRY)
     is_test_env = os.getenv("ENVIRONMENT") == "TEST" 
     run_id = RunIdType.REDDIT_STOCK_TRADE.value + "_" + date.today().strftime("%Y%m%d")
     # run_id = RunIdType.TEST_RUN_TRADE.value + "_" + "20251126-1"
@@ -36,7 +41,14 @@ def main():
         run_id = os.getenv("TEST_RUN_ID", run_id)
     
     print(f"Starting weekly trade workflow with run_id: {run_id}")
-    init_workflow(run_id, persistence).run()
+    workflow = init_workflow(run_id, persistence)
+    # WORKFLOW_ASYNC=1 runs the steps on one event loop instead of worker threads
+    if os.getenv("WORKFLOW_ASYNC") == "1":
+        asyncio.run(workflow.arun())
+    else:
+        workflow.run()
+    
+    print(get_pool_metrics())
     
     e = time.perf_counter()
     print(f"Trade workflow completed in {e - s:.2f} seconds.")
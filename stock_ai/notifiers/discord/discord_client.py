@@ -1,5 +1,7 @@
 
+import time
 import httpx
+from stock_ai.workflows.tracing import record_external_call
 
 class DiscordClient:
     def __init__(self, webhook_url: str):
@@ -7,7 +9,9 @@ class DiscordClient:
 
     def send_message(self, message: str):
         try:
+            start = time.perf_counter()
             res = httpx.post(self.webhook_url, json={"content": message})
+            record_external_call("discord", time.perf_counter() - start)
             res.raise_for_status()
             try:
                 return res.json()  # may raise ValueError if 204 No Content
@@ -33,7 +37,35 @@ class DiscordClient:
         }
         """
         try:
+            start = time.perf_counter()
             res = httpx.post(self.webhook_url, json={"embeds": [embed]})
+            record_external_call("discord", time.perf_counter() - start)
+            res.raise_for_status()
+            try:
+                return res.json()  # may raise ValueError if 204 No Content
+            except ValueError:
+                return None
+        except httpx.HTTPStatusError as e:
+            print("Discord API error:", e.response.status_code, e.response.text)
+            raise
+        except httpx.RequestError as e:
+            print("Request failed:", e)
+            raise
+
+    async def asend_message(self, message: str):
+        """Async variant of send_message for async StepFns."""
+        return await self._apost({"content": message})
+
+    async def asend_embed(self, embed: dict):
+        """Async variant of send_embed for async StepFns."""
+        return await self._apost({"embeds": [embed]})
+
+    async def _apost(self, payload: dict):
+        try:
+            start = time.perf_counter()
+            async with httpx.AsyncClient() as client:
+                res = await client.post(self.webhook_url, json=payload)
+            record_external_call("discord", time.perf_counter() - start)
             res.raise_for_status()
             try:
                 return res.json()  # may raise ValueError if 204 No Content
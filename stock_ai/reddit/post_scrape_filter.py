@@ -1,9 +1,45 @@
 from stock_ai.reddit.reddit_scraper import RedditPost
+import heapq
 import statistics
 import random
 from collections import Counter
+from dataclasses import dataclass, field
+
+
+@dataclass
+class _FlairState:
+    """Online selection state of one flair: the top post, the running median and a reservoir above it."""
+    top: RedditPost | None = None
+    count: int = 0
+    # running median of the scores: max-heap (negated) of the lower half, min-heap of the upper half
+    lower: list[int] = field(default_factory=list)
+    upper: list[int] = field(default_factory=list)
+    # (random key, post) sample, kept above the running median: posts the median has
+    # passed are the first to be replaced
+    reservoir: list[tuple[float, RedditPost]] = field(default_factory=list)
+
+    def add_score(self, score: int) -> None:
+        if self.lower and score > -self.lower[0]:
+            heapq.heappush(self.upper, score)
+        else:
+            heapq.heappush(self.lower, -score)
+        if len(self.lower) > len(self.upper) + 1:
+            heapq.heappush(self.upper, -heapq.heappop(self.lower))
+        elif len(self.upper) > len(self.lower):
+            heapq.heappush(self.lower, -heapq.heappop(self.upper))
+
+    def median(self) -> float:
+        if len(self.lower) > len(self.upper):
+            return float(-self.lower[0])
+        return (-self.lower[0] + self.upper[0]) / 2
+
 
 class AfterScrapeFilter:
+    def __init__(self, reservoir_size: int = 16):
+        """reservoir_size: posts per flair add() samples for the random pick."""
+        self.reservoir_size = reservoir_size
+        self._states: dict[str, _FlairState] = {}
+
     def _get_quantiles(self, data: list[int] | list[float]) -> list[float]:
         """Calculate Q1, Q2 (median), Q3 quantiles."""
         if not data:
@@ -68,4 +104,59 @@ class AfterScrapeFilter:
         print(f"After filtering, posts: {Counter({k: len(v) for k, v in filtered.items()})}")
         return filtered
 
+    def add(self, post: RedditPost) -> None:
+        """Streaming mode: take one post; finish() returns the selection of all the posts added.
 
+        Only the top post, the scores and a sample of reservoir_size posts per
+        flair are kept, not the posts themselves. The sample leans to the posts
+        above the running median, and the random pick comes from its posts above
+        the final median: close to, but not exactly, the batch choice.
+        """
+        state = self._states.setdefault(post.flair, _FlairState())
+        score = post.score or 0
+        state.count += 1
+        state.add_score(score)
+        if state.top is None or score > (state.top.score or 0):
+            state.top = post
+        key = random.random()
+        if len(state.reservoir) < self.reservoir_size:
+            state.reservoir.append((key, post))
+            return
+        median = state.median()
+        below = [j for j, (_, p) in enumerate(state.reservoir) if (p.score or 0) < median]
+        if score >= median and below:
+            # a post above the median always takes the place of one the median has passed
+            state.reservoir[max(below, key=lambda j: state.reservoir[j][0])] = (key, post)
+            return
+        # otherwise the smallest keys win: a uniform sample among the posts on the same side of the median
+        candidates = below if score < median else range(len(state.reservoir))
+        if not candidates:
+            return
+        i = max(candidates, key=lambda j: state.reservoir[j][0])
+        if key < state.reservoir[i][0]:
+            state.reservoir[i] = (key, post)
+
+    def finish(self) -> dict[str, list[RedditPost]]:
+        """The selection of the posts given to add(), same rules and result as __call__."""
+        print("Applying after-scrape filtering (top 1 + top 50% random, streaming)...")
+
+        filtered: dict[str, list[RedditPost]] = {}
+        for flair, state in self._states.items():
+            top = state.top
+            selected = [top]
+            top_title = top.title[:50] + "..." if len(top.title) > 50 else top.title
+            print(f"  [{flair}] Top post: '{top_title}' (score: {top.score})")
+            if state.count >= 3:
+                median = state.median()
+                top_50_percent = [p for _, p in state.reservoir if p is not top and (p.score or 0) >= median]
+                if top_50_percent:
+                    selected.append(random.choice(top_50_percent))
+                else:
+                    print(f"  [{flair}] No posts in top 50% range (median: {median:.0f})")
+            else:
+                print(f"  [{flair}] Not enough posts for top 50% selection (need >= 3, got {state.count})")
+            filtered[flair] = selected
+        self._states = {}
+
+        print(f"After filtering, posts: {Counter({k: len(v) for k, v in filtered.items()})}")
+        return filtered
@@ -1,23 +1,41 @@
 from typing import Any, Iterator
 from datetime import datetime, timedelta, timezone
+import concurrent.futures as cf
+import contextvars
+import os
+import queue
+import threading
+import time
 import praw
-from stock_ai.reddit.types import RedditPost
+from stock_ai.workflows.common.token_bucket import TokenBucketLimiter
+from stock_ai.reddit.types import RedditPost, ScrapeCursor, ScrapeSource
+from stock_ai.workflows.tracing import record_external_call
+
+# PRAW fetches listings 100 posts per request
+PAGE_SIZE = 100
 
 class RedditScraper:
     def __init__(self, client_id, client_secret, user_agent):
-        self.reddit = praw.Reddit(
+        self._credentials = dict(
             client_id=client_id,
             client_secret=client_secret,
             user_agent=user_agent,
         )
+        self.reddit = self._new_reddit()
+
+    def _new_reddit(self) -> praw.Reddit:
+        return praw.Reddit(**self._credentials)
 
-    def _get_subreddit_posts(self, subreddit_name:str, limit=1000) -> Iterator[Any]:
-        """Fetches new posts from a specified subreddit.
+    def _get_subreddit_posts(self, subreddit_name:str, limit=1000, listing="new",
+                             cut_off_days=7, reddit:praw.Reddit | None = None) -> Iterator[Any]:
+        """Fetches posts from a listing (new, hot or top) of a specified subreddit.
 
         :returns: Iterator of posts
         """
-        subreddit = self.reddit.subreddit(subreddit_name)
-        return subreddit.new(limit=limit)
+        subreddit = (reddit or self.reddit).subreddit(subreddit_name)
+        if listing == "top":
+            return subreddit.top(time_filter=_time_filter(cut_off_days), limit=limit)
+        return getattr(subreddit, listing)(limit=limit)
 
     def scrape(self, 
                subreddit_name:str,
@@ -35,16 +53,237 @@ class RedditScraper:
 
         :returns: dict flair -> [RedditPost]
         """
-        print(f"Scraping r/{subreddit_name} for posts with flairs {flairs_want}, skipping empty selftext: {skip_empty_selftext}, cut off days: {cut_off_days}, limit: {limit}")
-        posts = self._get_subreddit_posts(subreddit_name, limit=limit)
+        posts, _ = self.scrape_since(subreddit_name, None, flairs_want, skip_empty_selftext, cut_off_days, limit)
+        return posts
+
+    def scrape_since(self,
+                     subreddit_name:str,
+                     cursor:ScrapeCursor | None,
+                     flairs_want:set[str] | None =None,
+                     skip_empty_selftext:bool=True,
+                     cut_off_days=7,
+                     limit=1000) -> tuple[dict[str, list[RedditPost]], ScrapeCursor | None]:
+        """Like scrape, but stops at the post of the cursor instead of walking back to the cut off.
+
+        The listing is newest first and PRAW fetches it lazily 100 posts per request,
+        so a scrape shortly after the previous one takes a single request.
+
+        :param cursor: Where the previous scrape of the subreddit started, None to scrape the whole window.
+
+        :returns: (dict flair -> [RedditPost] of the posts newer than the cursor,
+                   cursor at the newest post of the listing, the given one if there is none)
+        """
+        source = ScrapeSource(subreddit_name, "new", flairs_want)
+        return self._scrape_listing(self.reddit, source, cursor, skip_empty_selftext, cut_off_days, limit)
+
+    def scrape_many(self,
+                    sources:list[ScrapeSource],
+                    cursors:dict[str, ScrapeCursor] | None = None,
+                    skip_empty_selftext:bool=True,
+                    cut_off_days=7,
+                    limit=1000,
+                    max_workers=4,
+                    rate_limiter:TokenBucketLimiter | None = None,
+                    ) -> tuple[dict[str, list[RedditPost]], dict[str, ScrapeCursor]]:
+        """Scrapes several subreddit listings concurrently and merges their posts.
+
+        PRAW is not thread-safe, so every worker thread gets its own praw.Reddit.
+        They share the app's OAuth budget, every listing page takes a request
+        from rate_limiter (default get_reddit_rate_limiter()) first.
+
+        :param sources: Listings to scrape, with the flairs to keep from each.
+        :param cursors: subreddit -> cursor, used by the `new` sources like scrape_since does.
+
+        :returns: (dict flair -> [RedditPost], one post per reddit_id, in the order of the sources,
+                   subreddit -> cursor of each `new` source)
+        """
+        cursors = cursors or {}
+        rate_limiter = rate_limiter or get_reddit_rate_limiter()
+        local = threading.local()
+
+        def scrape_source(source: ScrapeSource):
+            reddit = getattr(local, "reddit", None)
+            if reddit is None:
+                reddit = local.reddit = self._new_reddit()
+            cursor = cursors.get(source.subreddit) if source.listing == "new" else None
+            return self._scrape_listing(reddit, source, cursor, skip_empty_selftext, cut_off_days, limit,
+                                        rate_limiter)
+
+        with cf.ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sources))),
+                                   thread_name_prefix="reddit-scrape") as pool:
+            # each listing counts its requests in the caller's trace span
+            futures = [pool.submit(contextvars.copy_context().run, scrape_source, source) for source in sources]
+            results = [f.result() for f in futures]
+
         collect:dict[str, list[RedditPost]] = {}
+        new_cursors:dict[str, ScrapeCursor] = {}
+        seen = set()
+        duplicates = 0
+        for source, (posts, cursor) in zip(sources, results):
+            if source.listing == "new" and cursor is not None:
+                new_cursors[source.subreddit] = cursor
+            for flair, plist in posts.items():
+                for p in plist:
+                    # hot and top overlap with new, and a crosspost filter can match twice
+                    if p.reddit_id in seen:
+                        duplicates += 1
+                        continue
+                    seen.add(p.reddit_id)
+                    collect.setdefault(flair, []).append(p)
+        print(f"Scraped {len(seen)} posts from {len(sources)} listings ({duplicates} duplicates dropped)")
+
+        return collect, new_cursors
+
+    def iter_posts(self,
+                   sources:list[ScrapeSource],
+                   cursors:dict[str, ScrapeCursor] | None = None,
+                   skip_empty_selftext:bool=True,
+                   cut_off_days=7,
+                   limit=1000,
+                   max_workers=4,
+                   rate_limiter:TokenBucketLimiter | None = None,
+                   buffer_size=200,
+                   ) -> Iterator[RedditPost]:
+        """Streaming scrape_many: yields the posts as the listing pages come in, one per reddit_id.
+
+        The listings are walked on worker threads like scrape_many (a single one
+        with self.reddit), so pages keep coming while the consumer handles the
+        posts. Posts of several sources come in no particular order.
+
+        :param cursors: subreddit -> cursor, used by the `new` sources and moved in place
+                        as their listings are walked to the end.
+        :param buffer_size: Posts the workers scrape ahead of the consumer before they wait for it.
+        """
+        cursors = {} if cursors is None else cursors
+        start = dict(cursors)
+        if len(sources) == 1:
+            # self.reddit on a single worker, still fetching pages while the consumer works
+            stream = self._iter_concurrently(sources, start, cursors, skip_empty_selftext, cut_off_days, limit,
+                                             1, None, buffer_size, reddit=self.reddit)
+        else:
+            stream = self._iter_concurrently(sources, start, cursors, skip_empty_selftext, cut_off_days, limit,
+                                             max_workers, rate_limiter or get_reddit_rate_limiter(), buffer_size)
+        seen = set()
+        for post in stream:
+            if post.reddit_id in seen:
+                continue
+            seen.add(post.reddit_id)
+            yield post
+
+    def _iter_concurrently(self, sources, start, moved, skip_empty_selftext, cut_off_days, limit,
+                           max_workers, rate_limiter, buffer_size, reddit=None) -> Iterator[RedditPost]:
+        """Posts of the sources walked by worker threads, in the order they are scraped.
+
+        At most buffer_size posts wait in the queue, a worker blocks on a full one
+        until the consumer catches up or stops.
+        """
+        posts: queue.Queue = queue.Queue(maxsize=max(1, buffer_size))
+        stop = threading.Event()
+        local = threading.local()
+        done = object()
+
+        def put(item) -> bool:
+            # a consumer that stopped never drains the queue, don't wait on it forever
+            while not stop.is_set():
+                try:
+                    posts.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def scrape_source(source: ScrapeSource) -> None:
+            try:
+                worker_reddit = reddit or getattr(local, "reddit", None)
+                if worker_reddit is None:
+                    worker_reddit = local.reddit = self._new_reddit()
+                cursor = start.get(source.subreddit) if source.listing == "new" else None
+                for post in self._iter_listing(worker_reddit, source, cursor, skip_empty_selftext, cut_off_days, limit,
+                                               rate_limiter, moved):
+                    if not put(post):
+                        return
+            except Exception as e:
+                put(e)
+            finally:
+                put(done)
+
+        pool = cf.ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sources))),
+                                     thread_name_prefix="reddit-scrape")
+        try:
+            for source in sources:
+                pool.submit(contextvars.copy_context().run, scrape_source, source)
+            running = len(sources)
+            while running:
+                item = posts.get()
+                if item is done:
+                    running -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            # the consumer stopped early or a listing failed: let the other workers wind down
+            stop.set()
+            pool.shutdown(wait=False)
+
+    def _scrape_listing(self,
+                        reddit:praw.Reddit,
+                        source:ScrapeSource,
+                        cursor:ScrapeCursor | None,
+                        skip_empty_selftext:bool,
+                        cut_off_days:int,
+                        limit:int,
+                        rate_limiter:TokenBucketLimiter | None = None,
+                        ) -> tuple[dict[str, list[RedditPost]], ScrapeCursor | None]:
+        moved:dict[str, ScrapeCursor] = {}
+        collect:dict[str, list[RedditPost]] = {}
+        for reddit_post in self._iter_listing(reddit, source, cursor, skip_empty_selftext, cut_off_days, limit,
+                                              rate_limiter, moved):
+            if reddit_post.flair not in collect:
+                collect[reddit_post.flair] = []
+            collect[reddit_post.flair].append(reddit_post)
+        return collect, moved.get(source.subreddit, cursor)
+
+    def _iter_listing(self,
+                      reddit:praw.Reddit,
+                      source:ScrapeSource,
+                      cursor:ScrapeCursor | None,
+                      skip_empty_selftext:bool,
+                      cut_off_days:int,
+                      limit:int,
+                      rate_limiter:TokenBucketLimiter | None = None,
+                      moved:dict[str, ScrapeCursor] | None = None,
+                      ) -> Iterator[RedditPost]:
+        """Yields the wanted posts of a listing; at its end a `new` listing stores its newest post in moved."""
+        subreddit_name = source.subreddit
+        flairs_want = source.flairs
+        print(f"Scraping r/{subreddit_name} {source.listing} for posts with flairs {flairs_want}, skipping empty selftext: {skip_empty_selftext}, cut off days: {cut_off_days}, limit: {limit}"
+              + (f", since post {cursor.reddit_id}" if cursor else ""))
+        call_start = time.perf_counter()
+        posts = self._get_subreddit_posts(subreddit_name, limit=limit, listing=source.listing,
+                                          cut_off_days=cut_off_days, reddit=reddit)
+        if rate_limiter is not None:
+            posts = _paced(posts, rate_limiter)
         cutoff = datetime.now(timezone.utc) - timedelta(days=cut_off_days)
+        # only the new listing is sorted by creation time
+        chronological = source.listing == "new"
+        newest = cursor
+        scraped = 0
 
         for post in posts:
+            if chronological and newest is cursor:
+                # filtered out or not, the newest post is where the next scrape stops
+                newest = ScrapeCursor(subreddit_name, post.created_utc, post.id)
+            # posts created in the same second as the cursor's are fetched again, the caller dedupes them
+            if cursor and (post.id == cursor.reddit_id or post.created_utc < cursor.created_utc):
+                break
+
             created = datetime.fromtimestamp(post.created_utc, tz=timezone.utc)
             # only care about first cut_off_days posts
             if created < cutoff:
-                break 
+                if chronological:
+                    break
+                continue
 
             flair = post.link_flair_text
             if flairs_want and flair not in flairs_want:
@@ -53,12 +292,9 @@ class RedditScraper:
             if skip_empty_selftext and len(post.selftext) == 0:
                 continue
 
-            if flair not in collect:
-                collect[flair] = []
-
             reddit_post = RedditPost(
                 reddit_id=post.id,
-                flair=flair,
+                flair=source.renamed.get(flair, flair),
                 title=post.title,
                 selftext=post.selftext,
                 score=post.score,
@@ -66,10 +302,59 @@ class RedditScraper:
                 upvote_ratio=post.upvote_ratio,
                 created=datetime.fromtimestamp(post.created_utc),
                 url="https://reddit.com" + post.permalink,
+                subreddit=subreddit_name,
             )
 
-            collect[flair].append(reddit_post)
+            scraped += 1
+            yield reddit_post
+
+        # the listing is paged lazily, so this times the whole walk
+        record_external_call("reddit", time.perf_counter() - call_start)
+        print(f"Scraped {scraped} posts from r/{subreddit_name} {source.listing}")
+        if moved is not None and chronological and newest is not None:
+            moved[subreddit_name] = newest
+
+
+def _time_filter(cut_off_days: int) -> str:
+    """Smallest `top` time filter covering the last cut_off_days days."""
+    if cut_off_days <= 1:
+        return "day"
+    if cut_off_days <= 7:
+        return "week"
+    if cut_off_days <= 31:
+        return "month"
+    return "year"
+
+
+def _paced(posts: Iterator[Any], rate_limiter: TokenBucketLimiter) -> Iterator[Any]:
+    """Takes a request from the limiter before each listing page PRAW fetches."""
+    posts = iter(posts)
+    i = 0
+    while True:
+        if i % PAGE_SIZE == 0:
+            rate_limiter.acquire(0)
+        try:
+            post = next(posts)
+        except StopIteration:
+            return
+        yield post
+        i += 1
+
+
+_default_limiter: TokenBucketLimiter | None = None
+_default_limiter_lock = threading.Lock()
+
 
-        print(f"Scraped {sum(len(v) for v in collect.values())} posts from r/{subreddit_name}") 
+def get_reddit_rate_limiter() -> TokenBucketLimiter:
+    """Process-wide limiter of the listing requests of scrape_many, REDDIT_RPM_LIMIT per minute (default 100).
 
-        return collect
\ No newline at end of file
+    Reddit allows an OAuth app 100 requests per minute; PRAW paces a single
+    praw.Reddit by the response headers, but not several at once.
+    """
+    global _default_limiter
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            rpm = float(os.getenv("REDDIT_RPM_LIMIT") or 100)
+            # no token budget, pages are acquired with 0 tokens
+            _default_limiter = TokenBucketLimiter(requests_per_minute=rpm, tokens_per_minute=rpm)
+        return _default_limiter
@@ -1,5 +1,5 @@
 from datetime import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 import stock_ai.db.models.reddit_post
 import stock_ai.db.models.reddit_filterd_post
@@ -16,6 +16,7 @@ class RedditPost:
     upvote_ratio: float
     created: datetime
     url: str
+    subreddit: str | None = None  # of the ScrapeSource that scraped it
 
     @classmethod
     def from_orm(cls, orm_obj: stock_ai.db.models.reddit_post.RedditPost | 
@@ -30,4 +31,52 @@ class RedditPost:
             upvote_ratio=orm_obj.upvote_ratio,
             created=orm_obj.created,
             url=orm_obj.url,
-        )
\ No newline at end of file
+            subreddit=orm_obj.subreddit,
+        )
+
+
+@dataclass
+class ScrapeCursor:
+    """Newest post seen in the `new` listing of a subreddit, where the next scrape can stop."""
+    subreddit: str
+    created_utc: float
+    reddit_id: str
+
+
+@dataclass
+class ScrapeSource:
+    """A subreddit listing to scrape and the flairs to keep from it (None keeps all).
+
+    renamed maps a subreddit's own flair to the one its posts are stored under,
+    e.g. {"Company Discussion": "DD"} so that the DD agent analyzes them.
+    """
+    subreddit: str
+    listing: str = "new"  # new, hot or top
+    flairs: set[str] | None = None
+    renamed: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def parse(cls, spec: str) -> "ScrapeSource":
+        """From "subreddit[:listing[:flair[=stored flair]|flair...]]", e.g.
+        "wallstreetbets:new:News|DD|YOLO", "stocks:hot:Company Discussion=DD" or "stocks:hot".
+        """
+        subreddit, *values = spec.strip().split(":")
+        source = cls(subreddit=subreddit)
+        if values and values[0]:
+            source.listing = values[0]
+        if len(values) > 1 and values[1]:
+            source.flairs = set()
+            for flair in values[1].split("|"):
+                flair, _, stored = flair.partition("=")
+                source.flairs.add(flair)
+                if stored:
+                    source.renamed[flair] = stored
+        if source.listing not in ("new", "hot", "top"):
+            raise ValueError(f"Unknown listing {source.listing!r} in Reddit source {spec!r}")
+        return source
+
+    def stored_flairs(self) -> set[str] | None:
+        """The flairs the kept posts are stored under (None keeps all)."""
+        if self.flairs is None:
+            return None
+        return {self.renamed.get(f, f) for f in self.flairs}
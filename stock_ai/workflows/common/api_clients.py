@@ -1,5 +1,5 @@
 from functools import lru_cache
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 import os
 from stock_ai.reddit.reddit_scraper import RedditScraper
 
@@ -10,6 +10,15 @@ def get_openai_client() -> OpenAI:
     return OpenAI(api_key=api_key)
 
 
+@lru_cache(maxsize=1)
+def get_async_openai_client() -> AsyncOpenAI:
+    """AsyncOpenAI client for async StepFns run by Workflow.arun.
+    Its connection pool is bound to the event loop it is first used on.
+    """
+    api_key = os.getenv("OPENAI_API_KEY")
+    return AsyncOpenAI(api_key=api_key)
+
+
 @lru_cache(maxsize=1)
 def get_reddit_scraper() -> RedditScraper:
     return RedditScraper(
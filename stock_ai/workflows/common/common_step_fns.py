@@ -1,7 +1,14 @@
 """Common step functions shared across workflows."""
 
+from dataclasses import asdict
+from datetime import datetime
+
 from stock_ai.workflows.persistence.sql_alchemy_persistence import SqlAlchemyPersistence
 from stock_ai.workflows.common.utils import idempotency_check
+from stock_ai.yahoo_finance.indicator_state import IndicatorState
+from stock_ai.yahoo_finance.yahoo_finance_client import YahooFinanceClient
+
+SP500_TICKER = "^GSPC"
 
 
 def s_insert_run_metadata(persistence: SqlAlchemyPersistence, run_id: str) -> None:
@@ -20,3 +27,63 @@ def s_insert_run_metadata(persistence: SqlAlchemyPersistence, run_id: str) -> No
         "run_id": run_id,
     }
     persistence.set("run_metadata", [row])
+
+
+def s_fetch_sp500_snapshot(persistence: SqlAlchemyPersistence, run_id: str) -> None:
+    """Fetch the S&P 500 benchmark snapshot and store it in financial_snapshots.
+
+    It does not depend on any other step, so workflows can run it concurrently
+    with the portfolio steps and read it back with get_sp500_price. The
+    indicators are advanced from the ticker's row in indicator_states, so only
+    the bars since the previous run are downloaded.
+
+    Args:
+        persistence: Database persistence layer
+        run_id: Unique workflow run identifier
+    """
+    if idempotency_check(persistence, run_id, "financial_snapshots"):
+        print(f"Financial snapshots already exist for run_id {run_id}, skipping S&P 500 fetch")
+        return
+    yf_client = YahooFinanceClient()
+    state = load_indicator_state(persistence, SP500_TICKER)
+    snapshot, state = yf_client.get_incremental_snapshot(SP500_TICKER, state)
+    if snapshot.error:
+        print(f"Warning: could not fetch S&P 500 snapshot: {snapshot.error}")
+        return
+    row = asdict(snapshot)
+    row.pop("error")
+    row["run_id"] = run_id
+    with persistence.transaction() as tx:
+        tx.set("financial_snapshots", [row])
+        save_indicator_state(tx, state)
+
+
+def load_indicator_state(persistence: SqlAlchemyPersistence, ticker: str) -> IndicatorState | None:
+    """The stored indicator state of a ticker, None if it has none yet."""
+    rows = persistence.get("indicator_states", ticker=ticker)
+    if not rows:
+        return None
+    return IndicatorState.from_json(ticker, rows[0].state)
+
+
+def save_indicator_state(persistence: SqlAlchemyPersistence, state: IndicatorState) -> None:
+    """Insert or update the indicator_states row of the state's ticker."""
+    row = {
+        "ticker": state.ticker,
+        "last_date": state.last_date,
+        "state": state.to_json(),
+        "updated_at": datetime.utcnow(),
+    }
+    persistence.upsert("indicator_states", [row], key="ticker")
+
+
+def get_sp500_price(persistence: SqlAlchemyPersistence, run_id: str) -> float:
+    """Read the S&P 500 price stored by s_fetch_sp500_snapshot for this run.
+
+    Falls back to a live fetch if the snapshot step did not store one.
+    """
+    snapshots = persistence.get("financial_snapshots", run_id=run_id, ticker=SP500_TICKER)
+    if snapshots:
+        return snapshots[0].price
+    print("No stored S&P 500 snapshot for this run, fetching live")
+    return YahooFinanceClient().get_yf_snapshot(SP500_TICKER).price
@@ -0,0 +1,63 @@
+"""Token bucket limiter of requests per minute and tokens per minute.
+
+Shared by the OpenAI agents (stock_ai.agents.rate_limiter) and the Reddit
+scraper, which only uses the request bucket.
+"""
+
+import asyncio
+import threading
+import time
+from collections.abc import Callable
+
+
+class _Bucket:
+    def __init__(self, per_minute: float, now: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0  # per second
+        self.level = per_minute
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take amount (the level may go negative), returns seconds until the level is back to 0."""
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / self.rate)
+
+
+class TokenBucketLimiter:
+    """Requests per minute and tokens per minute limits. Thread-safe, usable from threads and event loops."""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        now = clock()
+        self._requests = _Bucket(requests_per_minute, now)
+        self._tokens = _Bucket(tokens_per_minute, now)
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def reserve(self, tokens: int) -> float:
+        """Reserve one request and tokens, returns how long the caller has to wait before sending it."""
+        with self._lock:
+            now = self._clock()
+            wait = max(self._requests.reserve(1, now), self._tokens.reserve(tokens, now))
+            self.waited_seconds += wait
+            return wait
+
+    def acquire(self, tokens: int) -> None:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int) -> None:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def reconcile(self, reserved_tokens: int, used_tokens: int | None) -> None:
+        """Give back (or take) the difference between the estimate and the real usage."""
+        if used_tokens is None:
+            return
+        with self._lock:
+            self._tokens.level = min(self._tokens.capacity, self._tokens.level + reserved_tokens - used_tokens)
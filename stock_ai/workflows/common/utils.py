@@ -2,6 +2,24 @@
 
 from stock_ai.workflows.persistence.sql_alchemy_persistence import SqlAlchemyPersistence
 
+
+def prefetch_idempotency(persistence: SqlAlchemyPersistence, run_id: str, tables: list[str]) -> None:
+    """Check all the idempotency tables of a run in a single round trip.
+
+    Each prefetched result answers the first idempotency_check for that table,
+    later checks query the database again. The results are kept on the
+    persistence instance, so they go away with the run.
+
+    Args:
+        persistence: Database persistence layer
+        run_id: Unique workflow run identifier
+        tables: Table names the workflow's steps check
+    """
+    if run_id.startswith("no-idempotency-"):
+        return
+    persistence.prefetch_exists(tables, run_id=run_id)
+
+
 def idempotency_check(persistence: SqlAlchemyPersistence, run_id: str, table: str) -> bool:
     """Check if data already exists for this run_id in the given table.
 
@@ -18,6 +36,28 @@ def idempotency_check(persistence: SqlAlchemyPersistence, run_id: str, table: st
         print("skip idempotency check...")
         return False
     print(f"Checking if {table} already exists for run_id {run_id}...")
-    existing = persistence.get(table, run_id=run_id)
-    # will return a list of rows if any exist with this run_id
-    return (existing is not None) and (isinstance(existing, list) and len(existing) > 0)
+    return persistence.exists_prefetched(table, run_id=run_id)
+
+def completed_work_units(persistence: SqlAlchemyPersistence, run_id: str, step: str) -> set[str]:
+    """Return the work units of a step that already finished for this run_id.
+
+    Unlike idempotency_check this works per unit of work (e.g. one agent call for
+    one Reddit post), so a resumed run only redoes the units that never finished.
+    Checkpoints are kept in the step_checkpoints table and are honored for
+    no-idempotency- runs too; use a new run_id to redo everything.
+
+    Args:
+        persistence: Database persistence layer
+        run_id: Unique workflow run identifier
+        step: Name of the checkpointed work, e.g. "News agent"
+
+    Returns:
+        Set of finished work unit keys
+    """
+    checkpoints = persistence.get("step_checkpoints", run_id=run_id, step=step)
+    return {c.work_unit for c in checkpoints}
+
+
+def mark_work_unit_done(persistence: SqlAlchemyPersistence, run_id: str, step: str, work_unit: str) -> None:
+    """Record that a unit of work of a step finished for this run_id."""
+    persistence.set("step_checkpoints", [{"run_id": run_id, "step": step, "work_unit": work_unit}])
@@ -2,8 +2,9 @@ import os
 from stock_ai.yahoo_finance.yahoo_finance_client import YahooFinanceClient
 from stock_ai.workflows.persistence.sql_alchemy_persistence import SqlAlchemyPersistence
 from stock_ai.workflows.workflow_base import StepFns, Step, Workflow
-from stock_ai.workflows.common.utils import idempotency_check
-from stock_ai.workflows.common.common_step_fns import s_insert_run_metadata
+from stock_ai.workflows.common.utils import idempotency_check, prefetch_idempotency
+from stock_ai.workflows.common.common_step_fns import (
+    s_insert_run_metadata, s_fetch_sp500_snapshot, get_sp500_price)
 from stock_ai.notifiers.discord.trade_notifier import send_trade_summary_to_discord
 
 from sqlalchemy import text
@@ -50,9 +51,10 @@ def s_update_position_prices(persistence: SqlAlchemyPersistence, run_id: str) ->
     tickers = [pos.ticker for pos in positions_rows]
     prices = yf_client.get_current_prices_batch(tickers)
     
-    print(f"Fetched prices for {len(prices)} tickers")
+    print(f"Fetched prices for {int(prices.notna().sum())} of {len(prices)} tickers")
 
     # 4. Update each position with current price
+    position_updates = []
     for pos in positions_rows:
         ticker = pos.ticker
         current_price = prices.get(ticker)
@@ -64,22 +66,17 @@ def s_update_position_prices(persistence: SqlAlchemyPersistence, run_id: str) ->
         # Calculate unrealized P&L
         unrealized_pnl = (current_price - pos.avg_entry_price) * pos.quantity
         
-        # Update position
-        text_clause = text(
-            "UPDATE positions SET "
-            "current_price = :current_price, "
-            "unrealized_pnl = :unrealized_pnl, "
-            "updated_at = :updated_at "
-            "WHERE id = :id"
-        )
-        persistence.write(text_clause, {
+        position_updates.append({
             "id": pos.id,
             "current_price": current_price,
             "unrealized_pnl": unrealized_pnl,
             "updated_at": datetime.now(timezone.utc),
         })
 
-    print(f"Updated prices for {len(positions_rows)} positions")
+    # one batched UPDATE for all positions instead of one statement and commit each
+    updated = persistence.update_many("positions", position_updates)
+
+    print(f"Updated prices for {updated} positions")
 
 
 def s_create_performance_snapshot(persistence: SqlAlchemyPersistence, run_id: str) -> None:
@@ -128,10 +125,8 @@ def s_create_performance_snapshot(persistence: SqlAlchemyPersistence, run_id: st
     total_pnl = total_realized_pnl + total_unrealized_pnl
     roi_percent = (total_pnl / initial_capital) * 100 if initial_capital > 0 else 0.0
 
-    # 5. Track S&P 500 benchmark
-    yf_client = YahooFinanceClient()
-    sp500_snapshot = yf_client.get_yf_snapshot("^GSPC")
-    sp500_current = sp500_snapshot.price
+    # 5. Track S&P 500 benchmark (fetched concurrently by the snapshot step)
+    sp500_current = get_sp500_price(persistence, run_id)
 
     # Get initial S&P 500 value from first snapshot
     text_clause = text(
@@ -241,14 +236,31 @@ def init_workflow(run_id: str, persistence: SqlAlchemyPersistence) -> Workflow:
     Returns:
         Configured workflow instance
     """
+    # one round trip for the idempotency checks of all steps
+    prefetch_idempotency(persistence, run_id, ["run_metadata", "financial_snapshots"])
     daily_performance_workflow = Workflow(
         run_id=run_id,
         persistence=persistence,
+        metrics_table="run_metrics",
         steps=[
-            Step("insert run metadata", StepFns(functions=[s_insert_run_metadata])),
-            Step("update position prices", StepFns(functions=[s_update_position_prices])),
-            Step("create performance snapshot", StepFns(functions=[s_create_performance_snapshot])),
-            Step("notify discord", StepFns(functions=[s_notify_discord])),
+            Step("insert run metadata", StepFns(functions=[s_insert_run_metadata]),
+                 writes=["run_metadata"],
+                 resources=["db"]),
+            Step("fetch S&P 500 snapshot", StepFns(functions=[s_fetch_sp500_snapshot]),
+                 reads=["indicator_states"],
+                 writes=["financial_snapshots", "indicator_states"],
+                 resources=["yahoo"]),
+            Step("update position prices", StepFns(functions=[s_update_position_prices]),
+                 reads=["portfolios", "positions"],
+                 writes=["positions"],
+                 resources=["yahoo"]),
+            Step("create performance snapshot", StepFns(functions=[s_create_performance_snapshot]),
+                 reads=["portfolios", "positions", "trades", "financial_snapshots", "performance_snapshots"],
+                 writes=["performance_snapshots", "portfolios"],
+                 resources=["db"]),
+            Step("notify discord", StepFns(functions=[s_notify_discord]),
+                 reads=["portfolios", "performance_snapshots", "positions"],
+                 resources=["db"]),
         ]
     )
     return daily_performance_workflow
@@ -1,12 +1,37 @@
 from typing import Any
 from abc import ABC, abstractmethod
+from collections.abc import Iterable
+from contextlib import AbstractContextManager
 
 class Persistence(ABC):
+    def __init__(self):
+        # (table, filters) -> exists, see prefetch_exists
+        self._prefetched_exists: dict[tuple[str, tuple], bool] = {}
+
     @abstractmethod
     def get(self, *args, **kwargs) -> Any: ...
     @abstractmethod
     def set(self, table: str, rows: list[dict]) -> None: ...
     @abstractmethod
     def update(self, *args, **kwargs) -> None: ...
+    @abstractmethod
+    def exists(self, table: str, **filters) -> bool:
+        """True if the table has at least one row matching the filters, without loading rows."""
+    @abstractmethod
+    def exists_many(self, tables: Iterable[str], **filters) -> dict[str, bool]:
+        """exists() for several tables at once, table -> bool, in a single round trip."""
+    @abstractmethod
+    def transaction(self) -> AbstractContextManager["Persistence"]:
+        """Context manager: the calls made inside are committed together, or not at all."""
 
+    def prefetch_exists(self, tables: Iterable[str], **filters) -> None:
+        """exists_many() now, each answer returned once by exists_prefetched() with the same table and filters."""
+        for table, exists in self.exists_many(tables, **filters).items():
+            self._prefetched_exists[(table, tuple(sorted(filters.items())))] = exists
 
+    def exists_prefetched(self, table: str, **filters) -> bool:
+        """exists(), answered by an earlier prefetch_exists() the first time."""
+        exists = self._prefetched_exists.pop((table, tuple(sorted(filters.items()))), None)
+        if exists is None:
+            return self.exists(table, **filters)
+        return exists
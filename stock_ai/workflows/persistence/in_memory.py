@@ -1,11 +1,15 @@
 from typing import Any
-from collections.abc import Mapping, Iterable
+from collections.abc import Iterator, Mapping, Iterable
+from contextlib import contextmanager
+import copy
 import threading
 from stock_ai.workflows.persistence.base_persistence import Persistence
+from stock_ai.workflows.tracing import record_rows_read, record_rows_written
 
 class InMemoryPersistence(Persistence):
     """Thread-safe in-memory store"""
     def __init__(self):
+        super().__init__()
         self._d: dict[str, Any] = {}
         # use reentrant lock to allow same thread to re-acquire lock
         self._lock = threading.RLock()
@@ -16,11 +20,67 @@ class InMemoryPersistence(Persistence):
 
     def get(self, key: str, default: Any = None) -> Any:
         with self._lock:
-            return self._d.get(key, default)
+            value = self._d.get(key, default)
+        if isinstance(value, list):
+            record_rows_read(len(value))
+        return value
 
     def set(self, key: str, rows: list[dict]) -> None:
         with self._lock: 
             self._d[key] = rows
+        record_rows_written(len(rows))
+
+    def exists(self, key: str, **filters) -> bool:
+        with self._lock:
+            value = self._d.get(key)
+            if not value:
+                return False
+            if not filters:
+                return True
+            # rows stored as dicts can be matched on simple equality filters
+            return any(
+                isinstance(row, Mapping) and all(row.get(k) == v for k, v in filters.items())
+                for row in value
+            )
+
+    def exists_many(self, keys: Iterable[str], **filters) -> dict[str, bool]:
+        with self._lock:
+            return {key: self.exists(key, **filters) for key in keys}
+
+    @contextmanager
+    def transaction(self) -> Iterator["InMemoryPersistence"]:
+        """Holds the lock for the whole block and restores the previous state if it raises."""
+        with self._lock:
+            # deep copy, update_many changes stored rows in place
+            snapshot = copy.deepcopy(self._d)
+            try:
+                yield self
+            except BaseException:
+                self._d.clear()
+                self._d.update(snapshot)
+                raise
+
+    def update_many(self, table: str, rows: list[dict], key: str = "id") -> int:
+        """Update the stored dict rows of table whose key column matches one of rows."""
+        by_key = {row[key]: row for row in rows}
+        updated = 0
+        with self._lock:
+            for stored in self._d.get(table) or []:
+                if isinstance(stored, dict) and stored.get(key) in by_key:
+                    stored.update(by_key[stored[key]])
+                    updated += 1
+        record_rows_written(updated)
+        return updated
+
+    def upsert(self, table: str, rows: list[dict], key: str = "id") -> int:
+        """update_many, then append the rows whose key matched no stored row."""
+        with self._lock:
+            stored = {row.get(key) for row in self._d.get(table) or [] if isinstance(row, dict)}
+            self.update_many(table, [row for row in rows if row[key] in stored], key)
+            inserted = [dict(row) for row in rows if row[key] not in stored]
+            self._d.setdefault(table, []).extend(inserted)
+        record_rows_written(len(inserted))
+        return len(rows)
 
     def update(self, mapping: Mapping[str, Any]) -> None:
         with self._lock:
@@ -1,10 +1,25 @@
-from typing import Any, Mapping
-from sqlalchemy import Row, select, insert, text, CursorResult
+import csv
+import io
+import json
+import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterable, Mapping
+from sqlalchemy import Connection, Row, bindparam, literal, select, insert, text, update, CursorResult
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
 from sqlalchemy.sql.elements import TextClause
 
 from stock_ai.db.session import get_session
 from stock_ai.db.base import Base
 from stock_ai.workflows.persistence.base_persistence import Persistence
+from stock_ai.workflows.tracing import record_rows_read, record_rows_written
+
+# set() switches to bulk_insert at this many rows
+BULK_INSERT_THRESHOLD = int(os.getenv("DB_BULK_INSERT_THRESHOLD") or 500)
+# rows per COPY buffer / executemany batch, bounds memory for very large row sets
+BULK_INSERT_CHUNK_SIZE = int(os.getenv("DB_BULK_INSERT_CHUNK_SIZE") or 5000)
 
 
 class SqlAlchemyPersistence(Persistence):
@@ -18,27 +33,107 @@ class SqlAlchemyPersistence(Persistence):
     def __init__(self, registry: Mapping[str, type[Base]]):
         if not registry:
             raise ValueError("registry must not be empty")
+        super().__init__()
         self._registry = dict(registry)
+        # session of the transaction() open in the current thread/task, if any
+        self._tx_session: ContextVar[Session | None] = ContextVar("tx_session", default=None)
+
+    @contextmanager
+    def transaction(self) -> Iterator["SqlAlchemyPersistence"]:
+        """
+        Unit of work: every get/set/query/write/bulk_insert/exists call made inside
+        the block, in this thread or task, runs on one session and is committed once
+        at the end, or rolled back if the block raises.
+
+        with persistence.transaction() as tx:
+            tx.set("trades", trades)
+            tx.write(text("DELETE FROM positions WHERE ..."), {...})
+
+        Nested transaction() blocks join the outer one.
+        """
+        if self._tx_session.get() is not None:
+            yield self
+            return
+        with get_session() as s:
+            token = self._tx_session.set(s)
+            try:
+                yield self
+            finally:
+                self._tx_session.reset(token)
+
+    @contextmanager
+    def _session(self) -> Iterator[Session]:
+        """The open transaction's session, or a new one committed on exit."""
+        tx_session = self._tx_session.get()
+        if tx_session is not None:
+            yield tx_session
+            return
+        with get_session() as s:
+            yield s
+
+    def _commit(self, s: Session) -> None:
+        # inside transaction() the commit happens once, at the end of the block
+        if self._tx_session.get() is None:
+            s.commit()
 
 
     def get(self, table: str, **filters) -> Any:
         """
         SELECT * FROM table [with simple filters in **filters].
         """
+        with self._session() as s:
+            stmt = self._select_stmt(table, filters)
+            result = list(s.scalars(stmt).all())
+        record_rows_read(len(result))
+        return result
+
+    def exists(self, table: str, **filters) -> bool:
+        """
+        SELECT EXISTS (SELECT 1 FROM table WHERE ... LIMIT 1), no rows are loaded.
+        """
+        return self.exists_many([table], **filters)[table]
+
+    def exists_many(self, tables: Iterable[str], **filters) -> dict[str, bool]:
+        """
+        One EXISTS column per table in a single SELECT, e.g. to check all the tables
+        of a run at workflow start in one round trip.
+        """
+        tables = list(dict.fromkeys(tables))
+        if not tables:
+            return {}
+        stmt = select(*[self._exists_clause(t, filters).label(f"t{i}") for i, t in enumerate(tables)])
+        with self._session() as s:
+            row = s.execute(stmt).one()
+        return {t: bool(v) for t, v in zip(tables, row)}
+
+    def _exists_clause(self, table: str, filters: Mapping[str, Any]):
+        binded_model = self._model(table)
+        stmt = select(literal(1)).select_from(binded_model)
+        for k, v in filters.items():
+            stmt = stmt.where(self._column(binded_model, k) == v)
+        return stmt.limit(1).exists()
+
+    def _model(self, table: str) -> type[Base]:
         binded_model = self._registry.get(table)
         if not binded_model:
             raise KeyError(f"Unknown table {table}")
+        return binded_model
 
-        with get_session() as s:
-            stmt = select(binded_model)
-            for k, v in filters.items():
-                col = getattr(binded_model, k, None)
-                if not col:
-                    raise ValueError(f"Unknown column {k!r} for {binded_model.__name__}")
-                # this chain adds AND conditions
-                stmt = stmt.where(col == v)
+    @staticmethod
+    def _column(binded_model: type[Base], name: str):
+        col = getattr(binded_model, name, None)
+        if not col:
+            raise ValueError(f"Unknown column {name!r} for {binded_model.__name__}")
+        return col
+
+    def _select_stmt(self, table: str, filters: Mapping[str, Any]):
+        binded_model = self._model(table)
 
-            return list(s.scalars(stmt).all())
+        stmt = select(binded_model)
+        for k, v in filters.items():
+            # this chain adds AND conditions
+            stmt = stmt.where(self._column(binded_model, k) == v)
+        return stmt
 
     def set(self, table: str, rows: list[dict]) -> None:
         """
@@ -63,23 +158,212 @@ class SqlAlchemyPersistence(Persistence):
         if not rows:
             return
 
-        with get_session() as s:
+        if len(rows) >= BULK_INSERT_THRESHOLD:
+            # a single multi-row VALUES statement gets huge for e.g. 1000 posts with selftext
+            self.bulk_insert(table, rows)
+            return
+
+        self._insert_values(binded_model, rows)
+
+    def _insert_values(self, binded_model: type[Base], rows: list[dict]) -> None:
+        """One INSERT ... VALUES (...), (...) statement with all the rows."""
+        with self._session() as s:
             stmt = insert(binded_model).values(rows)
             s.execute(stmt)
-            s.commit()
+            self._commit(s)
+        record_rows_written(len(rows))
+
+    def bulk_insert(self, table: str, rows: list[dict], method: str | None = None,
+                    chunk_size: int = BULK_INSERT_CHUNK_SIZE) -> None:
+        """
+        Insert a large number of rows in one transaction, chunk_size rows at a time.
+
+        method:
+            "copy": stream the rows through COPY ... FROM STDIN (PostgreSQL + psycopg2 only).
+            "executemany": insert(model) with a list of parameter sets, which SQLAlchemy
+                batches with insertmanyvalues on every dialect.
+            None: "copy" when available, "executemany" otherwise.
+
+        Python-side column defaults (e.g. created_at) are filled in here, since COPY
+        bypasses SQLAlchemy.
+        """
+        binded_model = self._registry.get(table)
+        if not binded_model:
+            raise KeyError(f"Unknown table {table!r}")
+        if method not in (None, "copy", "executemany"):
+            raise ValueError(f"Unknown bulk insert method {method!r}")
+
+        if not rows:
+            return
+
+        columns, values = _bulk_rows(binded_model, rows)
+        with self._session() as s:
+            conn = s.connection()
+            can_copy = conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2"
+            if method == "copy" and not can_copy:
+                raise ValueError(f"COPY is not supported by {conn.dialect.name}+{conn.dialect.driver}")
+            for start in range(0, len(values), chunk_size):
+                chunk = values[start:start + chunk_size]
+                if method == "copy" or (method is None and can_copy):
+                    _copy_chunk(conn, binded_model.__tablename__, columns, chunk)
+                else:
+                    s.execute(insert(binded_model), [dict(zip(columns, v)) for v in chunk])
+        record_rows_written(len(rows))
+
+    def update_many(self, table: str, rows: list[dict], key: str = "id") -> int:
+        """
+        UPDATE table SET <other columns> WHERE <key> = :key, once per row, as a single
+        executemany in one transaction instead of one statement and commit per row.
+        With psycopg2's executemany_mode="values_plus_batch" (the default, see
+        EngineConfig) the rows are sent in pages, so N rows cost about one round trip.
+
+        Every row must have the same columns, including key.
+        """
+        binded_model = self._registry.get(table)
+        if not binded_model:
+            raise KeyError(f"Unknown table {table!r}")
+
+        if not rows:
+            return 0
+
+        tbl = binded_model.__table__
+        columns = _key_columns(binded_model, rows, key)
+
+        # bind names must not clash with the column names in the SET clause
+        stmt = (
+            update(tbl)
+            .where(tbl.c[key] == bindparam(f"b_{key}"))
+            .values({col: bindparam(f"b_{col}") for col in columns if col != key})
+        )
+        params = [{f"b_{col}": row[col] for col in columns} for row in rows]
+        with self._session() as s:
+            s.execute(stmt, params)
+            self._commit(s)
+        record_rows_written(len(rows))
+        return len(rows)
+
+    def upsert(self, table: str, rows: list[dict], key: str = "id") -> int:
+        """
+        INSERT ... ON CONFLICT (<key>) DO UPDATE SET <other columns> = excluded.<column>,
+        a single statement, so two writers of the same key can't both insert it the
+        way an exists() check followed by set() or update_many() can.
+
+        key must have a unique constraint and every row the same columns, including
+        key. PostgreSQL and SQLite only.
+        """
+        binded_model = self._registry.get(table)
+        if not binded_model:
+            raise KeyError(f"Unknown table {table!r}")
+
+        if not rows:
+            return 0
+
+        tbl = binded_model.__table__
+        columns = _key_columns(binded_model, rows, key)
+        with self._session() as s:
+            dialect = s.connection().dialect.name
+            dialect_insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(dialect)
+            if dialect_insert is None:
+                raise ValueError(f"upsert is not supported by {dialect}")
+            stmt = dialect_insert(tbl).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[key], set_={col: stmt.excluded[col] for col in columns if col != key})
+            s.execute(stmt)
+            self._commit(s)
+        record_rows_written(len(rows))
+        return len(rows)
 
     def update(self, mapping: Mapping[str, Any]) -> None:
         # No use cases for now.
         pass
 
     def query(self, text_clause: TextClause, params: dict) -> list[Row[Any]]:
-        with get_session() as s:
+        with self._session() as s:
             res = s.execute(text_clause, params)
-            return list(res.fetchall())
+            result = list(res.fetchall())
+        record_rows_read(len(result))
+        return result
 
     def write(self, text_clause: TextClause, params: dict) -> int:
         """Execute an UPDATE/INSERT/DELETE query and return rows affected."""
-        with get_session() as s:
+        with self._session() as s:
             res = s.execute(text_clause, params)
-            s.commit()
-            return res.rowcount # type: ignore[attr-defined]
\ No newline at end of file
+            self._commit(s)
+            rowcount = res.rowcount # type: ignore[attr-defined]
+        record_rows_written(rowcount)
+        return rowcount
+
+
+def _key_columns(binded_model: type[Base], rows: list[dict], key: str) -> list[str]:
+    """The columns of rows, checked for update_many and upsert: the same in every row, key included."""
+    tbl = binded_model.__table__
+    columns = list(rows[0])
+    if key not in columns:
+        raise ValueError(f"Rows must contain the key column {key!r}")
+    for row in rows:
+        if set(row) != set(columns):
+            raise ValueError("All rows must have the same columns")
+    for col in columns:
+        if col not in tbl.c:
+            raise ValueError(f"Unknown column {col!r} for {binded_model.__name__}")
+    return columns
+
+
+def _bulk_rows(binded_model: type[Base], rows: list[dict]) -> tuple[list[str], list[tuple]]:
+    """Column names and value tuples for a bulk insert.
+
+    Columns are the keys used by any row plus the columns with a Python-side
+    default, which is applied to the rows that do not set them.
+    """
+    table = binded_model.__table__
+    keys = set()
+    for row in rows:
+        keys.update(row)
+    unknown = keys - set(table.columns.keys())
+    if unknown:
+        raise ValueError(f"Unknown columns {sorted(unknown)!r} for {binded_model.__name__}")
+
+    defaults = {
+        c.key: c.default for c in table.columns
+        if c.default is not None and (c.default.is_callable or c.default.is_scalar)
+    }
+    columns = [c.key for c in table.columns if c.key in keys or c.key in defaults]
+
+    values = []
+    for row in rows:
+        value = []
+        for col in columns:
+            if col in row:
+                value.append(row[col])
+            elif col in defaults:
+                default = defaults[col]
+                value.append(default.arg(None) if default.is_callable else default.arg)
+            else:
+                value.append(None)
+        values.append(tuple(value))
+    return columns, values
+
+
+def _copy_chunk(conn: Connection, table: str, columns: list[str], values: list[tuple]) -> None:
+    """COPY one chunk of rows as CSV over the session's psycopg2 connection."""
+    buf = io.StringIO()
+    # QUOTE_NOTNULL: None is written as an unquoted empty field, which COPY reads as NULL,
+    # while empty strings are quoted and stay empty strings
+    writer = csv.writer(buf, quoting=csv.QUOTE_NOTNULL, lineterminator="\n")
+    for value in values:
+        writer.writerow([_copy_value(v) for v in value])
+    buf.seek(0)
+
+    quote = conn.dialect.identifier_preparer.quote
+    cols = ", ".join(quote(c) for c in columns)
+    sql = f"COPY {quote(table)} ({cols}) FROM STDIN WITH (FORMAT csv)"
+    with conn.connection.dbapi_connection.cursor() as cur:
+        cur.copy_expert(sql, buf)
+
+
+def _copy_value(v: Any) -> Any:
+    if isinstance(v, (dict, list)):
+        return json.dumps(v)
+    if isinstance(v, bool):
+        return "true" if v else "false"
+    return v
@@ -1,7 +1,10 @@
+from stock_ai.agents.batch_runner import OpenAIBatchRunner
+from stock_ai.agents.llm_backend import get_llm_backend_name
 from stock_ai.agents.reddit_agents.reddit_base_agent import RedditBaseAgent
+from stock_ai.agents.resilience import is_transient
 from stock_ai.agents.stock_plan_agents.data_classes import FinalRecommendation
 from stock_ai.agents.stock_plan_agents.stock_picker_agent import StockPickerAgent
-from stock_ai.reddit.types import RedditPost
+from stock_ai.reddit.types import RedditPost, ScrapeCursor, ScrapeSource
 from stock_ai.reddit.post_scrape_filter import AfterScrapeFilter
 from stock_ai.agents.reddit_agents.data_classes import StockRecommendation
 from stock_ai.agents.reddit_agents.news_agent import NewsAgent
@@ -11,25 +14,89 @@ from stock_ai.workflows.persistence.sql_alchemy_persistence import SqlAlchemyPer
 from stock_ai.workflows.workflow_base import StepFn, Step, StepFnFactories, StepFns, Workflow
 from stock_ai.notifiers.discord.reddit_stock_notifier import send_stock_recommendations_to_discord
 from stock_ai.workflows.common.api_clients import get_openai_client, get_reddit_scraper
-from stock_ai.workflows.common.utils import idempotency_check
+from stock_ai.workflows.common.utils import (
+    completed_work_units, idempotency_check, mark_work_unit_done, prefetch_idempotency)
 from stock_ai.workflows.common.common_step_fns import s_insert_run_metadata
+from stock_ai.workflows.tracing import with_trace_attributes
 
+import asyncio
+import os
+from collections.abc import Iterator
 from dataclasses import asdict
-from sqlalchemy import text, bindparam
+from datetime import datetime, timedelta
+from sqlalchemy import DateTime, text, bindparam
+
+# comma-separated ScrapeSource specs, see get_reddit_sources
+DEFAULT_REDDIT_SOURCES = "wallstreetbets:new:News|DD|YOLO"
+
+# the flairs a Reddit agent analyzes, see a_news_factory, a_dd_factory and a_yolo_factory
+AGENT_FLAIRS = ("News", "DD", "YOLO")
+
+
+def get_reddit_sources() -> list[ScrapeSource]:
+    """Listings s_scrape scrapes, from REDDIT_SOURCES, e.g.
+    "wallstreetbets:new:News|DD|YOLO,stocks:hot:Company Discussion=DD".
+
+    Every flair of a source must be stored under one of AGENT_FLAIRS, either
+    because the subreddit uses that flair or through a flair=AGENT_FLAIR rename,
+    otherwise its posts would be scraped but never analyzed.
+    """
+    spec = os.getenv("REDDIT_SOURCES") or DEFAULT_REDDIT_SOURCES
+    sources = [ScrapeSource.parse(s) for s in spec.split(",") if s.strip()]
+    for source in sources:
+        stored = source.stored_flairs()
+        if stored is None:
+            raise ValueError(f"Reddit source r/{source.subreddit} {source.listing} needs flairs, "
+                             f"e.g. {source.subreddit}:{source.listing}:News|DD|YOLO")
+        unhandled = stored - set(AGENT_FLAIRS)
+        if unhandled:
+            raise ValueError(f"No agent analyzes flairs {sorted(unhandled)} of Reddit source r/{source.subreddit}, "
+                             f"map them to one of {', '.join(AGENT_FLAIRS)} with flair=DD")
+    return sources
+
 
 def s_scrape(persistence: SqlAlchemyPersistence, run_id: str) -> None:
+    """Scrape the posts of the last cut_off_days days of the get_reddit_sources() listings into reddit_posts.
+
+    Several sources are scraped concurrently (REDDIT_SCRAPE_WORKERS threads, default 4)
+    and their posts deduplicated by reddit_id.
+
+    REDDIT_SCRAPE_INCREMENTAL=1 only fetches the posts of the `new` listings newer
+    than the subreddit's row in reddit_cursors and takes the older posts of the
+    window from the reddit_posts of earlier runs. Their score, comments and
+    upvote ratio are the ones of that earlier scrape.
+    """
     if idempotency_check(persistence, run_id, "reddit_posts"):
         print(f"Posts already scraped for run_id {run_id}, skipping scrape step")
         return
 
     reddit_scraper = get_reddit_scraper()
-    flairs_want = {"News", "DD", "YOLO"}
-    subreddit_name = "wallstreetbets"
+    sources = get_reddit_sources()
+    incremental = os.getenv("REDDIT_SCRAPE_INCREMENTAL") == "1"
     cut_off_days = 7
 
-    posts = reddit_scraper.scrape(
-        subreddit_name, flairs_want,
-        skip_empty_selftext=True, cut_off_days=cut_off_days)
+    cursors = {}
+    if incremental:
+        for source in sources:
+            cursor = load_reddit_cursor(persistence, source.subreddit) if source.listing == "new" else None
+            if cursor is not None:
+                cursors[source.subreddit] = cursor
+
+    if len(sources) == 1 and sources[0].listing == "new" and not sources[0].renamed:
+        source = sources[0]
+        posts, cursor = reddit_scraper.scrape_since(
+            source.subreddit, cursors.get(source.subreddit), source.flairs,
+            skip_empty_selftext=True, cut_off_days=cut_off_days)
+        cursors = {source.subreddit: cursor} if cursor is not None else {}
+    else:
+        posts, cursors = reddit_scraper.scrape_many(
+            sources, cursors, skip_empty_selftext=True, cut_off_days=cut_off_days,
+            max_workers=int(os.getenv("REDDIT_SCRAPE_WORKERS") or 4))
+
+    if incremental:
+        stored = [p for source in sources if source.listing == "new"
+                  for p in _stored_posts(persistence, run_id, source.subreddit, source.stored_flairs(), cut_off_days)]
+        posts = _merge_posts(posts, stored)
 
     # RedditPost model to dict rows
     rows = []
@@ -39,7 +106,180 @@ def s_scrape(persistence: SqlAlchemyPersistence, run_id: str) -> None:
             d["run_id"] = run_id
             rows.append(d)
 
-    persistence.set("reddit_posts", rows)
+    # the cursors only move on with the posts they skip next time
+    with persistence.transaction() as tx:
+        tx.set("reddit_posts", rows)
+        if incremental:
+            for cursor in cursors.values():
+                save_reddit_cursor(tx, cursor)
+
+
+# step of the checkpoints of the reddit_posts chunks s_scrape_and_filter wrote, one per chunk
+STREAM_STEP = "scrape and filter reddit"
+
+
+def s_scrape_and_filter(persistence: SqlAlchemyPersistence, run_id: str) -> None:
+    """s_scrape and s_filter as one stream, the reddit step of REDDIT_SCRAPE_STREAMING=1.
+
+    Posts go to reddit_posts in chunks of REDDIT_STREAM_CHUNK_SIZE (default 200)
+    while the listings are still being paged, and through AfterScrapeFilter's
+    online state, so the filtered posts are ready when the scrape ends without
+    reading reddit_posts back. The last chunk, the filtered posts and the
+    cursors are committed together: a run without filtered posts didn't finish
+    the step, its chunks are deleted and the step starts over.
+
+    Every chunk is checkpointed in the transaction that writes it, so only the
+    chunks of this step are deleted. Posts of a run without chunk checkpoints
+    come from s_scrape, which writes all of them in one transaction, so they
+    are only filtered.
+    """
+    if idempotency_check(persistence, run_id, "reddit_filtered_posts"):
+        print(f"Posts already scraped and filtered for run_id {run_id}, skipping scrape and filter step")
+        return
+    if completed_work_units(persistence, run_id, STREAM_STEP):
+        print(f"Deleting the reddit_posts chunks of an unfinished scrape and filter step for run_id {run_id}")
+        with persistence.transaction() as tx:
+            tx.write(text("DELETE FROM reddit_posts WHERE run_id = :run_id"), {"run_id": run_id})
+            tx.write(text("DELETE FROM step_checkpoints WHERE run_id = :run_id AND step = :step"),
+                     {"run_id": run_id, "step": STREAM_STEP})
+    elif persistence.exists("reddit_posts", run_id=run_id):
+        print(f"Posts already scraped for run_id {run_id}, filtering them")
+        s_filter(persistence, run_id)
+        return
+
+    reddit_scraper = get_reddit_scraper()
+    sources = get_reddit_sources()
+    incremental = os.getenv("REDDIT_SCRAPE_INCREMENTAL") == "1"
+    cut_off_days = 7
+    chunk_size = int(os.getenv("REDDIT_STREAM_CHUNK_SIZE") or 200)
+
+    cursors = {}
+    if incremental:
+        for source in sources:
+            cursor = load_reddit_cursor(persistence, source.subreddit) if source.listing == "new" else None
+            if cursor is not None:
+                cursors[source.subreddit] = cursor
+
+    posts = reddit_scraper.iter_posts(
+        sources, cursors, skip_empty_selftext=True, cut_off_days=cut_off_days,
+        max_workers=int(os.getenv("REDDIT_SCRAPE_WORKERS") or 4), buffer_size=chunk_size)
+    if incremental:
+        posts = _with_stored_posts(posts, persistence, run_id, sources, cut_off_days)
+
+    post_filter = AfterScrapeFilter()
+    chunk = []
+    written = 0
+    chunks = 0
+    for p in posts:
+        post_filter.add(p)
+        d = asdict(p)
+        d["run_id"] = run_id
+        chunk.append(d)
+        if len(chunk) >= chunk_size:
+            _write_chunk(persistence, run_id, chunks, chunk)
+            written += len(chunk)
+            chunks += 1
+            chunk = []
+    filtered = post_filter.finish()
+
+    rows = []
+    for _, plist in filtered.items():
+        for p in plist:
+            d = asdict(p)
+            d["run_id"] = run_id
+            rows.append(d)
+
+    with persistence.transaction() as tx:
+        if chunk:
+            _write_chunk(tx, run_id, chunks, chunk)
+        tx.set("reddit_filtered_posts", rows)
+        if incremental:
+            for cursor in cursors.values():
+                save_reddit_cursor(tx, cursor)
+    print(f"Streamed {written + len(chunk)} posts into reddit_posts, {len(rows)} filtered")
+
+
+def _write_chunk(persistence: SqlAlchemyPersistence, run_id: str, index: int, rows: list[dict]) -> None:
+    """A chunk of s_scrape_and_filter's reddit_posts, committed with its checkpoint."""
+    with persistence.transaction() as tx:
+        tx.set("reddit_posts", rows)
+        mark_work_unit_done(tx, run_id, STREAM_STEP, f"chunk {index}")
+
+
+def _with_stored_posts(scraped: Iterator[RedditPost], persistence: SqlAlchemyPersistence, run_id: str,
+                       sources: list[ScrapeSource], cut_off_days: int) -> Iterator[RedditPost]:
+    """The scraped posts, then the stored ones of the `new` sources not scraped again (streaming _merge_posts)."""
+    seen = set()
+    for p in scraped:
+        seen.add(p.reddit_id)
+        yield p
+    for source in sources:
+        if source.listing != "new":
+            continue
+        for p in _stored_posts(persistence, run_id, source.subreddit, source.stored_flairs(), cut_off_days):
+            if p.reddit_id in seen:
+                continue
+            seen.add(p.reddit_id)
+            yield p
+
+
+def load_reddit_cursor(persistence: SqlAlchemyPersistence, subreddit_name: str) -> ScrapeCursor | None:
+    """The stored cursor of a subreddit, None if it was never scraped incrementally."""
+    rows = persistence.get("reddit_cursors", subreddit=subreddit_name)
+    if not rows:
+        return None
+    return ScrapeCursor(subreddit_name, rows[0].created_utc, rows[0].reddit_id)
+
+
+def save_reddit_cursor(persistence: SqlAlchemyPersistence, cursor: ScrapeCursor) -> None:
+    """Insert or update the reddit_cursors row of the cursor's subreddit."""
+    row = {
+        "subreddit": cursor.subreddit,
+        "created_utc": cursor.created_utc,
+        "reddit_id": cursor.reddit_id,
+        "updated_at": datetime.utcnow(),
+    }
+    persistence.upsert("reddit_cursors", [row], key="subreddit")
+
+
+def _stored_posts(persistence: SqlAlchemyPersistence, run_id: str, subreddit_name: str,
+                  flairs_want: set[str] | None, cut_off_days: int) -> list[RedditPost]:
+    """Posts of the subreddit stored by the latest earlier run and still in the window.
+
+    Every run stores the whole window of its sources, so the latest one is
+    enough. Runs of s_scrape_and_filter that wrote chunks but no filtered
+    posts didn't finish and are skipped.
+    """
+    # reddit_posts.created is naive local time, like RedditScraper writes it
+    cutoff = datetime.now() - timedelta(days=cut_off_days)
+    text_clause = text(
+        "SELECT * FROM reddit_posts WHERE subreddit = :subreddit AND created >= :cutoff AND run_id = ("
+        "  SELECT p.run_id FROM reddit_posts p WHERE p.subreddit = :subreddit AND p.run_id != :run_id"
+        "  AND (NOT EXISTS (SELECT 1 FROM step_checkpoints c WHERE c.run_id = p.run_id AND c.step = :step)"
+        "       OR EXISTS (SELECT 1 FROM reddit_filtered_posts f WHERE f.run_id = p.run_id))"
+        "  ORDER BY p.id DESC LIMIT 1"
+        ") ORDER BY id DESC"
+    ).columns(created=DateTime)
+    rows = persistence.query(text_clause, {
+        "subreddit": subreddit_name, "cutoff": cutoff, "run_id": run_id,
+        "step": STREAM_STEP})
+    return [RedditPost.from_orm(r) for r in rows if not flairs_want or r.flair in flairs_want]
+
+
+def _merge_posts(scraped: dict[str, list[RedditPost]], stored: list[RedditPost]) -> dict[str, list[RedditPost]]:
+    """Scraped posts plus the stored ones not scraped again, one per reddit_id, newest first per flair."""
+    seen = set()
+    merged: dict[str, list[RedditPost]] = {}
+    for p in [p for plist in scraped.values() for p in plist] + stored:
+        if p.reddit_id in seen:
+            continue
+        seen.add(p.reddit_id)
+        merged.setdefault(p.flair, []).append(p)
+    for plist in merged.values():
+        plist.sort(key=lambda p: p.created, reverse=True)
+    print(f"Merged {sum(len(v) for v in scraped.values())} new posts with {len(stored)} stored ones "
+          f"into {len(seen)} posts")
+    return merged
 
 def s_filter(persistence: SqlAlchemyPersistence, run_id: str) -> None:
     if idempotency_check(persistence, run_id, "reddit_filtered_posts"):
@@ -67,14 +307,49 @@ def s_filter(persistence: SqlAlchemyPersistence, run_id: str) -> None:
 
 # -------- Some factory functions to generate step functions for each Reddit post --------
 # need this to resolve late binding closure issue
-def _make_stock_step_fn(agent_type: str, agent:RedditBaseAgent, p: RedditPost) -> StepFn:
-    def step_fn(persistence: SqlAlchemyPersistence, run_id: str) -> None:
+def _make_stock_step_fn(agent_type: str, agent:RedditBaseAgent, posts: list[RedditPost]) -> StepFn:
+    if os.getenv("WORKFLOW_ASYNC") == "1":
+        # all per-post agent calls run on the workflow's event loop, paced by the shared rate limiter
+        async def step_fn(persistence: SqlAlchemyPersistence, run_id: str) -> None:
+            try:
+                recs = await agent.aact(posts)
+            except Exception as e:
+                _skip_failed_posts(agent_type, posts, e)
+                return
+            await asyncio.to_thread(_save_stock_recs, persistence, run_id, agent_type, agent, posts, recs)
+    else:
+        def step_fn(persistence: SqlAlchemyPersistence, run_id: str) -> None:
+            try:
+                recs = agent.act(posts)
+            except Exception as e:
+                _skip_failed_posts(agent_type, posts, e)
+                return
+            _save_stock_recs(persistence, run_id, agent_type, agent, posts, recs)
+    return with_trace_attributes(step_fn, name=f"{agent_type} agent",
+                                 reddit_id=",".join(p.reddit_id for p in posts),
+                                 url=",".join(p.url for p in posts))
+
+
+def _skip_failed_posts(agent_type: str, posts: list[RedditPost], e: Exception) -> None:
+    """Let the other posts of the step go on if the agent call still failed transiently after its retries.
 
-        recs = agent.act([p])
-        agent.evaluate(recs, actual_reddit_post_url=p.url)
+    The posts are not checkpointed: a_picker_factory then fails the run, and resuming
+    it retries them. Other errors are raised.
+    """
+    if not is_transient(e):
+        raise e
+    print(f"[skip] {agent_type} agent failed for posts {[p.reddit_id for p in posts]} after retries: {e}")
+
+
+def _save_stock_recs(persistence: SqlAlchemyPersistence, run_id: str, agent_type: str, agent: RedditBaseAgent,
+                     posts: list[RedditPost], recs) -> None:
+    by_post = agent.split_by_post(recs, posts) if len(posts) > 1 else {posts[0].reddit_id: recs}
+    rows = []
+    for p in posts:
+        post_recs = by_post[p.reddit_id]
+        post_recs = agent.evaluate(post_recs, actual_reddit_post_url=p.url)
 
-        rows = []
-        for r in recs.recommendations:
+        for r in post_recs.recommendations:
             print(r.ticker, r.decision)
             if r.decision == "BUY":
                 stock_rec_dc = StockRecommendation.from_pydantic(r)
@@ -82,28 +357,75 @@ def _make_stock_step_fn(agent_type: str, agent:RedditBaseAgent, p: RedditPost) -
                 d["run_id"] = run_id
                 rows.append(d)
 
-        persistence.set(f"{agent_type.lower()}_recommendations", rows)
-    return step_fn
+    # the checkpoints are committed with the recommendations, so a resumed run neither
+    # skips a post without recommendations nor stores them twice
+    with persistence.transaction() as tx:
+        tx.set(f"{agent_type.lower()}_recommendations", rows)
+        for p in posts:
+            mark_work_unit_done(tx, run_id, f"{agent_type} agent", p.reddit_id)
+
+
+def _make_stock_batch_step_fn(agent_type: str, agent: RedditBaseAgent, post_groups: list[list[RedditPost]]) -> StepFn:
+    """One StepFn submitting the agent calls of all post groups as a single OpenAI batch."""
+    def step_fn(persistence: SqlAlchemyPersistence, run_id: str) -> None:
+        runner = OpenAIBatchRunner(agent.open_ai_client)
+        results = agent.act_batch(post_groups, runner)
+        failed = []
+        for posts, recs in zip(post_groups, results):
+            if isinstance(recs, Exception):
+                print(f"{agent_type} agent failed for posts {[p.reddit_id for p in posts]}: {recs}")
+                failed.append(recs)
+                continue
+            _save_stock_recs(persistence, run_id, agent_type, agent, posts, recs)
+        if failed:
+            # the posts that succeeded are checkpointed, a rerun only resubmits the failed ones
+            raise RuntimeError(f"{len(failed)} of {len(post_groups)} {agent_type} batch requests failed") from failed[0]
+    return with_trace_attributes(step_fn, name=f"{agent_type} agent batch",
+                                 posts=sum(len(posts) for posts in post_groups))
 
 
 def _generate_stock_agent_step_functions(agent_type: str, reddit_posts: list[RedditPost]) -> list[StepFn]:
-    """ Generate step functions for each Reddit post for the given agent type. """
-    openai = get_openai_client()
+    """ Generate step functions for the Reddit posts for the given agent type.
+
+    One post per agent call by default. REDDIT_AGENT_BATCH_TOKENS > 0 packs
+    several posts per call, up to that many (estimated) prompt tokens and
+    REDDIT_AGENT_BATCH_MAX_POSTS (default 8) posts: fewer calls, each one slower.
+
+    AGENT_EXECUTION=batch sends all calls of the agent type through the OpenAI
+    Batch API as one StepFn instead: cheaper, but it can take hours. It needs
+    LLM_BACKEND=openai.
+    """
+    openai = get_openai_client() if get_llm_backend_name() == "openai" else None
     if agent_type == "News":
         agent = NewsAgent(openai)
     elif agent_type == "DD":
         agent = DDAgent(openai)
     elif agent_type == "YOLO":
         agent = YoloAgent(openai)
+
+    token_budget = int(os.getenv("REDDIT_AGENT_BATCH_TOKENS") or 0)
+    if token_budget > 0:
+        max_posts = int(os.getenv("REDDIT_AGENT_BATCH_MAX_POSTS") or 8)
+        batches = agent.pack_posts(reddit_posts, token_budget, max_posts)
+        print(f"{agent_type}: {len(reddit_posts)} posts packed into {len(batches)} agent calls")
+    else:
+        batches = [[p] for p in reddit_posts]
+
+    if os.getenv("AGENT_EXECUTION") == "batch":
+        if agent.open_ai_client is None:
+            raise ValueError(f"AGENT_EXECUTION=batch needs the OpenAI Batch API, "
+                             f"LLM_BACKEND={get_llm_backend_name()} has no OpenAI client")
+        return [_make_stock_batch_step_fn(agent_type, agent, batches)] if batches else []
+
     step_fns = []
-    for p in reddit_posts:
-        step_fn = _make_stock_step_fn(agent_type, agent, p)
+    for batch in batches:
+        step_fn = _make_stock_step_fn(agent_type, agent, batch)
         step_fns.append(step_fn)
 
     return step_fns
 
 def _make_picker_step_fn(stock_recommendations: list[StockRecommendation]) -> list[StepFn]:
-    openai = get_openai_client()
+    openai = get_openai_client() if get_llm_backend_name() == "openai" else None
     stock_picker_agent = StockPickerAgent(openai)
     def step_fn(persistence: SqlAlchemyPersistence, run_id: str) -> None:
         final_recs = stock_picker_agent.act(stock_recommendations)
@@ -133,36 +455,43 @@ def _make_picker_step_fn(stock_recommendations: list[StockRecommendation]) -> li
             final_rows.append(row)
 
         persistence.set("final_recommendations", final_rows)
-    return [step_fn]
+    return [with_trace_attributes(step_fn, name="stock picker agent", recommendations=len(stock_recommendations))]
 
 #-------- End of factory functions --------
 
+def _pending_posts(persistence: SqlAlchemyPersistence, run_id: str, flair: str) -> list[RedditPost]:
+    """ Filtered posts of the flair whose agent call has not finished yet for this run_id. """
+    filtered_posts = persistence.get("reddit_filtered_posts", run_id=run_id, flair=flair)
+    done = completed_work_units(persistence, run_id, f"{flair} agent")
+    pending = []
+    seen = set()
+    for p in filtered_posts:
+        # a no-idempotency- rerun can filter the same post twice
+        if p.reddit_id in done or p.reddit_id in seen:
+            continue
+        seen.add(p.reddit_id)
+        pending.append(p)
+    if done:
+        print(f"{len(done)} {flair} posts already analyzed for run_id {run_id}, {len(pending)} left")
+    return pending
+
 def a_news_factory(persistence: SqlAlchemyPersistence, run_id: str) -> list[StepFn]:
-    if idempotency_check(persistence, run_id, "news_recommendations"):
-        print(f"News recommendations already generated for run_id {run_id}, skipping news agent step")
-        return []
     flair = "News"
-    filtered_posts = persistence.get("reddit_filtered_posts", run_id=run_id, flair=flair)
+    filtered_posts = _pending_posts(persistence, run_id, flair)
     step_fns = _generate_stock_agent_step_functions(flair, filtered_posts)
 
     return step_fns
 
 def a_dd_factory(persistence: SqlAlchemyPersistence, run_id: str) -> list[StepFn]:
-    if idempotency_check(persistence, run_id, "dd_recommendations"):
-        print(f"DD recommendations already generated for run_id {run_id}, skipping DD agent step")
-        return []
     flair = "DD"
-    filtered_posts = persistence.get("reddit_filtered_posts", run_id=run_id, flair=flair)
+    filtered_posts = _pending_posts(persistence, run_id, flair)
     step_fns = _generate_stock_agent_step_functions(flair, filtered_posts)
 
     return step_fns
 
 def a_yolo_factory(persistence: SqlAlchemyPersistence, run_id: str) -> list[StepFn]:
-    if idempotency_check(persistence, run_id, "yolo_recommendations"):
-        print(f"YOLO recommendations already generated for run_id {run_id}, skipping YOLO agent step")
-        return []
     flair = "YOLO"
-    filtered_posts = persistence.get("reddit_filtered_posts", run_id=run_id, flair=flair)
+    filtered_posts = _pending_posts(persistence, run_id, flair)
     step_fns = _generate_stock_agent_step_functions(flair, filtered_posts)
 
     return step_fns
@@ -171,6 +500,11 @@ def a_picker_factory(persistence: SqlAlchemyPersistence, run_id: str) -> list[St
     if idempotency_check(persistence, run_id, "final_recommendations"):
         print(f"Final recommendations already generated for run_id {run_id}, skipping Picker agent step")
         return []
+    # posts skipped by _skip_failed_posts: picking now would publish a partial result that a
+    # resumed run could never complete, fail the run instead so the resume retries them first
+    unfinished = {flair: len(_pending_posts(persistence, run_id, flair)) for flair in AGENT_FLAIRS}
+    if any(unfinished.values()):
+        raise RuntimeError(f"Posts still unanalyzed for run_id {run_id}: {unfinished}, resume the run to retry them")
     text_clause = text(
         "SELECT * FROM news_recommendations WHERE run_id = :run_id UNION ALL " \
         "SELECT * FROM dd_recommendations WHERE run_id = :run_id UNION ALL " \
@@ -200,16 +534,44 @@ def s_notify_discord(persistence: SqlAlchemyPersistence, run_id: str) -> None:
     send_stock_recommendations_to_discord(final_recs)
 
 def init_workflow(run_id: str, persistence: SqlAlchemyPersistence) -> Workflow:
+    # one round trip for the idempotency checks of all steps
+    prefetch_idempotency(persistence, run_id, ["run_metadata", "reddit_posts", "reddit_filtered_posts", "final_recommendations"])
+    if os.getenv("REDDIT_SCRAPE_STREAMING") == "1":
+        reddit_steps = [
+            Step(STREAM_STEP, StepFns(functions=[s_scrape_and_filter]),
+                 reads=["reddit_cursors", "step_checkpoints"],
+                 writes=["reddit_posts", "reddit_filtered_posts", "reddit_cursors", "step_checkpoints"]),
+        ]
+    else:
+        reddit_steps = [
+            Step("scrape reddit", StepFns(functions=[s_scrape]),
+                 reads=["reddit_cursors"],
+                 writes=["reddit_posts", "reddit_cursors"]),
+            Step("filter posts", StepFns(functions=[s_filter]),
+                 reads=["reddit_posts"],
+                 writes=["reddit_filtered_posts"],
+                 resources=["db"]),
+        ]
     reddit_stock_workflow = Workflow(
         run_id=run_id,
         persistence=persistence,
+        metrics_table="run_metrics",
         steps=[
-            Step("insert run metadata", StepFns(functions=[s_insert_run_metadata])),
-            Step("scrape reddit", StepFns(functions=[s_scrape])),
-            Step("filter posts", StepFns(functions=[s_filter])),
-            Step("run stock agents", StepFnFactories(factories=[a_news_factory, a_dd_factory, a_yolo_factory])),
-            Step("run stock picker agent", StepFnFactories(factories=[a_picker_factory])),
-            Step("merge and notify discord", StepFns(functions=[s_notify_discord])),
+            Step("insert run metadata", StepFns(functions=[s_insert_run_metadata]),
+                 writes=["run_metadata"],
+                 resources=["db"]),
+            *reddit_steps,
+            Step("run stock agents", StepFnFactories(factories=[a_news_factory, a_dd_factory, a_yolo_factory]),
+                 reads=["reddit_filtered_posts"],
+                 writes=["news_recommendations", "dd_recommendations", "yolo_recommendations", "step_checkpoints"],
+                 resources=["openai"]),
+            Step("run stock picker agent", StepFnFactories(factories=[a_picker_factory]),
+                 reads=["news_recommendations", "dd_recommendations", "yolo_recommendations"],
+                 writes=["final_recommendations"],
+                 resources=["openai"]),
+            Step("merge and notify discord", StepFns(functions=[s_notify_discord]),
+                 reads=["final_recommendations"],
+                 resources=["db"]),
         ]
     )
     return reddit_stock_workflow
@@ -0,0 +1,238 @@
+"""Structured timing spans for workflow runs.
+
+The Workflow engine opens a span for every step, factory and StepFn. Code running
+inside a span (Persistence, agents, API clients) reports what it did through the
+record_* functions, which are no-ops outside of a span.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any
+
+
+@dataclass
+class Span:
+    run_id: str
+    name: str
+    kind: str  # "step", "factory" or "step_fn"
+    step: str
+    span_id: str
+    parent_span_id: str | None = None
+    start: float = 0.0  # unix timestamp in seconds
+    end: float | None = None
+    duration_ms: float | None = None
+    thread: str = ""
+    success: bool | None = None
+    error: str | None = None
+    rows_read: int = 0
+    rows_written: int = 0
+    external_calls: dict[str, int] = field(default_factory=dict)
+    external_call_seconds: dict[str, float] = field(default_factory=dict)
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+_lock = threading.Lock()
+
+
+def record_rows_read(n: int) -> None:
+    span = _current_span.get()
+    if span is not None:
+        with _lock:
+            span.rows_read += n
+
+
+def record_rows_written(n: int) -> None:
+    span = _current_span.get()
+    if span is not None:
+        with _lock:
+            span.rows_written += n
+
+
+def record_external_call(service: str, seconds: float = 0.0) -> None:
+    """Count a call to an external service (openai, yahoo, reddit, discord) in the current span."""
+    span = _current_span.get()
+    if span is not None:
+        with _lock:
+            span.external_calls[service] = span.external_calls.get(service, 0) + 1
+            span.external_call_seconds[service] = span.external_call_seconds.get(service, 0.0) + seconds
+
+
+def with_trace_attributes(fn, name: str | None = None, **attributes: Any):
+    """Attach a span name and attributes (e.g. reddit_id) to a StepFn so its span is identifiable."""
+    if name:
+        fn.trace_name = name
+    fn.trace_attributes = attributes
+    return fn
+
+
+class RunTracer:
+    """Collects the spans of one workflow run. Thread-safe."""
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.trace_id = uuid.uuid4().hex
+        self.spans: list[Span] = []
+        self._by_id: dict[str, Span] = {}
+
+    def start_span(self, name: str, kind: str, step: str, parent: Span | None = None,
+                   attributes: dict[str, Any] | None = None) -> Span:
+        span = Span(
+            run_id=self.run_id,
+            name=name,
+            kind=kind,
+            step=step,
+            span_id=uuid.uuid4().hex[:16],
+            parent_span_id=parent.span_id if parent else None,
+            start=time.time(),
+            thread=threading.current_thread().name,
+            attributes=dict(attributes or {}),
+        )
+        with _lock:
+            self.spans.append(span)
+            self._by_id[span.span_id] = span
+        return span
+
+    def end_span(self, span: Span, error: BaseException | None = None) -> None:
+        span.end = time.time()
+        span.duration_ms = (span.end - span.start) * 1000
+        span.success = error is None
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        # roll counters up so a step span holds the totals of its StepFns
+        with _lock:
+            parent = self._by_id.get(span.parent_span_id) if span.parent_span_id else None
+            if parent is not None:
+                parent.rows_read += span.rows_read
+                parent.rows_written += span.rows_written
+                for service, count in span.external_calls.items():
+                    parent.external_calls[service] = parent.external_calls.get(service, 0) + count
+                for service, seconds in span.external_call_seconds.items():
+                    parent.external_call_seconds[service] = parent.external_call_seconds.get(service, 0.0) + seconds
+
+    @contextmanager
+    def span(self, name: str, kind: str, step: str, parent: Span | None = None,
+             attributes: dict[str, Any] | None = None) -> Iterator[Span]:
+        """Open a span and make it the current one for record_* calls in this thread/task."""
+        span = self.start_span(name, kind, step, parent, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            self.end_span(span, e)
+            raise
+        else:
+            self.end_span(span)
+        finally:
+            _current_span.reset(token)
+
+    # -------- exporters --------
+
+    def to_jsonl(self) -> str:
+        """One JSON object per span."""
+        with _lock:
+            return "".join(json.dumps(asdict(span), default=str) + "\n" for span in self.spans)
+
+    def to_otlp(self) -> dict:
+        """Spans in the OpenTelemetry OTLP/JSON trace format, loadable by OTLP collectors and Jaeger."""
+        def attr(key: str, value: Any) -> dict:
+            if isinstance(value, bool):
+                return {"key": key, "value": {"boolValue": value}}
+            if isinstance(value, int):
+                return {"key": key, "value": {"intValue": str(value)}}
+            if isinstance(value, float):
+                return {"key": key, "value": {"doubleValue": value}}
+            return {"key": key, "value": {"stringValue": str(value)}}
+
+        otlp_spans = []
+        with _lock:
+            spans = list(self.spans)
+        for span in spans:
+            attributes = [
+                attr("workflow.run_id", span.run_id),
+                attr("workflow.kind", span.kind),
+                attr("workflow.step", span.step),
+                attr("thread.name", span.thread),
+                attr("db.rows_read", span.rows_read),
+                attr("db.rows_written", span.rows_written),
+            ]
+            attributes += [attr(f"external_calls.{k}", v) for k, v in span.external_calls.items()]
+            attributes += [attr(k, v) for k, v in span.attributes.items()]
+            otlp_span = {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(int(span.start * 1e9)),
+                "endTimeUnixNano": str(int((span.end or span.start) * 1e9)),
+                "attributes": attributes,
+                # STATUS_CODE_OK = 1, STATUS_CODE_ERROR = 2
+                "status": {"code": 2, "message": span.error} if span.success is False else {"code": 1},
+            }
+            if span.parent_span_id:
+                otlp_span["parentSpanId"] = span.parent_span_id
+            otlp_spans.append(otlp_span)
+
+        return {"resourceSpans": [{
+            "resource": {"attributes": [attr("service.name", "stock_ai")]},
+            "scopeSpans": [{"scope": {"name": "stock_ai.workflows"}, "spans": otlp_spans}],
+        }]}
+
+    def to_rows(self) -> list[dict]:
+        """Rows for the run_metrics table."""
+        rows = []
+        with _lock:
+            spans = list(self.spans)
+        for span in spans:
+            rows.append({
+                "run_id": span.run_id,
+                "span_id": span.span_id,
+                "parent_span_id": span.parent_span_id,
+                "name": span.name,
+                "kind": span.kind,
+                "step": span.step,
+                "start_time": datetime.fromtimestamp(span.start, tz=timezone.utc).replace(tzinfo=None),
+                "end_time": datetime.fromtimestamp(span.end, tz=timezone.utc).replace(tzinfo=None) if span.end else None,
+                "duration_ms": span.duration_ms,
+                "thread": span.thread,
+                "success": span.success,
+                "error": span.error,
+                "rows_read": span.rows_read,
+                "rows_written": span.rows_written,
+                "external_calls": span.external_calls,
+                "attributes": {**span.attributes, "external_call_seconds": span.external_call_seconds},
+            })
+        return rows
+
+    def export(self) -> None:
+        """Write the spans to WORKFLOW_TRACE_PATH if set, as JSON lines or OTLP JSON (WORKFLOW_TRACE_FORMAT=otlp)."""
+        path = os.getenv("WORKFLOW_TRACE_PATH")
+        if not path:
+            return
+        if os.getenv("WORKFLOW_TRACE_FORMAT", "jsonl") == "otlp":
+            with open(path, "w") as f:
+                json.dump(self.to_otlp(), f)
+        else:
+            with open(path, "a") as f:
+                f.write(self.to_jsonl())
+        print(f"Wrote {len(self.spans)} spans to {path}")
+
+    def summary(self) -> str:
+        """Slowest StepFns first, for the end of run log."""
+        with _lock:
+            fns = [s for s in self.spans if s.kind == "step_fn" and s.duration_ms is not None]
+        fns.sort(key=lambda s: s.duration_ms or 0, reverse=True)
+        lines = []
+        for s in fns[:5]:
+            status = "ok" if s.success else "failed"
+            lines.append(f"  {s.step} / {s.name} {s.attributes or ''}: {s.duration_ms:.0f}ms {status}, "
+                         f"rows r/w={s.rows_read}/{s.rows_written}, calls={s.external_calls}")
+        return "\n".join(lines)
@@ -1,11 +1,13 @@
 import os
 from stock_ai.agents.trade_agents.trade_agent import TradeAgent
+from stock_ai.agents.llm_backend import get_llm_backend_name
 from stock_ai.yahoo_finance.yahoo_finance_client import YahooFinanceClient
 from stock_ai.workflows.persistence.sql_alchemy_persistence import SqlAlchemyPersistence
 from stock_ai.workflows.workflow_base import StepFns, Step, Workflow
 from stock_ai.workflows.common.api_clients import get_openai_client
-from stock_ai.workflows.common.utils import idempotency_check
-from stock_ai.workflows.common.common_step_fns import s_insert_run_metadata
+from stock_ai.workflows.common.utils import idempotency_check, prefetch_idempotency
+from stock_ai.workflows.common.common_step_fns import (
+    s_insert_run_metadata, s_fetch_sp500_snapshot, get_sp500_price)
 from stock_ai.notifiers.discord.trade_notifier import send_trade_summary_to_discord
 from stock_ai.workflows.run_id_generator import RunIdType
 
@@ -80,42 +82,29 @@ def s_prepare_trade_inputs(persistence: SqlAlchemyPersistence, run_id: str) -> N
 
     # 4. Fetch current market prices for the recommended tickers and existing positions
     yf_client = YahooFinanceClient()
+    tickers = rec_tickers + [pos.ticker for pos in positions_rows]
+    print(f"Fetching current prices for {tickers}")
+    price_series = yf_client.get_current_prices_batch(tickers)
     prices = {}
-
-    for ticker in rec_tickers:
-        print(f"Fetching current price for {ticker}")
-        current_price = yf_client.get_current_price(ticker)
+    for ticker, current_price in price_series.items():
         if not math.isnan(current_price):
-            prices[ticker] = current_price
+            prices[ticker] = float(current_price)
         else:
             print(f"Warning: Could not fetch price for {ticker}")
-    for pos in positions_rows:
-        if pos.ticker not in prices:
-            print(f"Fetching current price for existing position {pos.ticker}")
-            current_price = yf_client.get_current_price(pos.ticker)
-            if not math.isnan(current_price):
-                prices[pos.ticker] = current_price
-            else:
-                print(f"Warning: Could not fetch price for {pos.ticker}")
 
-    # Update existing positions with current prices
+    # Update existing positions with current prices, in one batched UPDATE
+    position_updates = []
     for pos in positions_rows:
         if pos.ticker in prices:
             current_price = prices[pos.ticker]
             unrealized_pnl = (current_price - pos.avg_entry_price) * pos.quantity
-
-            # Update position
-            text_clause = text(
-                "UPDATE positions SET current_price = :current_price, "
-                "unrealized_pnl = :unrealized_pnl, updated_at = :updated_at "
-                "WHERE id = :id"
-            )
-            persistence.write(text_clause, {
+            position_updates.append({
                 "id": pos.id,
                 "current_price": current_price,
                 "unrealized_pnl": unrealized_pnl,
                 "updated_at": datetime.now(timezone.utc),
             })
+    persistence.update_many("positions", position_updates)
 
     # Reload positions with updated prices
     positions_rows = persistence.query(
@@ -166,7 +155,7 @@ def a_trade_decision_and_execute(persistence: SqlAlchemyPersistence, run_id: str
     - Calls TradeAgent to make BUY/SELL/HOLD/DO_NOTHING decisions
     - Executes trades based on those decisions
     - Updates positions, portfolio, and creates performance snapshot
-    - All DB updates happen in this single step for atomicity
+    - All DB updates happen in a single transaction for atomicity
     """
     if idempotency_check(persistence, run_id, "trades"):
         print(f"Trades already executed for run_id {run_id}, skipping")
@@ -193,7 +182,7 @@ def a_trade_decision_and_execute(persistence: SqlAlchemyPersistence, run_id: str
     print(f"Loaded inputs: cash=${portfolio_cash:.2f}, {len(recommendations)} recs, {len(existing_positions)} positions")
 
     # 2. Call TradeAgent to make decisions
-    openai = get_openai_client()
+    openai = get_openai_client() if get_llm_backend_name() == "openai" else None
     trade_agent = TradeAgent(openai)
 
     decisions = trade_agent.act(
@@ -352,92 +341,94 @@ def a_trade_decision_and_execute(persistence: SqlAlchemyPersistence, run_id: str
             trades.append(trade)
             print(f"DO_NOTHING for {ticker} @ ${current_price:.2f}")
 
-    # 4. Persist all trades
-    if trades:
-        persistence.set("trades", trades)
-        print(f"Persisted {len(trades)} trades")
-
-    # 5. Update positions in DB
-    # Delete all positions for this portfolio and recreate
-    text_clause = text("DELETE FROM positions WHERE portfolio_id = :portfolio_id")
-    persistence.write(text_clause, {"portfolio_id": portfolio_id})
-
-    if positions_by_ticker:
-        positions_to_create = []
-        for pos in positions_by_ticker.values():
-            positions_to_create.append({
-                "portfolio_id": portfolio_id,
-                "ticker": pos["ticker"],
-                "quantity": pos["quantity"],
-                "avg_entry_price": pos["avg_entry_price"],
-                "current_price": pos["current_price"],
-                "unrealized_pnl": pos["unrealized_pnl"],
-            })
-        persistence.set("positions", positions_to_create)
-        print(f"Updated {len(positions_to_create)} positions")
-
-    # 6. Update portfolio metrics
-    positions_value = sum(pos["current_price"] * pos["quantity"] for pos in positions_by_ticker.values())
-    total_value = cash_balance + positions_value
-
-    text_clause = text(
-        "UPDATE portfolios SET cash_balance = :cash_balance, "
-        "total_value = :total_value, last_update_run_id = :run_id, updated_at = :updated_at "
-        "WHERE id = :portfolio_id"
-    )
-    persistence.write(text_clause, {
-        "portfolio_id": portfolio_id,
-        "cash_balance": cash_balance,
-        "total_value": total_value,
-        "run_id": run_id,
-        "updated_at": datetime.now(timezone.utc),
-    })
+    # Get current S&P 500 price (fetched concurrently by the snapshot step), before the
+    # transaction since it can fall back to a Yahoo Finance call
+    sp500_current = get_sp500_price(persistence, run_id)
+
+    # 4-7 run in one transaction: trades, positions, portfolio and snapshot are
+    # committed together, or not at all
+    with persistence.transaction() as tx:
+        # 4. Persist all trades
+        if trades:
+            tx.set("trades", trades)
+            print(f"Persisted {len(trades)} trades")
+
+        # 5. Update positions in DB
+        # Delete all positions for this portfolio and recreate
+        text_clause = text("DELETE FROM positions WHERE portfolio_id = :portfolio_id")
+        tx.write(text_clause, {"portfolio_id": portfolio_id})
+
+        if positions_by_ticker:
+            positions_to_create = []
+            for pos in positions_by_ticker.values():
+                positions_to_create.append({
+                    "portfolio_id": portfolio_id,
+                    "ticker": pos["ticker"],
+                    "quantity": pos["quantity"],
+                    "avg_entry_price": pos["avg_entry_price"],
+                    "current_price": pos["current_price"],
+                    "unrealized_pnl": pos["unrealized_pnl"],
+                })
+            tx.set("positions", positions_to_create)
+            print(f"Updated {len(positions_to_create)} positions")
+
+        # 6. Update portfolio metrics
+        positions_value = sum(pos["current_price"] * pos["quantity"] for pos in positions_by_ticker.values())
+        total_value = cash_balance + positions_value
+
+        text_clause = text(
+            "UPDATE portfolios SET cash_balance = :cash_balance, "
+            "total_value = :total_value, last_update_run_id = :run_id, updated_at = :updated_at "
+            "WHERE id = :portfolio_id"
+        )
+        tx.write(text_clause, {
+            "portfolio_id": portfolio_id,
+            "cash_balance": cash_balance,
+            "total_value": total_value,
+            "run_id": run_id,
+            "updated_at": datetime.now(timezone.utc),
+        })
 
-    print(f"Portfolio updated: Cash=${cash_balance:.2f}, Positions=${positions_value:.2f}, Total=${total_value:.2f}")
+        print(f"Portfolio updated: Cash=${cash_balance:.2f}, Positions=${positions_value:.2f}, Total=${total_value:.2f}")
 
-    # 7. Get current S&P 500 price
-    yf_client = YahooFinanceClient()
-    sp500_snapshot = yf_client.get_yf_snapshot("^GSPC")
-    sp500_current = sp500_snapshot.price
-
-    # 8. Create performance snapshot
-    text_clause = text("SELECT * FROM portfolios WHERE id = :portfolio_id")
-    portfolio = persistence.query(text_clause, {"portfolio_id": portfolio_id})[0]
-
-    initial_capital = portfolio.initial_capital
-    total_pnl = total_value - initial_capital
-    roi_percent = (total_pnl / initial_capital) * 100
-
-    # Get initial S&P 500 value (the first value recorded for this portfolio)
-    text_clause = text(
-        "SELECT sp500_initial_value FROM performance_snapshots "
-        "WHERE portfolio_id = :portfolio_id "
-        "ORDER BY created_at ASC LIMIT 1"
-    )
-    initial_sp500_rows = persistence.query(text_clause, {"portfolio_id": portfolio_id})
+        # 7. Create performance snapshot
+        text_clause = text("SELECT * FROM portfolios WHERE id = :portfolio_id")
+        portfolio = tx.query(text_clause, {"portfolio_id": portfolio_id})[0]
 
-    if initial_sp500_rows and len(initial_sp500_rows) > 0:
-        sp500_initial = initial_sp500_rows[0].sp500_initial_value
-    else:
-        sp500_initial = sp500_current
+        initial_capital = portfolio.initial_capital
+        total_pnl = total_value - initial_capital
+        roi_percent = (total_pnl / initial_capital) * 100
 
-    sp500_return_percent = ((sp500_current - sp500_initial) / sp500_initial) * 100
-    alpha = roi_percent - sp500_return_percent
+        # Get initial S&P 500 value (the first value recorded for this portfolio)
+        text_clause = text(
+            "SELECT sp500_initial_value FROM performance_snapshots "
+            "WHERE portfolio_id = :portfolio_id "
+            "ORDER BY created_at ASC LIMIT 1"
+        )
+        initial_sp500_rows = tx.query(text_clause, {"portfolio_id": portfolio_id})
 
-    snapshot_row = {
-        "portfolio_id": portfolio_id,
-        "run_id": run_id,
-        "total_value": total_value,
-        "cash_balance": cash_balance,
-        "total_pnl": total_pnl,
-        "roi_percent": roi_percent,
-        "sp500_initial_value": sp500_initial,
-        "sp500_current_value": sp500_current,
-        "sp500_cumulative_return_percent": sp500_return_percent,
-        "alpha": alpha,
-    }
+        if initial_sp500_rows and len(initial_sp500_rows) > 0:
+            sp500_initial = initial_sp500_rows[0].sp500_initial_value
+        else:
+            sp500_initial = sp500_current
+
+        sp500_return_percent = ((sp500_current - sp500_initial) / sp500_initial) * 100
+        alpha = roi_percent - sp500_return_percent
+
+        snapshot_row = {
+            "portfolio_id": portfolio_id,
+            "run_id": run_id,
+            "total_value": total_value,
+            "cash_balance": cash_balance,
+            "total_pnl": total_pnl,
+            "roi_percent": roi_percent,
+            "sp500_initial_value": sp500_initial,
+            "sp500_current_value": sp500_current,
+            "sp500_cumulative_return_percent": sp500_return_percent,
+            "alpha": alpha,
+        }
 
-    persistence.set("performance_snapshots", [snapshot_row])
+        tx.set("performance_snapshots", [snapshot_row])
 
     print(f"Performance: ROI={roi_percent:.2f}%, S&P500={sp500_return_percent:.2f}%, Alpha={alpha:.2f}%")
 
@@ -475,14 +466,31 @@ def s_notify_discord(persistence: SqlAlchemyPersistence, run_id: str) -> None:
 
 def init_workflow(run_id: str, persistence: SqlAlchemyPersistence) -> Workflow:
     """Initialize the simplified weekly trade workflow."""
+    # one round trip for the idempotency checks of all steps
+    prefetch_idempotency(persistence, run_id, ["run_metadata", "financial_snapshots", "trade_inputs", "trades"])
     weekly_trade_workflow = Workflow(
         run_id=run_id,
         persistence=persistence,
+        metrics_table="run_metrics",
         steps=[
-            Step("insert run metadata", StepFns(functions=[s_insert_run_metadata])),
-            Step("prepare trade inputs", StepFns(functions=[s_prepare_trade_inputs])),
-            Step("trade decision and execute", StepFns(functions=[a_trade_decision_and_execute])),
-            Step("notify discord", StepFns(functions=[s_notify_discord])),
+            Step("insert run metadata", StepFns(functions=[s_insert_run_metadata]),
+                 writes=["run_metadata"],
+                 resources=["db"]),
+            Step("fetch S&P 500 snapshot", StepFns(functions=[s_fetch_sp500_snapshot]),
+                 reads=["indicator_states"],
+                 writes=["financial_snapshots", "indicator_states"],
+                 resources=["yahoo"]),
+            Step("prepare trade inputs", StepFns(functions=[s_prepare_trade_inputs]),
+                 reads=["final_recommendations", "portfolios", "positions"],
+                 writes=["portfolios", "positions", "trade_inputs"],
+                 resources=["yahoo"]),
+            Step("trade decision and execute", StepFns(functions=[a_trade_decision_and_execute]),
+                 reads=["trade_inputs", "financial_snapshots", "performance_snapshots"],
+                 writes=["trades", "positions", "portfolios", "performance_snapshots"],
+                 resources=["openai"]),
+            Step("notify discord", StepFns(functions=[s_notify_discord]),
+                 reads=["trades", "performance_snapshots", "portfolios", "positions"],
+                 resources=["db"]),
         ]
     )
     return weekly_trade_workflow
@@ -0,0 +1,148 @@
+import os
+import threading
+import concurrent.futures as cf
+from collections import deque
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+
+# Default per-resource concurrency limits, shared by every step that declares the resource.
+DEFAULT_RESOURCE_LIMITS: dict[str, int] = {
+    "openai": int(os.getenv("OPENAI_MAX_CONCURRENCY") or 4),
+    "yahoo": int(os.getenv("YAHOO_MAX_CONCURRENCY") or 4),
+    "db": int(os.getenv("DB_MAX_CONCURRENCY") or 5),
+}
+DEFAULT_MAX_WORKERS = int(os.getenv("WORKFLOW_MAX_WORKERS") or 8)
+
+
+@dataclass
+class PoolStats:
+    """Point-in-time view of a WorkerPool, used to tune the limits."""
+    max_workers: int
+    active: int
+    queued: int
+    completed: int
+    active_by_step: dict[str, int] = field(default_factory=dict)
+    queued_by_step: dict[str, int] = field(default_factory=dict)
+    active_by_resource: dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class _Task:
+    fn: Callable[..., Any]
+    args: tuple
+    step: str
+    step_limit: int | None
+    resources: Sequence[str]
+    future: cf.Future = field(default_factory=cf.Future)
+
+
+class WorkerPool:
+    """A bounded thread pool shared by all steps of a workflow.
+
+    Tasks are admitted in FIFO order, but only when the pool has a free worker,
+    the task's step is under its step_limit, and every resource the task uses is
+    under its limit. A task blocked on one resource does not block tasks behind it
+    that use other resources.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, resource_limits: Mapping[str, int] | None = None):
+        if max_workers < 1:
+            raise ValueError("max_workers must be >= 1")
+        self.max_workers = max_workers
+        self.resource_limits = dict(DEFAULT_RESOURCE_LIMITS)
+        if resource_limits:
+            self.resource_limits.update(resource_limits)
+        self._executor = cf.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="workflow")
+        self._lock = threading.Lock()
+        self._queue: deque[_Task] = deque()
+        self._active = 0
+        self._completed = 0
+        self._active_by_step: dict[str, int] = {}
+        self._active_by_resource: dict[str, int] = {}
+
+    def __enter__(self) -> "WorkerPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+
+    def submit(self, fn: Callable[..., Any], *args: Any, step: str,
+               step_limit: int | None = None, resources: Sequence[str] = ()) -> cf.Future:
+        """Queue fn(*args) and return a future for its result."""
+        task = _Task(fn=fn, args=args, step=step, step_limit=step_limit, resources=tuple(resources))
+        with self._lock:
+            self._queue.append(task)
+            self._dispatch()
+        return task.future
+
+    def cancel_queued(self) -> int:
+        """Cancel tasks that have not started yet. Returns how many were cancelled."""
+        with self._lock:
+            cancelled = list(self._queue)
+            self._queue.clear()
+        for task in cancelled:
+            task.future.cancel()
+        return len(cancelled)
+
+    def stats(self) -> PoolStats:
+        with self._lock:
+            queued_by_step: dict[str, int] = {}
+            for task in self._queue:
+                queued_by_step[task.step] = queued_by_step.get(task.step, 0) + 1
+            return PoolStats(
+                max_workers=self.max_workers,
+                active=self._active,
+                queued=len(self._queue),
+                completed=self._completed,
+                active_by_step={k: v for k, v in self._active_by_step.items() if v},
+                queued_by_step=queued_by_step,
+                active_by_resource={k: v for k, v in self._active_by_resource.items() if v},
+            )
+
+    def shutdown(self, wait: bool = True) -> None:
+        if not wait:
+            self.cancel_queued()
+        self._executor.shutdown(wait=wait)
+
+    def _can_start(self, task: _Task) -> bool:
+        if self._active >= self.max_workers:
+            return False
+        if task.step_limit is not None and self._active_by_step.get(task.step, 0) >= task.step_limit:
+            return False
+        for resource in task.resources:
+            limit = self.resource_limits.get(resource)
+            if limit is not None and self._active_by_resource.get(resource, 0) >= limit:
+                return False
+        return True
+
+    def _dispatch(self) -> None:
+        """Start every queued task that fits under the limits. Caller holds the lock."""
+        for task in list(self._queue):
+            if self._active >= self.max_workers:
+                break
+            if not self._can_start(task):
+                continue
+            self._queue.remove(task)
+            self._active += 1
+            self._active_by_step[task.step] = self._active_by_step.get(task.step, 0) + 1
+            for resource in task.resources:
+                self._active_by_resource[resource] = self._active_by_resource.get(resource, 0) + 1
+            self._executor.submit(self._run, task)
+
+    def _run(self, task: _Task) -> None:
+        try:
+            if task.future.set_running_or_notify_cancel():
+                try:
+                    task.future.set_result(task.fn(*task.args))
+                except Exception as e:
+                    task.future.set_exception(e)
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+                self._active_by_step[task.step] -= 1
+                for resource in task.resources:
+                    self._active_by_resource[resource] -= 1
+                self._dispatch()
@@ -1,15 +1,20 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+import asyncio
 import concurrent.futures as cf
+import contextlib
+import inspect
 from typing import Any, TypeVar, Union
-from collections.abc import Callable
+from collections.abc import Callable, Mapping
 from stock_ai.workflows.persistence.base_persistence import Persistence
+from stock_ai.workflows.tracing import RunTracer, Span
+from stock_ai.workflows.worker_pool import DEFAULT_MAX_WORKERS, DEFAULT_RESOURCE_LIMITS, PoolStats, WorkerPool
 
 
 # This constrains P so that it must be either Persistence itself or a subclass of Persistence.
 # In other words: "P can only be something that implements the Persistence interface."
 P = TypeVar("P", bound=Persistence)
 
-# A unit of work within a Step
+# A unit of work within a Step, either a plain function or an `async def`
 # params: persistence, run_id
 StepFn = Callable[[P, str], Any]
 # params: persistence, run_id -> list of StepFn.
@@ -27,38 +32,297 @@ StepFunctions = Union[StepFns, StepFnFactories]
 
 @dataclass
 class Step:
+    """A named group of StepFns.
+
+    Dependencies between steps can be declared so the workflow can run
+    independent steps concurrently:
+    - depends_on: names of upstream steps that must finish first
+    - reads / writes: tables the step reads and writes. A step waits for every
+      earlier step that writes a table it reads or writes, and for every
+      earlier step that reads a table it writes.
+
+    A step that declares none of these is treated as a barrier: it waits for
+    all earlier steps and all later steps wait for it (the old serial behavior).
+
+    Concurrency of the StepFns is bounded by the workflow's shared pool and:
+    - max_concurrency: max StepFns of this step running at once
+    - resources: external resources every StepFn of the step uses
+      (e.g. "openai", "yahoo", "db"), limited by Workflow.resource_limits
+    """
     name: str
     functions: StepFunctions
+    depends_on: list[str] = field(default_factory=list)
+    reads: list[str] = field(default_factory=list)
+    writes: list[str] = field(default_factory=list)
+    max_concurrency: int | None = None
+    resources: list[str] = field(default_factory=list)
+
+    @property
+    def is_barrier(self) -> bool:
+        return not (self.depends_on or self.reads or self.writes)
 
 
 class Workflow:
-    def __init__(self, run_id:str, steps: list[Step], persistence: Persistence):
+    def __init__(self, run_id:str, steps: list[Step], persistence: Persistence,
+                 max_workers: int = DEFAULT_MAX_WORKERS, resource_limits: Mapping[str, int] | None = None,
+                 metrics_table: str | None = None):
+        """
+        max_workers: size of the worker pool shared by all steps of the run.
+        resource_limits: resource name -> max concurrent StepFns using it,
+            merged over DEFAULT_RESOURCE_LIMITS ("openai", "yahoo", "db").
+        metrics_table: if set, the spans of each run (self.tracer) are stored
+            in this table at the end of the run.
+        """
         self.run_id = run_id
         self.steps = steps
         self.persistence = persistence
+        self.max_workers = max_workers
+        self.resource_limits = resource_limits
+        self.metrics_table = metrics_table
+        self.dependencies = self._build_dependencies(steps)
+        self.tracer = RunTracer(run_id)
+        self._pool: WorkerPool | None = None
+
+    @staticmethod
+    def _build_dependencies(steps: list[Step]) -> dict[str, set[str]]:
+        """Build step name -> names of the steps it must wait for."""
+        names = [step.name for step in steps]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Step names must be unique, got {names}")
+
+        deps: dict[str, set[str]] = {name: set() for name in names}
+        for i, step in enumerate(steps):
+            for upstream in step.depends_on:
+                if upstream not in deps:
+                    raise ValueError(f"Step {step.name!r} depends on unknown step {upstream!r}")
+                deps[step.name].add(upstream)
+
+            for prev in steps[:i]:
+                if step.is_barrier or prev.is_barrier:
+                    deps[step.name].add(prev.name)
+                    continue
+                read_after_write = set(step.reads) & set(prev.writes)
+                write_after_write = set(step.writes) & set(prev.writes)
+                write_after_read = set(step.writes) & set(prev.reads)
+                if read_after_write or write_after_write or write_after_read:
+                    deps[step.name].add(prev.name)
+
+        # explicit depends_on can point forward, so make sure there is no cycle
+        visited: dict[str, int] = {}  # 1 = visiting, 2 = done
+        def visit(name: str) -> None:
+            if visited.get(name) == 2:
+                return
+            if visited.get(name) == 1:
+                raise ValueError(f"Dependency cycle detected at step {name!r}")
+            visited[name] = 1
+            for upstream in deps[name]:
+                visit(upstream)
+            visited[name] = 2
+        for name in names:
+            visit(name)
+
+        return deps
+
+    def pool_stats(self) -> PoolStats | None:
+        """Queue depth and active workers of the shared pool, None when not running."""
+        return self._pool.stats() if self._pool else None
+
+    def _traced(self, fn: Callable, kind: str, step: str, parent: Span) -> Callable:
+        """Wrap a StepFn or factory so each call runs inside its own span."""
+        tracer = self.tracer
+        name = getattr(fn, "trace_name", None) or getattr(fn, "__name__", repr(fn))
+        attributes = getattr(fn, "trace_attributes", None)
+
+        if _is_async(fn):
+            async def acall(*args):
+                with tracer.span(name, kind, step, parent, attributes):
+                    return await fn(*args)
+            return acall
+
+        def call(*args):
+            with tracer.span(name, kind, step, parent, attributes):
+                return fn(*args)
+        return call
+
+    def _submit_functions(self, step: Step, functions: list[StepFn], step_span: Span,
+                          futures: dict[cf.Future, str], remaining: dict[str, int]) -> bool:
+        """Submit the StepFns of a step to the pool. Returns False if there was nothing to run."""
+        if not functions:
+            print(f"No functions to run for step: {step.name}, skipping.")
+            return False
+        assert self._pool is not None
+        remaining[step.name] = len(functions)
+        for func in functions:
+            traced = self._traced(func, "step_fn", step.name, step_span)
+            future = self._pool.submit(_call_step_fn, traced, self.persistence, self.run_id,
+                                       step=step.name, step_limit=step.max_concurrency,
+                                       resources=step.resources)
+            futures[future] = step.name
+        return True
+
+    def _finish_run(self) -> None:
+        """Export the spans of the run and store them in the metrics table."""
+        summary = self.tracer.summary()
+        if summary:
+            print(f"Slowest StepFns:\n{summary}")
+        try:
+            self.tracer.export()
+            if self.metrics_table:
+                self.persistence.set(self.metrics_table, self.tracer.to_rows())
+        except Exception as e:
+            # metrics must never hide the result of the run
+            print(f"Warning: failed to store run metrics: {e}")
 
     def run(self):
-        # run each step serially
-        for step in self.steps:
+        # run each step as soon as all the steps it depends on are done,
+        # all StepFns share one bounded pool for the whole run
+        self.tracer = RunTracer(self.run_id)
+        steps = {step.name: step for step in self.steps}
+        pending = dict(steps)
+        done: set[str] = set()
+        futures: dict[cf.Future, str] = {}
+        step_spans: dict[str, Span] = {}
+        # step name -> number of factories / StepFns still running
+        remaining: dict[str, int] = {}
+        # steps whose factories are still expanding -> StepFns collected so far
+        expanding: dict[str, list[StepFn]] = {}
+
+        def finish_step(name: str, error: BaseException | None = None) -> None:
+            self.tracer.end_span(step_spans.pop(name), error)
+            if error is None:
+                done.add(name)
+
+        with WorkerPool(self.max_workers, self.resource_limits) as pool:
+            self._pool = pool
+            try:
+                while pending or futures:
+                    ready = [name for name in pending if self.dependencies[name] <= done]
+                    for name in ready:
+                        step = pending.pop(name)
+                        print(f"Running step: {step.name}")
+                        step_spans[name] = self.tracer.start_span(name, "step", name)
+                        if isinstance(step.functions, StepFnFactories) and step.functions.factories:
+                            expanding[name] = []
+                            remaining[name] = len(step.functions.factories)
+                            for factory in step.functions.factories:
+                                traced = self._traced(factory, "factory", name, step_spans[name])
+                                futures[pool.submit(_call_step_fn, traced, self.persistence, self.run_id, step=name)] = name
+                        else:
+                            functions = step.functions.functions if isinstance(step.functions, StepFns) else []
+                            if not self._submit_functions(step, functions, step_spans[name], futures, remaining):
+                                finish_step(name)
+                    if ready and not futures:
+                        # steps finished without submitting anything, check what became ready
+                        continue
+
+                    finished, _ = cf.wait(futures, return_when=cf.FIRST_COMPLETED)
+                    for future in finished:
+                        name = futures.pop(future)
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            # don't start anything new, let running StepFns finish, then re-raise
+                            cancelled = pool.cancel_queued()
+                            print(f"Step {name!r} failed, cancelling {len(pending)} pending steps and {cancelled} queued StepFns")
+                            pending.clear()
+                            cf.wait(futures)
+                            for open_step in list(step_spans):
+                                finish_step(open_step, e if open_step == name else cf.CancelledError())
+                            raise
+
+                        if name in expanding:
+                            expanding[name].extend(result)
+                        remaining[name] -= 1
+                        if remaining[name] > 0:
+                            continue
+                        if name in expanding:
+                            functions = expanding.pop(name)
+                            if self._submit_functions(steps[name], functions, step_spans[name], futures, remaining):
+                                continue
+                        finish_step(name)
+                        stats = pool.stats()
+                        print(f"Finished step: {name} (active={stats.active}, queued={stats.queued})")
+            finally:
+                self._pool = None
+                self._finish_run()
+
+    async def arun(self):
+        """Run the workflow on the current event loop.
+
+        Same dependency graph as run(). `async def` StepFns and factories run as
+        tasks on the loop, plain ones run in threads via asyncio.to_thread.
+        max_workers bounds the threads only, async StepFns are bounded by the
+        step's max_concurrency and the resource limits.
+        """
+        self.tracer = RunTracer(self.run_id)
+        resource_limits = dict(DEFAULT_RESOURCE_LIMITS)
+        if self.resource_limits:
+            resource_limits.update(self.resource_limits)
+        resource_sems = {name: asyncio.Semaphore(limit) for name, limit in resource_limits.items()}
+        thread_sem = asyncio.Semaphore(self.max_workers)
+        done_events = {step.name: asyncio.Event() for step in self.steps}
+
+        async def call(func: Callable, step: Step, step_sem: asyncio.Semaphore | None, limited: bool) -> Any:
+            async with contextlib.AsyncExitStack() as stack:
+                if limited:
+                    if step_sem:
+                        await stack.enter_async_context(step_sem)
+                    for resource in step.resources:
+                        if resource in resource_sems:
+                            await stack.enter_async_context(resource_sems[resource])
+                if _is_async(func):
+                    return await func(self.persistence, self.run_id)
+                async with thread_sem:
+                    return await asyncio.to_thread(func, self.persistence, self.run_id)
+
+        async def run_step(step: Step) -> None:
+            for upstream in self.dependencies[step.name]:
+                await done_events[upstream].wait()
             print(f"Running step: {step.name}")
-            if isinstance(step.functions, StepFnFactories):
-                # it's a StepFnFactories instance
-                functions: list[StepFn] = []
-                for factory in step.functions.factories:
-                    funcs = factory(self.persistence, self.run_id)
-                    functions.extend(funcs)
-            else:
-                functions = step.functions.functions
-
-            if not functions:
-                print(f"No functions to run for step: {step.name}, skipping.")
-                continue
-
-            if len(functions) > 1:
-                # run in parallel
-                with cf.ThreadPoolExecutor(max_workers=len(functions) + 1) as ex:
-                    futures = [ex.submit(func, self.persistence, self.run_id) for func in functions]
-                    for future in cf.as_completed(futures):
-                        future.result()
-            else:
-                functions[0](self.persistence, self.run_id)
+            with self.tracer.span(step.name, "step", step.name) as step_span:
+                step_sem = asyncio.Semaphore(step.max_concurrency) if step.max_concurrency else None
+                if isinstance(step.functions, StepFnFactories):
+                    async with asyncio.TaskGroup() as tg:
+                        tasks = [tg.create_task(call(self._traced(factory, "factory", step.name, step_span),
+                                                     step, None, limited=False))
+                                 for factory in step.functions.factories]
+                    functions = [func for task in tasks for func in task.result()]
+                else:
+                    functions = step.functions.functions
+
+                if not functions:
+                    print(f"No functions to run for step: {step.name}, skipping.")
+                else:
+                    async with asyncio.TaskGroup() as tg:
+                        for func in functions:
+                            traced = self._traced(func, "step_fn", step.name, step_span)
+                            tg.create_task(call(traced, step, step_sem, limited=True))
+            done_events[step.name].set()
+            print(f"Finished step: {step.name}")
+
+        try:
+            # a failing step cancels everything still running or waiting
+            async with asyncio.TaskGroup() as tg:
+                for step in self.steps:
+                    tg.create_task(run_step(step))
+        except ExceptionGroup as eg:
+            raise _first_exception(eg) from None
+        finally:
+            await asyncio.to_thread(self._finish_run)
+
+
+def _is_async(func: Callable) -> bool:
+    return inspect.iscoroutinefunction(func) or inspect.iscoroutinefunction(getattr(func, "__call__", None))
+
+
+def _call_step_fn(func: Callable, persistence: Persistence, run_id: str) -> Any:
+    """Call a StepFn from a worker thread, async ones get their own event loop."""
+    if _is_async(func):
+        return asyncio.run(func(persistence, run_id))
+    return func(persistence, run_id)
+
+
+def _first_exception(eg: BaseExceptionGroup) -> BaseException:
+    """Unwrap (nested) TaskGroup exception groups so arun raises like run."""
+    first = eg.exceptions[0]
+    return _first_exception(first) if isinstance(first, BaseExceptionGroup) else first
@@ -0,0 +1,148 @@
+"""On-disk daily OHLCV history per ticker, so snapshots only download new bars.
+
+Each ticker is a directory of raw little-endian column files (one value per
+daily bar), read back with np.memmap:
+
+    <root>/<ticker>/date.i8    days since epoch (datetime64[D])
+    <root>/<ticker>/open.f8, high.f8, low.f8, close.f8, adj_close.f8, volume.f8
+
+New bars are appended to the end of each file. The last cached bar may be a
+partial intraday bar, so appending bars starting on or before it first
+truncates the files back to that date.
+"""
+
+import os
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# yfinance column name -> file stem
+COLUMNS = {
+    "Open": "open",
+    "High": "high",
+    "Low": "low",
+    "Close": "close",
+    "Adj Close": "adj_close",
+    "Volume": "volume",
+}
+_DATE_FILE = "date.i8"
+_DATE_DTYPE = np.dtype("<i8")
+_VALUE_DTYPE = np.dtype("<f8")
+
+
+class OhlcvHistoryStore:
+    """Append-only daily bars per ticker. Thread-safe within a process."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def load(self, ticker: str) -> pd.DataFrame:
+        """Cached bars of the ticker, indexed by date, with the yfinance column names."""
+        with self._lock(ticker):
+            n = self._consistent_length(ticker)
+            if n == 0:
+                return pd.DataFrame(columns=list(COLUMNS), index=pd.DatetimeIndex([], name="Date"), dtype="float64")
+            path = self._dir(ticker)
+            days = np.memmap(os.path.join(path, _DATE_FILE), dtype=_DATE_DTYPE, mode="r", shape=(n,))
+            # copied out of the maps: a later append truncates the files under them
+            data = {
+                col: np.array(np.memmap(os.path.join(path, f"{stem}.f8"), dtype=_VALUE_DTYPE, mode="r", shape=(n,)))
+                for col, stem in COLUMNS.items()
+            }
+            index = pd.DatetimeIndex(days.astype("datetime64[D]").astype("datetime64[ns]"), name="Date")
+            return pd.DataFrame(data, index=index)
+
+    def last_date(self, ticker: str) -> date | None:
+        with self._lock(ticker):
+            n = self._consistent_length(ticker)
+            if n == 0:
+                return None
+            days = np.memmap(os.path.join(self._dir(ticker), _DATE_FILE), dtype=_DATE_DTYPE, mode="r", shape=(n,))
+            return pd.Timestamp(days[-1].astype("datetime64[D]")).date()
+
+    def append(self, ticker: str, bars: pd.DataFrame) -> None:
+        """Add bars (a yfinance history frame) after the cached ones.
+
+        Cached bars on or after the first new date are replaced.
+        """
+        if bars.empty:
+            return
+        days = _to_days(bars.index)
+        order = np.argsort(days, kind="stable")
+        days = days[order]
+        with self._lock(ticker):
+            path = self._dir(ticker)
+            os.makedirs(path, exist_ok=True)
+            n = self._consistent_length(ticker)
+            if n:
+                cached = np.memmap(os.path.join(path, _DATE_FILE), dtype=_DATE_DTYPE, mode="r", shape=(n,))
+                keep = int(np.searchsorted(cached, days[0], side="left"))
+                del cached
+                self._truncate(ticker, keep)
+            with open(os.path.join(path, _DATE_FILE), "ab") as f:
+                f.write(days.astype(_DATE_DTYPE).tobytes())
+            for col, stem in COLUMNS.items():
+                values = bars[col].to_numpy(dtype="float64")[order] if col in bars else np.full(len(days), np.nan)
+                with open(os.path.join(path, f"{stem}.f8"), "ab") as f:
+                    f.write(values.astype(_VALUE_DTYPE).tobytes())
+
+    def clear(self, ticker: str) -> None:
+        with self._lock(ticker):
+            self._truncate(ticker, 0)
+
+    def _lock(self, ticker: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    def _dir(self, ticker: str) -> str:
+        return os.path.join(self.root, ticker.replace(os.sep, "_"))
+
+    def _files(self, ticker: str) -> list[tuple[str, np.dtype]]:
+        path = self._dir(ticker)
+        return [(os.path.join(path, _DATE_FILE), _DATE_DTYPE)] + [
+            (os.path.join(path, f"{stem}.f8"), _VALUE_DTYPE) for stem in COLUMNS.values()
+        ]
+
+    def _consistent_length(self, ticker: str) -> int:
+        """Number of complete bars; trims columns left longer by an interrupted append."""
+        lengths = []
+        for file, dtype in self._files(ticker):
+            if not os.path.exists(file):
+                return 0
+            lengths.append(os.path.getsize(file) // dtype.itemsize)
+        n = min(lengths)
+        if any(length != n for length in lengths):
+            self._truncate(ticker, n)
+        return n
+
+    def _truncate(self, ticker: str, n: int) -> None:
+        for file, dtype in self._files(ticker):
+            if os.path.exists(file):
+                os.truncate(file, n * dtype.itemsize)
+
+
+def _to_days(index: pd.Index) -> np.ndarray:
+    """Trading dates of a yfinance index (tz-aware exchange time) as days since epoch."""
+    idx = pd.DatetimeIndex(index)
+    if idx.tz is not None:
+        idx = idx.tz_localize(None)
+    return idx.normalize().to_numpy().astype("datetime64[D]").astype(np.int64)
+
+
+_default_store: OhlcvHistoryStore | None = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_history_store() -> OhlcvHistoryStore | None:
+    """Store under YAHOO_HISTORY_DIR (default .cache/yahoo_history), None if YAHOO_HISTORY_CACHE=0."""
+    global _default_store
+    if os.getenv("YAHOO_HISTORY_CACHE", "1") == "0":
+        return None
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = OhlcvHistoryStore(os.getenv("YAHOO_HISTORY_DIR") or ".cache/yahoo_history")
+        return _default_store
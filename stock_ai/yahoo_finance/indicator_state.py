@@ -0,0 +1,223 @@
+"""Incremental indicator state per ticker, so a snapshot only needs the new bars.
+
+IndicatorState keeps what the StockSnapshot indicators need from past bars:
+
+- the last 200 closes in a ring buffer and a running sum per SMA window,
+- the last 14 true ranges (ATR) and 14 up/down moves (RSI) with their sums,
+- monotonic deques of (bar number, value) for the 252 bar high and low.
+
+push() adds one daily bar in O(1) (amortized for the deques), and snapshot()
+reads the indicators off the state. They match compute_snapshots and
+YahooFinanceClient.get_yf_snapshot on the same bars.
+
+The last bar of a day may be a partial intraday one. Pushing a bar with the
+same date again replaces it: push() keeps an undo record of the last bar.
+"""
+
+import json
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+
+import pandas as pd
+
+from stock_ai.yahoo_finance.indicators import ATR_PERIOD, HIGH_LOW_WINDOW, RSI_PERIOD, SMA_WINDOWS, _round
+from stock_ai.yahoo_finance.types import StockSnapshot
+
+_CLOSE_CAPACITY = max(SMA_WINDOWS)
+
+
+@dataclass
+class IndicatorState:
+    ticker: str
+    last_date: str | None = None  # ISO date of the last bar pushed
+    bar_count: int = 0
+    prev_close: float | None = None
+    closes: deque = field(default_factory=lambda: deque(maxlen=_CLOSE_CAPACITY))
+    close_sums: dict[int, float] = field(default_factory=lambda: {w: 0.0 for w in SMA_WINDOWS})
+    true_ranges: deque = field(default_factory=lambda: deque(maxlen=ATR_PERIOD))
+    tr_sum: float = 0.0
+    ups: deque = field(default_factory=lambda: deque(maxlen=RSI_PERIOD))
+    downs: deque = field(default_factory=lambda: deque(maxlen=RSI_PERIOD))
+    up_sum: float = 0.0
+    down_sum: float = 0.0
+    highs: deque = field(default_factory=deque)  # [bar number, high], decreasing highs
+    lows: deque = field(default_factory=deque)  # [bar number, low], increasing lows
+    undo: dict | None = None  # how to take the last bar back out
+
+    # -------- updates --------
+
+    def push(self, bar_date: date, high: float, low: float, close: float) -> None:
+        """Add one daily bar. A bar dated before the last one is ignored, one on the same date replaces it."""
+        day = bar_date.isoformat()
+        if math.isnan(close):
+            return
+        if self.last_date is not None:
+            if day < self.last_date:
+                return
+            if day == self.last_date:
+                if self.undo is None:
+                    return  # nothing to replace it with, keep the stored bar
+                self._pop_last()
+
+        undo = {
+            "last_date": self.last_date,
+            "prev_close": self.prev_close,
+            "close_sums": {str(w): s for w, s in self.close_sums.items()},
+            "tr_sum": self.tr_sum,
+            "up_sum": self.up_sum,
+            "down_sum": self.down_sum,
+        }
+
+        # SMAs: each window drops the close that falls out of it
+        for w in SMA_WINDOWS:
+            leaving = self.closes[-w] if len(self.closes) >= w else 0.0
+            self.close_sums[w] += close - leaving
+        undo["evicted_close"] = _push(self.closes, close)
+
+        prev = self.prev_close
+        ranges = [abs(high - low)] + ([abs(high - prev), abs(low - prev)] if prev is not None else [])
+        ranges = [r for r in ranges if not math.isnan(r)]
+        tr = max(ranges) if ranges else float("nan")
+        evicted_tr = _push(self.true_ranges, tr)
+        if math.isnan(tr) or (evicted_tr is not None and math.isnan(evicted_tr)):
+            # a NaN stays in the sum until it leaves the window, then the sum has to be rebuilt
+            self.tr_sum = math.fsum(self.true_ranges)
+        else:
+            self.tr_sum += tr - (evicted_tr or 0.0)
+        undo["evicted_tr"] = evicted_tr
+
+        undo["rsi_pushed"] = prev is not None
+        if prev is not None:
+            delta = close - prev
+            evicted_up = _push(self.ups, max(delta, 0.0))
+            evicted_down = _push(self.downs, max(-delta, 0.0))
+            self.up_sum += max(delta, 0.0) - (evicted_up or 0.0)
+            self.down_sum += max(-delta, 0.0) - (evicted_down or 0.0)
+            undo["evicted_up"], undo["evicted_down"] = evicted_up, evicted_down
+
+        undo["highs"] = _push_extreme(self.highs, self.bar_count, high, lambda old, new: old <= new)
+        undo["lows"] = _push_extreme(self.lows, self.bar_count, low, lambda old, new: old >= new)
+
+        self.bar_count += 1
+        self.last_date = day
+        self.prev_close = close
+        self.undo = undo
+
+    def push_history(self, hist: pd.DataFrame) -> None:
+        """Push the bars of a yfinance history frame (High, Low, Close) in date order."""
+        for ts, high, low, close in zip(hist.index, hist["High"], hist["Low"], hist["Close"]):
+            self.push(pd.Timestamp(ts).date(), float(high), float(low), float(close))
+
+    def _pop_last(self) -> None:
+        undo = self.undo
+        self.bar_count -= 1
+        _pop_extreme(self.highs, undo["highs"])
+        _pop_extreme(self.lows, undo["lows"])
+        if undo["rsi_pushed"]:
+            _pop(self.ups, undo["evicted_up"])
+            _pop(self.downs, undo["evicted_down"])
+        _pop(self.true_ranges, undo["evicted_tr"])
+        _pop(self.closes, undo["evicted_close"])
+        self.close_sums = {int(w): s for w, s in undo["close_sums"].items()}
+        self.tr_sum, self.up_sum, self.down_sum = undo["tr_sum"], undo["up_sum"], undo["down_sum"]
+        self.last_date, self.prev_close = undo["last_date"], undo["prev_close"]
+        self.undo = None
+
+    # -------- reads --------
+
+    def snapshot(self, asof: str | None = None) -> StockSnapshot:
+        asof = asof or datetime.now(timezone.utc).isoformat()
+        nan = float("nan")
+        if self.bar_count == 0:
+            return StockSnapshot(
+                ticker=self.ticker, error="No historical data found", price=nan, sma20=nan, sma50=nan,
+                sma200=nan, atr14=nan, high_52w=nan, low_52w=nan, rsi14=nan, asof=asof,
+            )
+        smas = {w: self.close_sums[w] / w if len(self.closes) >= w else nan for w in SMA_WINDOWS}
+        atr = self.tr_sum / ATR_PERIOD if len(self.true_ranges) == ATR_PERIOD else nan
+        rsi = nan
+        if len(self.ups) == RSI_PERIOD and self.down_sum > 0:
+            rsi = 100 - (100 / (1 + self.up_sum / self.down_sum))
+        return StockSnapshot(
+            ticker=self.ticker,
+            price=_round(self.prev_close),
+            sma20=_round(smas[20]),
+            sma50=_round(smas[50]),
+            sma200=_round(smas[200]),
+            atr14=_round(atr),
+            high_52w=_round(self.highs[0][1]) if self.highs else nan,
+            low_52w=_round(self.lows[0][1]) if self.lows else nan,
+            rsi14=_round(rsi),
+            asof=asof,
+        )
+
+    # -------- serialization --------
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "last_date": self.last_date,
+            "bar_count": self.bar_count,
+            "prev_close": self.prev_close,
+            "closes": list(self.closes),
+            "true_ranges": list(self.true_ranges),
+            "ups": list(self.ups),
+            "downs": list(self.downs),
+            "highs": list(self.highs),
+            "lows": list(self.lows),
+            "undo": self.undo,
+        })
+
+    @classmethod
+    def from_json(cls, ticker: str, data: str) -> "IndicatorState":
+        """Rebuild a state; the running sums are recomputed from the buffers so rounding errors don't pile up across runs."""
+        d = json.loads(data)
+        state = cls(ticker=ticker, last_date=d["last_date"], bar_count=d["bar_count"], prev_close=d["prev_close"])
+        state.closes.extend(d["closes"])
+        state.true_ranges.extend(d["true_ranges"])
+        state.ups.extend(d["ups"])
+        state.downs.extend(d["downs"])
+        state.highs.extend(d["highs"])
+        state.lows.extend(d["lows"])
+        closes = list(state.closes)
+        state.close_sums = {w: math.fsum(closes[-w:]) for w in SMA_WINDOWS}
+        state.tr_sum = math.fsum(state.true_ranges)
+        state.up_sum = math.fsum(state.ups)
+        state.down_sum = math.fsum(state.downs)
+        state.undo = d.get("undo")
+        return state
+
+
+def _push(buffer: deque, value: float) -> float | None:
+    """Append to a bounded deque, returning the value that fell out of it."""
+    evicted = buffer[0] if len(buffer) == buffer.maxlen else None
+    buffer.append(value)
+    return evicted
+
+
+def _pop(buffer: deque, evicted: float | None) -> None:
+    buffer.pop()
+    if evicted is not None:
+        buffer.appendleft(evicted)
+
+
+def _push_extreme(extremes: deque, bar: int, value: float, dominated) -> dict:
+    """Sliding window max/min over HIGH_LOW_WINDOW bars; returns what was dropped for undo."""
+    dropped_back, dropped_front = [], []
+    if not math.isnan(value):
+        while extremes and dominated(extremes[-1][1], value):
+            dropped_back.append(extremes.pop())
+        extremes.append([bar, value])
+    while extremes and extremes[0][0] <= bar - HIGH_LOW_WINDOW:
+        dropped_front.append(extremes.popleft())
+    return {"appended": not math.isnan(value), "back": dropped_back, "front": dropped_front}
+
+
+def _pop_extreme(extremes: deque, undo: dict) -> None:
+    for item in reversed(undo["front"]):
+        extremes.appendleft(item)
+    if undo["appended"]:
+        extremes.pop()
+    for item in reversed(undo["back"]):
+        extremes.append(item)
@@ -0,0 +1,131 @@
+"""Vectorized technical indicators for many tickers at once.
+
+compute_snapshots takes (dates x tickers) High/Low/Close panels, e.g. the
+sub-frames of a multi-ticker yf.download, and computes the StockSnapshot
+indicators for every ticker with NumPy operations over the whole panel. The
+results match the per-ticker pandas computation in
+YahooFinanceClient.get_yf_snapshot.
+"""
+
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from stock_ai.yahoo_finance.types import StockSnapshot
+
+SMA_WINDOWS = (20, 50, 200)
+ATR_PERIOD = 14
+RSI_PERIOD = 14
+HIGH_LOW_WINDOW = 252  # trading days in a year
+ROUND_DIGITS = 2
+
+
+def compute_snapshots(close: pd.DataFrame, high: pd.DataFrame, low: pd.DataFrame,
+                      asof: str | None = None) -> list[StockSnapshot]:
+    """One StockSnapshot per column (ticker) of the panels, in column order.
+
+    Rows where a ticker has no close (not listed yet, exchange holiday) are
+    skipped for that ticker only, as if its history had been fetched alone.
+    """
+    asof = asof or datetime.now(timezone.utc).isoformat()
+    tickers = [str(t) for t in close.columns]
+    high = high.reindex(index=close.index, columns=close.columns)
+    low = low.reindex(index=close.index, columns=close.columns)
+
+    c, h, l, n_valid = _right_align(
+        close.to_numpy(dtype="float64"), high.to_numpy(dtype="float64"), low.to_numpy(dtype="float64"))
+
+    price = c[-1] if len(c) else np.full(len(tickers), np.nan)
+    smas = {w: _last_window_mean(c, w) for w in SMA_WINDOWS}
+    atr = _atr(c, h, l, ATR_PERIOD)
+    rsi = _rsi(c, RSI_PERIOD)
+    high_52w = _nan_reduce(np.nanmax, h[-HIGH_LOW_WINDOW:])
+    low_52w = _nan_reduce(np.nanmin, l[-HIGH_LOW_WINDOW:])
+
+    snapshots = []
+    for i, ticker in enumerate(tickers):
+        if n_valid[i] == 0:
+            snapshots.append(StockSnapshot(
+                ticker=ticker, error="No historical data found", price=float("nan"),
+                sma20=float("nan"), sma50=float("nan"), sma200=float("nan"), atr14=float("nan"),
+                high_52w=float("nan"), low_52w=float("nan"), rsi14=float("nan"), asof=asof,
+            ))
+            continue
+        snapshots.append(StockSnapshot(
+            ticker=ticker,
+            price=_round(price[i]),
+            sma20=_round(smas[20][i]),
+            sma50=_round(smas[50][i]),
+            sma200=_round(smas[200][i]),
+            atr14=_round(atr[i]),
+            high_52w=_round(high_52w[i]),
+            low_52w=_round(low_52w[i]),
+            rsi14=_round(rsi[i]),
+            asof=asof,
+        ))
+    return snapshots
+
+
+def _right_align(c: np.ndarray, h: np.ndarray, l: np.ndarray):
+    """Move each ticker's rows with a close to the bottom of its column, keeping their order.
+
+    Every indicator only needs the last N bars of a ticker, which are then the
+    last N rows of the panel. Returns the aligned panels and the bar count per ticker.
+    """
+    valid = ~np.isnan(c)
+    # stable sort of False < True puts the missing rows first, the valid ones after in date order
+    order = np.argsort(valid, axis=0, kind="stable")
+    aligned_valid = np.take_along_axis(valid, order, axis=0)
+
+    def align(a: np.ndarray) -> np.ndarray:
+        out = np.take_along_axis(a, order, axis=0)
+        out[~aligned_valid] = np.nan
+        return out
+
+    return align(c), align(h), align(l), valid.sum(axis=0)
+
+
+def _last_window_mean(a: np.ndarray, window: int) -> np.ndarray:
+    """rolling(window).mean() at the last row: NaN unless all of the last window values exist."""
+    if len(a) < window:
+        return np.full(a.shape[1], np.nan)
+    tail = a[-window:]
+    out = tail.mean(axis=0)
+    out[np.isnan(tail).any(axis=0)] = np.nan
+    return out
+
+
+def _atr(c: np.ndarray, h: np.ndarray, l: np.ndarray, period: int) -> np.ndarray:
+    window = period + 1  # true range of the first bar needs the close before it
+    c, h, l = c[-window:], h[-window:], l[-window:]
+    prev_close = np.vstack([np.full((1, c.shape[1]), np.nan), c[:-1]])
+    tr = _nan_reduce(np.nanmax, np.stack([np.abs(h - l), np.abs(h - prev_close), np.abs(l - prev_close)]))
+    return _last_window_mean(tr, period)
+
+
+def _rsi(c: np.ndarray, period: int) -> np.ndarray:
+    tail = c[-(period + 1):]
+    if len(tail) < period + 1:
+        return np.full(c.shape[1], np.nan)
+    delta = np.diff(tail, axis=0)
+    up = _last_window_mean(np.clip(delta, 0, None), period)
+    down = _last_window_mean(-np.clip(delta, None, 0), period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = up / np.where(down == 0, np.nan, down)
+        return 100 - (100 / (1 + rs))
+
+
+def _nan_reduce(fn, a: np.ndarray) -> np.ndarray:
+    """nanmax/nanmin over axis 0 that returns NaN for all-NaN columns without warning."""
+    if len(a) == 0:
+        return np.full(a.shape[1:], np.nan)
+    all_nan = np.isnan(a).all(axis=0)
+    out = fn(np.where(all_nan, 0.0, a), axis=0)
+    return np.where(all_nan, np.nan, out)
+
+
+def _round(value: float) -> float:
+    if np.isnan(value):
+        return float("nan")
+    return round(float(value), ROUND_DIGITS)
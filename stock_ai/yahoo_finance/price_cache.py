@@ -0,0 +1,168 @@
+"""Process-wide cache of current prices, optionally backed by a JSON file.
+
+A price fetched while the US market is open expires after a TTL. One fetched
+while it is closed is the last close and stays valid until the next open
+(weekends included; exchange holidays are not known, so a holiday just means
+one extra fetch at the usual open time).
+
+Concurrent lookups of the same ticker are single-flighted: the first caller
+fetches it, the others wait for that result instead of fetching it again.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable, Mapping
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass
+from datetime import datetime, time as dtime, timedelta
+from zoneinfo import ZoneInfo
+
+MARKET_TZ = ZoneInfo("America/New_York")
+MARKET_OPEN = dtime(9, 30)
+# closing prints can still come in for a few minutes after 16:00
+MARKET_SETTLED = dtime(16, 15)
+
+
+@dataclass
+class CachedPrice:
+    price: float
+    fetched_at: float  # unix timestamp
+    expires_at: float
+
+
+def is_market_open(ts: float) -> bool:
+    """Whether ts falls in regular trading hours (plus the settle period) on a weekday."""
+    t = datetime.fromtimestamp(ts, MARKET_TZ)
+    return t.weekday() < 5 and MARKET_OPEN <= t.time() < MARKET_SETTLED
+
+
+def next_market_open(ts: float) -> float:
+    """Unix timestamp of the first weekday market open after ts."""
+    t = datetime.fromtimestamp(ts, MARKET_TZ)
+    day = t.date() if t.time() < MARKET_OPEN else t.date() + timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return datetime.combine(day, MARKET_OPEN, tzinfo=MARKET_TZ).timestamp()
+
+
+class PriceCache:
+    """Ticker -> price with market-hours aware expiry. Thread-safe."""
+
+    def __init__(self, ttl_seconds: float = 300.0, path: str | None = None,
+                 clock: Callable[[], float] = time.time):
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self._clock = clock
+        self._entries: dict[str, CachedPrice] = {}
+        self._in_flight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    def expires_at(self, fetched_at: float) -> float:
+        if is_market_open(fetched_at):
+            return fetched_at + self.ttl_seconds
+        return next_market_open(fetched_at)
+
+    def get_many(self, tickers: Iterable[str],
+                 fetch: Callable[[list[str]], Mapping[str, float]]) -> dict[str, float]:
+        """Prices for tickers, calling fetch once for those neither cached nor being fetched by another thread.
+
+        fetch gets the list of tickers to look up and returns ticker -> price.
+        Missing or NaN prices are returned as NaN and not cached.
+        """
+        prices: dict[str, float] = {}
+        waiting: dict[str, Future] = {}
+        mine: list[str] = []
+        with self._lock:
+            now = self._clock()
+            for ticker in dict.fromkeys(tickers):
+                entry = self._entries.get(ticker)
+                if entry is not None and entry.expires_at > now:
+                    prices[ticker] = entry.price
+                    continue
+                future = self._in_flight.get(ticker)
+                if future is None:
+                    future = self._in_flight[ticker] = Future()
+                    mine.append(ticker)
+                waiting[ticker] = future
+
+        if mine:
+            fetched: Mapping[str, float] = {}
+            try:
+                fetched = fetch(mine)
+            finally:
+                # waiters get NaN if fetch raised
+                self._store(mine, fetched)
+
+        for ticker, future in waiting.items():
+            prices[ticker] = future.result()
+        return prices
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _store(self, tickers: list[str], fetched: Mapping[str, float]) -> None:
+        now = self._clock()
+        expires_at = self.expires_at(now)
+        with self._lock:
+            for ticker in tickers:
+                price = float(fetched.get(ticker, float("nan")))
+                if not math.isnan(price):
+                    self._entries[ticker] = CachedPrice(price=price, fetched_at=now, expires_at=expires_at)
+                self._in_flight.pop(ticker).set_result(price)
+            entries = dict(self._entries)
+        if self.path:
+            self._save(entries)
+
+    def _load(self) -> None:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._entries = {ticker: CachedPrice(**entry) for ticker, entry in data.items()}
+
+    def _save(self, entries: dict[str, CachedPrice]) -> None:
+        """Write the entries, keeping newer ones another process wrote in the meantime."""
+        try:
+            with open(self.path) as f:
+                on_disk = {ticker: CachedPrice(**entry) for ticker, entry in json.load(f).items()}
+        except (OSError, ValueError):
+            on_disk = {}
+        for ticker, entry in on_disk.items():
+            if ticker not in entries or entry.fetched_at > entries[ticker].fetched_at:
+                entries[ticker] = entry
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({ticker: asdict(entry) for ticker, entry in entries.items()}, f)
+        os.replace(tmp, self.path)
+
+
+_default_cache: PriceCache | None = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_price_cache() -> PriceCache | None:
+    """Process-wide cache, None if PRICE_CACHE=0.
+
+    PRICE_CACHE_TTL_SECONDS sets the TTL during market hours (default 300) and
+    PRICE_CACHE_PATH a JSON file that shares prices with later runs.
+    """
+    global _default_cache
+    if os.getenv("PRICE_CACHE", "1") == "0":
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = PriceCache(
+                ttl_seconds=float(os.getenv("PRICE_CACHE_TTL_SECONDS") or 300),
+                path=os.getenv("PRICE_CACHE_PATH") or None,
+            )
+        return _default_cache
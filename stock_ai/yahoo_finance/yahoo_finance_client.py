@@ -1,10 +1,25 @@
 import yfinance as yf
-from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+from datetime import date, datetime, timedelta, timezone
 import pandas as pd
 import math
+import os
+import time
+from stock_ai.yahoo_finance.history_store import OhlcvHistoryStore, get_default_history_store
+from stock_ai.yahoo_finance.indicator_state import IndicatorState
+from stock_ai.yahoo_finance.price_cache import PriceCache, get_default_price_cache
 from stock_ai.yahoo_finance.types import StockSnapshot
+from stock_ai.workflows.tracing import record_external_call
 
 class YahooFinanceClient:
+    def __init__(self, history_store: OhlcvHistoryStore | None = None, price_cache: PriceCache | None = None):
+        """history_store: on-disk daily bars, defaults to get_default_history_store().
+        price_cache: current prices, defaults to the process-wide get_default_price_cache().
+        """
+        self.history_store = history_store if history_store is not None else get_default_history_store()
+        self.price_cache = price_cache if price_cache is not None else get_default_price_cache()
+
     def _atr(self, df: pd.DataFrame, period: int = 14) -> float:
         """Calculates the Average True Range (ATR) for a given DataFrame.
         ATR is for measuring market volatility. For example an ATR of $1.50 means
@@ -23,7 +38,7 @@ class YahooFinanceClient:
     def get_yf_snapshot(self, ticker: str, days: int = 365) -> StockSnapshot:
         end = datetime.now(timezone.utc)
         start = end - timedelta(days=days)
-        hist = yf.Ticker(ticker).history(start=start, end=end, interval="1d", auto_adjust=False)
+        hist = self.get_history(ticker, start, end)
         if hist.empty:
             return StockSnapshot(
                 ticker=ticker,
@@ -81,6 +96,69 @@ class YahooFinanceClient:
             asof=end.isoformat(),
         )
 
+    def get_incremental_snapshot(self, ticker: str, state: IndicatorState | None = None,
+                                 days: int = 365) -> tuple[StockSnapshot, IndicatorState]:
+        """Snapshot of a ticker from its stored IndicatorState plus the bars since state.last_date.
+
+        Without a state (or after a stock split) a new one is built from `days` of history.
+        Returns the snapshot and the advanced state to store for the next run.
+        """
+        end = datetime.now(timezone.utc)
+        if state is not None and state.last_date is not None:
+            since = datetime.combine(date.fromisoformat(state.last_date), datetime.min.time(), tzinfo=timezone.utc)
+            bars = self._download_history(ticker, since, end)
+            if "Stock Splits" in bars and (bars["Stock Splits"].fillna(0) != 0).any():
+                print(f"Stock split for {ticker}, rebuilding indicator state")
+                state = None
+            else:
+                state.push_history(bars)
+        if state is None or state.last_date is None:
+            state = IndicatorState(ticker=ticker)
+            state.push_history(self.get_history(ticker, end - timedelta(days=days), end))
+        return state.snapshot(asof=end.isoformat()), state
+
+    def get_history(self, ticker: str, start: datetime, end: datetime) -> pd.DataFrame:
+        """Daily bars from start to end (Open, High, Low, Close, Adj Close, Volume).
+
+        With a history store only the bars from the last cached date on are
+        downloaded (the last cached bar may have been a partial intraday one),
+        the rest is served from disk.
+        """
+        store = self.history_store
+        if store is None:
+            return self._download_history(ticker, start, end)
+
+        cached = store.load(ticker)
+        replace = False
+        if cached.empty or cached.index[0].date() > start.date() + timedelta(days=7):
+            # nothing cached, or not far enough back for this window (weekends/holidays aside)
+            fetched = self._download_history(ticker, start, end)
+            replace = True
+        else:
+            fetched = self._download_history(ticker, datetime.combine(
+                cached.index[-1].date(), datetime.min.time(), tzinfo=timezone.utc), end)
+            if "Stock Splits" in fetched and (fetched["Stock Splits"].fillna(0) != 0).any():
+                # cached prices are not split-adjusted, start over
+                print(f"Stock split for {ticker}, refreshing cached history")
+                fetched = self._download_history(ticker, start, end)
+                replace = True
+        if fetched.empty:
+            # a failed download comes back empty, keep what is cached
+            print(f"No history downloaded for {ticker}, using the cached bars")
+        else:
+            if replace:
+                store.clear(ticker)
+            store.append(ticker, fetched)
+
+        hist = store.load(ticker)
+        return hist[hist.index >= pd.Timestamp(start.date())]
+
+    def _download_history(self, ticker: str, start: datetime, end: datetime) -> pd.DataFrame:
+        call_start = time.perf_counter()
+        hist = yf.Ticker(ticker).history(start=start, end=end, interval="1d", auto_adjust=False)
+        record_external_call("yahoo", time.perf_counter() - call_start)
+        return hist
+
     def _round(self, value: float, ndigits: int = 2) -> float:
         """Rounds a float to a specified number of decimal places."""
         if math.isnan(value):
@@ -94,10 +172,12 @@ class YahooFinanceClient:
         - During market hours: may include intraday price
         - After hours: returns last close price
         """
+        call_start = time.perf_counter()
         try:
             stock = yf.Ticker(ticker)
             # Try to get real-time price first
             info = stock.info
+            record_external_call("yahoo", time.perf_counter() - call_start)
             
             # Priority order for getting current price
             current_price = (
@@ -114,20 +194,64 @@ class YahooFinanceClient:
             print(f"Error fetching current price for {ticker}: {e}")
             return float("nan")
 
-    def get_current_prices_batch(self, tickers: list[str]) -> dict[str, float]:
+    def get_current_prices_batch(self, tickers: list[str]) -> pd.Series:
         """Get current prices for multiple tickers efficiently.
+
+        Prices still valid in the price cache are served from it. The other
+        tickers are fetched with one yf.download call, which returns the latest
+        daily bar (today's bar is the live price during market hours). Tickers it
+        has no price for fall back to get_current_price, at most
+        YAHOO_MAX_CONCURRENCY at a time.
         
         Args:
             tickers: List of ticker symbols
             
         Returns:
-            Dictionary mapping ticker to current price
+            Series of prices indexed by ticker, NaN when no price was found
         """
-        prices = {}
-        for ticker in tickers:
-            prices[ticker] = self.get_current_price(ticker)
+        tickers = list(dict.fromkeys(tickers))
+        if self.price_cache is None or not tickers:
+            return self._fetch_current_prices(tickers)
+        cached = self.price_cache.get_many(tickers, lambda missing: self._fetch_current_prices(missing).to_dict())
+        return pd.Series([cached[t] for t in tickers], index=pd.Index(tickers, name="ticker"), dtype="float64")
+
+    def _fetch_current_prices(self, tickers: list[str]) -> pd.Series:
+        prices = pd.Series(float("nan"), index=pd.Index(tickers, name="ticker"), dtype="float64")
+        if not tickers:
+            return prices
+
+        call_start = time.perf_counter()
+        try:
+            df = yf.download(tickers, period="5d", interval="1d", auto_adjust=False,
+                             progress=False, threads=True)
+            record_external_call("yahoo", time.perf_counter() - call_start)
+            latest = self._latest_closes(df, tickers)
+            prices.update(latest.round(2))
+        except Exception as e:
+            print(f"Error fetching batch prices for {tickers}: {e}")
+
+        missing = prices.index[prices.isna()].tolist()
+        if missing:
+            print(f"Falling back to per-ticker price lookups for {missing}")
+            max_workers = min(len(missing), int(os.getenv("YAHOO_MAX_CONCURRENCY") or 4))
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="yahoo") as pool:
+                # each lookup records its call in the caller's trace span
+                futures = [pool.submit(contextvars.copy_context().run, self.get_current_price, ticker)
+                           for ticker in missing]
+                for ticker, future in zip(missing, futures):
+                    prices[ticker] = future.result()
         return prices
 
+    def _latest_closes(self, df: pd.DataFrame, tickers: list[str]) -> pd.Series:
+        """Last non-NaN close per ticker from a yf.download frame."""
+        if df is None or df.empty:
+            return pd.Series(dtype="float64")
+        close = df["Close"]
+        if isinstance(close, pd.Series):
+            # single ticker without a ticker level in the columns
+            close = close.to_frame(tickers[0])
+        return close.ffill().iloc[-1].dropna().astype("float64")
+
 # Example usage:
 # cl = YahooFinanceClient()
 # price = cl.get_current_price("^GSPC")
@@ -0,0 +1,130 @@
+"""A local stand-in for the OpenAI Files and Batch endpoints, served over HTTP.
+
+respond(custom_id, body) produces the output text of each /v1/responses
+request, or raises to make that request fail. Batches report in_progress
+for `polls_until_done` retrieves before completing.
+"""
+
+import json
+import threading
+import uuid
+from collections.abc import Callable
+from email.parser import BytesParser
+from email.policy import default
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeBatchServer:
+    def __init__(self, respond: Callable[[str, dict], str], polls_until_done: int = 1):
+        self.respond = respond
+        self.polls_until_done = polls_until_done
+        self.files: dict[str, bytes] = {}
+        self.batches: dict[str, dict] = {}
+        self.requests: list[dict] = []  # submitted JSONL lines
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def __enter__(self) -> "FakeBatchServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _create_batch(self, body: dict) -> dict:
+        batch_id = f"batch_{uuid.uuid4().hex[:8]}"
+        output, errors = [], []
+        for line in self.files[body["input_file_id"]].decode().splitlines():
+            item = json.loads(line)
+            self.requests.append(item)
+            try:
+                text = self.respond(item["custom_id"], item["body"])
+            except Exception as e:
+                errors.append({"id": uuid.uuid4().hex, "custom_id": item["custom_id"], "response": None,
+                               "error": {"code": "server_error", "message": str(e)}})
+                continue
+            output.append({"id": uuid.uuid4().hex, "custom_id": item["custom_id"], "error": None, "response": {
+                "status_code": 200,
+                "body": {"id": f"resp_{uuid.uuid4().hex[:8]}", "object": "response", "status": "completed",
+                         "output": [{"type": "message", "role": "assistant", "status": "completed",
+                                     "content": [{"type": "output_text", "text": text, "annotations": []}]}]},
+            }})
+        output_file_id = self._store("\n".join(json.dumps(o) for o in output).encode()) if output else None
+        error_file_id = self._store("\n".join(json.dumps(e) for e in errors).encode()) if errors else None
+        self.batches[batch_id] = {
+            "id": batch_id, "object": "batch", "endpoint": body["endpoint"], "input_file_id": body["input_file_id"],
+            "completion_window": body["completion_window"], "created_at": 0, "status": "validating",
+            "output_file_id": None, "error_file_id": None, "_polls": 0,
+            "_final": {"status": "completed", "output_file_id": output_file_id, "error_file_id": error_file_id},
+        }
+        return self._public(batch_id)
+
+    def _retrieve_batch(self, batch_id: str) -> dict:
+        batch = self.batches[batch_id]
+        batch["_polls"] += 1
+        if batch["_polls"] >= self.polls_until_done:
+            batch.update(batch["_final"])
+        else:
+            batch["status"] = "in_progress"
+        return self._public(batch_id)
+
+    def _public(self, batch_id: str) -> dict:
+        return {k: v for k, v in self.batches[batch_id].items() if not k.startswith("_")}
+
+    def _store(self, content: bytes) -> str:
+        file_id = f"file_{uuid.uuid4().hex[:8]}"
+        self.files[file_id] = content
+        return file_id
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+            def _send(self, status: int, payload: dict | bytes) -> None:
+                data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/octet-stream" if isinstance(payload, bytes)
+                                 else "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                if self.path == "/v1/files":
+                    raw = b"Content-Type: " + self.headers["Content-Type"].encode() + b"\r\n\r\n" + self._body()
+                    part = next(p for p in BytesParser(policy=default).parsebytes(raw).iter_parts()
+                                if p.get_param("name", header="content-disposition") == "file")
+                    content = part.get_payload(decode=True)
+                    file_id = fake._store(content)
+                    self._send(200, {"id": file_id, "object": "file", "bytes": len(content), "created_at": 0,
+                                     "filename": "batch.jsonl", "purpose": "batch", "status": "processed"})
+                elif self.path == "/v1/batches":
+                    self._send(200, fake._create_batch(json.loads(self._body())))
+                elif self.path.startswith("/v1/batches/") and self.path.endswith("/cancel"):
+                    batch_id = self.path.split("/")[3]
+                    fake.batches[batch_id]["status"] = "cancelled"
+                    self._send(200, fake._public(batch_id))
+                else:
+                    self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+
+            def do_GET(self):
+                parts = self.path.split("/")
+                if self.path.startswith("/v1/batches/"):
+                    self._send(200, fake._retrieve_batch(parts[3]))
+                elif self.path.startswith("/v1/files/") and self.path.endswith("/content"):
+                    self._send(200, fake.files[parts[3]])
+                else:
+                    self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+
+        return Handler
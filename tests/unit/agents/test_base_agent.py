@@ -0,0 +1,26 @@
+from pydantic import BaseModel
+
+from stock_ai.agents.base_agent import _text_format_param
+
+
+class _Leg(BaseModel):
+    ticker: str
+    note: str | None = None
+
+
+class _Plan(BaseModel):
+    legs: list[_Leg]
+
+
+class TestTextFormatParam:
+    def test_strict_json_schema_of_nested_models(self):
+        param = _text_format_param(_Plan)
+
+        assert (param["type"], param["strict"], param["name"]) == ("json_schema", True, "_Plan")
+        schema = param["schema"]
+        assert schema["required"] == ["legs"] and schema["additionalProperties"] is False
+        leg = schema["$defs"]["_Leg"]
+        assert leg["required"] == ["ticker", "note"] and leg["additionalProperties"] is False
+        # the None default is dropped, the property stays nullable
+        assert "default" not in leg["properties"]["note"]
+        assert {"type": "null"} in leg["properties"]["note"]["anyOf"]
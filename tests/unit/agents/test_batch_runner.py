@@ -0,0 +1,74 @@
+import json
+from datetime import datetime
+
+import pytest
+from openai import OpenAI
+
+from stock_ai.agents.batch_runner import BatchRequest, OpenAIBatchRunner
+from stock_ai.agents.reddit_agents.news_agent import NewsAgent
+from stock_ai.agents.reddit_agents.pydantic_models import StockRecommendations
+from stock_ai.agents.response_cache import InMemoryResponseCache
+from stock_ai.reddit.types import RedditPost
+from tests.unit.agents.fake_openai_batch import FakeBatchServer
+
+
+def _recs(ticker: str) -> str:
+    return json.dumps({"recommendations": [
+        {"ticker": ticker, "decision": "BUY", "reason": "r", "confidence": "high", "reddit_post_url": None},
+    ]})
+
+
+def _post(reddit_id: str) -> RedditPost:
+    return RedditPost(reddit_id=reddit_id, flair="News", title=f"title {reddit_id}", selftext="s", score=1,
+                      num_comments=0, upvote_ratio=1.0, created=datetime(2025, 1, 1), url=f"u/{reddit_id}")
+
+
+def _client(server: FakeBatchServer) -> OpenAI:
+    return OpenAI(api_key="test", base_url=server.base_url, max_retries=0)
+
+
+class TestOpenAIBatchRunner:
+    def test_submits_polls_and_parses(self):
+        def respond(custom_id, body):
+            if custom_id == "bad":
+                raise RuntimeError("model overloaded")
+            if custom_id == "garbage":
+                return "not json"
+            return _recs(custom_id.upper())
+
+        with FakeBatchServer(respond, polls_until_done=3) as server:
+            runner = OpenAIBatchRunner(_client(server), poll_interval=0.01, timeout=5)
+            body = {"model": "gpt-5", "input": "x"}
+            results = runner.run([BatchRequest(cid, body, StockRecommendations) for cid in ("aapl", "bad", "garbage")])
+
+        assert results["aapl"].recommendations[0].ticker == "AAPL"
+        assert "model overloaded" in str(results["bad"])
+        assert isinstance(results["garbage"], ValueError)
+        assert [r["url"] for r in server.requests] == ["/v1/responses"] * 3
+
+    def test_timeout_cancels(self):
+        with FakeBatchServer(lambda cid, body: _recs("X"), polls_until_done=1000) as server:
+            runner = OpenAIBatchRunner(_client(server), poll_interval=0.01, timeout=0.05)
+            with pytest.raises(TimeoutError):
+                runner.run([BatchRequest("a", {}, StockRecommendations)])
+            assert next(iter(server.batches.values()))["status"] == "cancelled"
+
+
+class TestActBatch:
+    def test_agent_requests_and_cache(self):
+        with FakeBatchServer(lambda cid, body: _recs(f"T{cid}")) as server:
+            client = _client(server)
+            agent = NewsAgent(client, response_cache=InMemoryResponseCache(), rate_limiter=None)
+            runner = OpenAIBatchRunner(client, poll_interval=0.01, timeout=5)
+
+            first = agent.act_batch([[_post("a")], [_post("b"), _post("c")]], runner)
+            second = agent.act_batch([[_post("a")]], runner)
+
+        assert [r.recommendations[0].ticker for r in first] == ["T0", "T1"]
+        assert second[0] == first[0]  # from the response cache, nothing resubmitted
+        assert len(server.requests) == 2
+        body = server.requests[0]["body"]
+        assert body["model"] == "gpt-5"
+        assert body["text"]["format"]["name"] == "StockRecommendations"
+        assert body["tools"] == [{"type": "web_search"}]
+        assert agent.MULTI_POST_PROMPT in server.requests[1]["body"]["input"]
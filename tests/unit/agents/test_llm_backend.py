@@ -0,0 +1,122 @@
+import asyncio
+import random
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from stock_ai.agents.llm_backend import LatencyDistribution, OpenAIBackend, SimulatedBackend
+from stock_ai.agents.reddit_agents.news_agent import NewsAgent
+from stock_ai.agents.reddit_agents.pydantic_models import StockRecommendations
+from stock_ai.agents.resilience import RetryPolicy
+from stock_ai.agents.stock_plan_agents.pydantic_models import StockRecommendationTickerList, TradePlans
+from stock_ai.agents.stock_plan_agents.stock_picker_agent import StockPickerAgent
+from stock_ai.agents.trade_agents.pydantic_models import TradeDecisions
+from stock_ai.reddit.types import RedditPost
+
+
+def _instant(**kwargs) -> SimulatedBackend:
+    return SimulatedBackend(latency=LatencyDistribution(kind="constant", median=0.0), **kwargs)
+
+
+def _params(text_format, input: str) -> dict:
+    return {"model": "gpt-5", "instructions": "system", "input": input, "text_format": text_format}
+
+
+def _post(reddit_id: str) -> RedditPost:
+    return RedditPost(reddit_id=reddit_id, title=f"$NVDA and $AMD {reddit_id}", selftext="s",
+                      url=f"https://www.reddit.com/r/stocks/{reddit_id}", score=1, upvote_ratio=1.0,
+                      num_comments=0, created=datetime(2025, 1, 1), flair="News")
+
+
+class TestSimulatedBackend:
+    @pytest.mark.parametrize("text_format", [StockRecommendations, TradeDecisions,
+                                             StockRecommendationTickerList, TradePlans])
+    def test_outputs_are_schema_valid(self, text_format):
+        backend = _instant()
+        for i in range(20):
+            out = backend.parse(_params(text_format, f'[{{"ticker": "AAPL"}}, {{"ticker": "MSFT"}}] {i}'))
+            assert isinstance(out.output_parsed, text_format)
+            text_format.model_validate_json(out.output_parsed.model_dump_json())
+            assert out.total_tokens > 0
+
+    def test_uses_tickers_and_urls_from_input(self):
+        backend = _instant()
+        params = _params(StockRecommendations,
+                         '[{"post_url": "https://www.reddit.com/r/stocks/a", "title": "$NVDA to the moon"}]')
+        recs = backend.parse(params).output_parsed.recommendations
+        assert {r.ticker for r in recs} == {"NVDA"}
+        assert {r.reddit_post_url for r in recs} == {"https://www.reddit.com/r/stocks/a"}
+
+        picked = backend.parse(_params(StockRecommendationTickerList,
+                                       '[{"ticker": "AAPL"}, {"ticker": "TSLA"}]')).output_parsed
+        assert set(picked.tickers) <= {"AAPL", "TSLA"}
+        assert len(picked.tickers) == len(set(picked.tickers))
+
+    def test_same_request_same_answer(self):
+        params = _params(TradeDecisions, '[{"ticker": "AAPL"}]')
+        assert _instant().parse(params).output_parsed == _instant().parse(params).output_parsed
+        assert _instant(seed=1).parse(params).output_parsed != _instant(seed=2).parse(params).output_parsed
+
+    def test_latency_distributions(self):
+        rng = random.Random(0)
+        assert LatencyDistribution.parse("constant:0.25").sample(rng) == 0.25
+        lognormal = LatencyDistribution.parse("lognormal:2.0:0.5")
+        samples = sorted(lognormal.sample(rng) for _ in range(2001))
+        assert 1.8 < samples[1000] < 2.2
+        exponential = LatencyDistribution(kind="exponential", median=1.0, max_seconds=3.0)
+        assert max(exponential.sample(rng) for _ in range(1000)) == 3.0
+
+    def test_per_format_latency_and_timeout(self):
+        backend = SimulatedBackend(latency=LatencyDistribution(kind="constant", median=0.0),
+                                   latencies={"TradeDecisions": LatencyDistribution(kind="constant", median=0.2)})
+        start = time.perf_counter()
+        backend.parse(_params(StockRecommendations, "x"))
+        assert time.perf_counter() - start < 0.1
+        with pytest.raises(openai.APITimeoutError):
+            backend.parse(_params(TradeDecisions, "x"), timeout=0.05)
+
+    def test_injected_failures_are_retried_by_agents(self):
+        backend = _instant(failure_rate=0.5, seed=3)
+        agent = NewsAgent(None, backend=backend, retry_policy=RetryPolicy(base_delay=0.0, max_attempts=10))
+        agent.rate_limiter = None
+
+        for i in range(5):
+            assert isinstance(agent.act([_post(str(i))]), StockRecommendations)
+        assert backend.requests > 5
+
+    def test_async_agents_run_concurrently(self):
+        backend = SimulatedBackend(latency=LatencyDistribution(kind="constant", median=0.2))
+        agent = StockPickerAgent(None, backend=backend)
+        agent.rate_limiter = None
+        recs = [SimpleNamespace(ticker=t, reason="r", confidence="high", reddit_post_url=None) for t in ("AAPL", "AMD")]
+
+        async def run():
+            return await asyncio.gather(*(agent.aact(recs) for _ in range(10)))
+
+        start = time.perf_counter()
+        results = asyncio.run(run())
+        assert time.perf_counter() - start < 1.0
+        assert all(set(r.tickers) <= {"AAPL", "AMD"} for r in results)
+
+
+class TestOpenAIBackend:
+    def test_passes_params_and_timeout(self):
+        calls = []
+
+        def parse(**kwargs):
+            calls.append(kwargs)
+            return SimpleNamespace(output_parsed="parsed", usage=SimpleNamespace(total_tokens=42))
+
+        options = []
+        client = SimpleNamespace(responses=SimpleNamespace(parse=parse))
+        client.with_options = lambda **kwargs: options.append(kwargs) or client
+        backend = OpenAIBackend(client)
+
+        assert backend.parse({"input": "x"}).total_tokens == 42
+        assert backend.parse({"input": "x"}, timeout=5.0).output_parsed == "parsed"
+        assert calls == [{"input": "x"}, {"input": "x", "timeout": 5.0}]
+        # the retry policy is the only layer retrying
+        assert options == [{"max_retries": 0}]
@@ -0,0 +1,82 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+from stock_ai.agents.rate_limiter import TokenBucketLimiter, estimate_tokens
+from stock_ai.agents.reddit_agents.news_agent import NewsAgent
+from stock_ai.agents.reddit_agents.pydantic_models import StockRecommendations
+from stock_ai.reddit.types import RedditPost
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTokenBucketLimiter:
+    def test_requests_per_minute(self):
+        clock = _Clock()
+        limiter = TokenBucketLimiter(requests_per_minute=60, tokens_per_minute=1_000_000, clock=clock)
+
+        waits = [limiter.reserve(1) for _ in range(62)]
+
+        assert waits[:60] == [0.0] * 60
+        # one request per second once the burst is used up, queued in arrival order
+        assert waits[60:] == [1.0, 2.0]
+        clock.now = 10.0
+        assert limiter.reserve(1) == 0.0
+
+    def test_tokens_per_minute_and_reconcile(self):
+        clock = _Clock()
+        limiter = TokenBucketLimiter(requests_per_minute=1000, tokens_per_minute=6000, clock=clock)
+
+        assert limiter.reserve(6000) == 0.0
+        assert limiter.reserve(600) == 6.0  # 100 tokens per second
+        # the first call used far fewer tokens than reserved
+        limiter.reconcile(6000, 1000)
+        assert limiter.reserve(100) == 0.0
+
+    def test_oversized_request_is_capped_to_capacity(self):
+        limiter = TokenBucketLimiter(requests_per_minute=10, tokens_per_minute=100, clock=_Clock())
+        assert limiter.reserve(1000) == 0.0
+
+    def test_estimate_tokens(self):
+        assert estimate_tokens("a" * 400, "b" * 400, output_tokens=10) == 210
+
+
+class _FakeAsyncOpenAI:
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+
+        async def parse(**kwargs):
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            await asyncio.sleep(0.01)
+            self.active -= 1
+            return SimpleNamespace(output_parsed=StockRecommendations(recommendations=[]),
+                                   usage=SimpleNamespace(total_tokens=10))
+        self.responses = SimpleNamespace(parse=parse)
+
+    def with_options(self, **kwargs):
+        return self
+
+
+class TestAact:
+    def test_posts_run_concurrently_on_one_loop(self):
+        client = _FakeAsyncOpenAI()
+        limiter = TokenBucketLimiter(requests_per_minute=1000, tokens_per_minute=10_000_000)
+        agent = NewsAgent(None, async_open_ai_client=client, rate_limiter=limiter)
+        posts = [RedditPost(reddit_id=str(i), title="t", selftext="s", url=f"u{i}", score=1, upvote_ratio=1.0,
+                            num_comments=0, created=datetime(2025, 1, 1), flair="News") for i in range(5)]
+
+        async def run():
+            return await asyncio.gather(*(agent.aact([p]) for p in posts))
+
+        results = asyncio.run(run())
+
+        assert len(results) == 5
+        assert client.max_active == 5
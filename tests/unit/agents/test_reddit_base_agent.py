@@ -0,0 +1,53 @@
+from datetime import datetime
+from unittest.mock import Mock
+
+from stock_ai.agents.reddit_agents.dd_agent import DDAgent
+from stock_ai.agents.reddit_agents.pydantic_models import StockRecommendation, StockRecommendations
+from stock_ai.reddit.types import RedditPost
+
+
+def _post(reddit_id: str, selftext: str = "text") -> RedditPost:
+    return RedditPost(reddit_id=reddit_id, flair="DD", title=f"post {reddit_id}", selftext=selftext, score=1,
+                      num_comments=0, upvote_ratio=1.0, created=datetime(2025, 1, 1),
+                      url=f"https://reddit.com/r/wsb/{reddit_id}")
+
+
+def _rec(ticker: str, url: str | None) -> StockRecommendation:
+    return StockRecommendation(ticker=ticker, decision="BUY", reason="r", confidence="high", reddit_post_url=url)
+
+
+class TestPackPosts:
+    def test_token_budget_and_max_posts(self):
+        agent = DDAgent(Mock(), rate_limiter=Mock())
+        posts = [_post("a"), _post("b"), _post("big", selftext="x" * 4000), _post("c"), _post("d"), _post("e")]
+
+        batches = agent.pack_posts(posts, token_budget=500, max_posts=2)
+
+        assert [[p.reddit_id for p in b] for b in batches] == [["a", "b"], ["big"], ["c", "d"], ["e"]]
+
+
+class TestSplitByPost:
+    def test_matches_reddit_post_url(self):
+        agent = DDAgent(Mock(), rate_limiter=Mock())
+        posts = [_post("a"), _post("b")]
+        result = StockRecommendations(recommendations=[
+            _rec("AAPL", "https://reddit.com/r/wsb/b"),
+            _rec("MSFT", "HTTPS://reddit.com/r/wsb/a/"),
+            _rec("NVDA", "https://example.com/hallucinated"),
+        ])
+
+        by_post = agent.split_by_post(result, posts)
+
+        assert [r.ticker for r in by_post["a"].recommendations] == ["MSFT"]
+        assert [r.ticker for r in by_post["b"].recommendations] == ["AAPL"]
+
+    def test_single_post_keeps_everything(self):
+        agent = DDAgent(Mock(), rate_limiter=Mock())
+        result = StockRecommendations(recommendations=[_rec("AAPL", None)])
+
+        assert agent.split_by_post(result, [_post("a")])["a"] == result
+
+    def test_multi_post_prompt_only_for_batches(self):
+        agent = DDAgent(Mock(), rate_limiter=Mock())
+        assert agent.MULTI_POST_PROMPT not in agent._posts_prompt([_post("a")])
+        assert agent.MULTI_POST_PROMPT in agent._posts_prompt([_post("a"), _post("b")])
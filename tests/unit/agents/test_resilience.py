@@ -0,0 +1,211 @@
+import asyncio
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pydantic
+import pytest
+
+from stock_ai.agents.reddit_agents.news_agent import NewsAgent
+from stock_ai.agents.reddit_agents.pydantic_models import StockRecommendations
+from stock_ai.agents.resilience import (
+    LatencyTracker, RetryPolicy, UnparseableResponseError, acall_with_retries, call_with_retries, is_transient)
+from stock_ai.reddit.types import RedditPost
+from stock_ai.workflows.tracing import Span, _current_span, record_external_call
+
+_REQUEST = httpx.Request("POST", "https://api.openai.com/v1/responses")
+
+
+def _status_error(status: int) -> openai.APIStatusError:
+    return openai.APIStatusError("error", response=httpx.Response(status, request=_REQUEST), body=None)
+
+
+def _validation_error() -> pydantic.ValidationError:
+    try:
+        StockRecommendations.model_validate_json("{}")
+    except pydantic.ValidationError as e:
+        return e
+    raise AssertionError("expected a validation error")
+
+
+def _no_wait(**kwargs) -> RetryPolicy:
+    return RetryPolicy(base_delay=0.0, **kwargs)
+
+
+def _tracker(seconds: float, samples: int = 20) -> LatencyTracker:
+    tracker = LatencyTracker()
+    for _ in range(samples):
+        tracker.record(seconds)
+    return tracker
+
+
+class TestCallWithRetries:
+    def test_transient_errors(self):
+        assert is_transient(openai.APIConnectionError(request=_REQUEST))
+        assert is_transient(openai.APITimeoutError(request=_REQUEST))
+        assert is_transient(_status_error(429))
+        assert is_transient(_status_error(503))
+        assert is_transient(UnparseableResponseError("result failed to parse"))
+        assert is_transient(_validation_error())
+        assert not is_transient(ValueError("Unknown latency distribution: bogus"))
+        assert not is_transient(_status_error(400))
+        assert not is_transient(RuntimeError("bug"))
+
+    def test_retries_transient_errors_until_success(self):
+        calls = []
+
+        def attempt(timeout):
+            calls.append(timeout)
+            if len(calls) < 3:
+                raise _status_error(500)
+            return "ok"
+
+        assert call_with_retries(attempt, _no_wait()) == "ok"
+        assert calls == [None, None, None]
+
+    def test_gives_up_after_max_attempts_and_on_permanent_errors(self):
+        calls = []
+
+        def transient(timeout):
+            calls.append(timeout)
+            raise _status_error(429)
+
+        with pytest.raises(openai.APIStatusError):
+            call_with_retries(transient, _no_wait(max_attempts=3))
+        assert len(calls) == 3
+
+        def permanent(timeout):
+            calls.append(timeout)
+            raise _status_error(400)
+
+        with pytest.raises(openai.APIStatusError):
+            call_with_retries(permanent, _no_wait())
+        assert len(calls) == 4
+
+    def test_backoff_is_jittered_and_capped(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+        delays = [policy.backoff(10) for _ in range(100)]
+        assert all(0 <= d <= 5.0 for d in delays)
+        assert len(set(delays)) > 1
+
+    def test_deadline_bounds_attempt_timeouts(self):
+        timeouts = []
+
+        def attempt(timeout):
+            timeouts.append(timeout)
+            raise openai.APITimeoutError(request=_REQUEST)
+
+        with pytest.raises(openai.APITimeoutError):
+            call_with_retries(attempt, _no_wait(deadline=5.0, max_attempts=2))
+        assert len(timeouts) == 2
+        assert all(0 < t <= 5.0 for t in timeouts)
+
+    def test_hedges_slow_attempt(self):
+        calls = []
+        lock = threading.Lock()
+
+        def attempt(timeout):
+            with lock:
+                calls.append(timeout)
+                first = len(calls) == 1
+            if first:
+                time.sleep(1.0)
+                return "slow"
+            return "fast"
+
+        policy = _no_wait(hedge_percentile=0.95, hedge_min_samples=20)
+        start = time.perf_counter()
+        assert call_with_retries(attempt, policy, _tracker(0.05)) == "fast"
+        assert time.perf_counter() - start < 0.5
+        assert len(calls) == 2
+
+    def test_hedged_attempts_record_calls_in_the_callers_span(self):
+        span = Span(run_id="run", name="News agent", kind="step_fn", step="run stock agents", span_id="1")
+        token = _current_span.set(span)
+
+        def attempt(timeout):
+            record_external_call("openai")
+            if span.external_calls["openai"] == 1:
+                time.sleep(0.5)
+            return "ok"
+
+        try:
+            assert call_with_retries(attempt, _no_wait(hedge_percentile=0.95, hedge_min_samples=20),
+                                     _tracker(0.05)) == "ok"
+        finally:
+            _current_span.reset(token)
+        assert span.external_calls == {"openai": 2}
+
+    def test_no_hedging_before_enough_samples(self):
+        calls = []
+
+        def attempt(timeout):
+            calls.append(timeout)
+            time.sleep(0.1)
+            return "ok"
+
+        policy = _no_wait(hedge_percentile=0.95, hedge_min_samples=20)
+        assert call_with_retries(attempt, policy, _tracker(0.01, samples=5)) == "ok"
+        assert len(calls) == 1
+
+
+class TestAcallWithRetries:
+    def test_deadline_cancels_running_attempt(self):
+        async def attempt(timeout):
+            await asyncio.sleep(10)
+
+        start = time.perf_counter()
+        with pytest.raises(TimeoutError):
+            asyncio.run(acall_with_retries(attempt, _no_wait(deadline=0.1)))
+        assert time.perf_counter() - start < 1.0
+
+    def test_hedges_slow_attempt_and_cancels_the_loser(self):
+        started = []
+        cancelled = []
+
+        async def attempt(timeout):
+            started.append(timeout)
+            if len(started) == 1:
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.append(True)
+                    raise
+            return "fast"
+
+        policy = _no_wait(hedge_percentile=0.95, hedge_min_samples=20)
+        assert asyncio.run(acall_with_retries(attempt, policy, _tracker(0.05))) == "fast"
+        assert len(started) == 2
+        assert cancelled == [True]
+
+
+class _FlakyOpenAI:
+    """responses.parse failing with a 503 the first `failures` times."""
+    def __init__(self, failures: int):
+        self.calls = 0
+
+        def parse(**kwargs):
+            self.calls += 1
+            if self.calls <= failures:
+                raise _status_error(503)
+            return SimpleNamespace(output_parsed=StockRecommendations(recommendations=[]),
+                                   usage=SimpleNamespace(total_tokens=10))
+        self.responses = SimpleNamespace(parse=parse)
+
+    def with_options(self, **kwargs):
+        return self
+
+
+class TestAgentRetries:
+    def test_act_retries_transient_openai_errors(self):
+        client = _FlakyOpenAI(failures=2)
+        agent = NewsAgent(client, retry_policy=_no_wait())
+        agent.rate_limiter = None
+        post = RedditPost(reddit_id="a", title="t", selftext="s", url="u", score=1, upvote_ratio=1.0,
+                          num_comments=0, created=datetime(2025, 1, 1), flair="News")
+
+        assert agent.act([post]).recommendations == []
+        assert client.calls == 3
@@ -0,0 +1,140 @@
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+
+from stock_ai.agents.reddit_agents.news_agent import NewsAgent
+from stock_ai.agents.reddit_agents.pydantic_models import StockRecommendation, StockRecommendations
+from stock_ai.agents.response_cache import InMemoryResponseCache, SqlResponseCache, cache_key
+from stock_ai.agents.stock_plan_agents.pydantic_models import StockRecommendationTickerList
+from stock_ai.reddit.types import RedditPost
+
+RECS = StockRecommendations(recommendations=[
+    StockRecommendation(ticker="AAPL", decision="BUY", reason="iPhone cycle", confidence="high"),
+])
+
+
+def _key(**overrides) -> str:
+    params = {"model": "gpt-5", "instructions": "sys", "input": "user", "text_format": StockRecommendations,
+              "reasoning": {"effort": "medium"}, "tools": [{"type": "web_search"}]}
+    params.update(overrides)
+    return cache_key(**params)
+
+
+class _FakeOpenAI:
+    def __init__(self, result):
+        self.calls = 0
+        self.responses = SimpleNamespace(parse=self._parse)
+        self._result = result
+
+    def _parse(self, **kwargs):
+        self.calls += 1
+        return SimpleNamespace(output_parsed=self._result)
+
+    def with_options(self, **kwargs):
+        return self
+
+
+class TestCacheKey:
+    def test_stable_and_sensitive_to_every_part(self):
+        assert _key() == _key()
+        assert len({
+            _key(),
+            _key(model="gpt-5-mini"),
+            _key(instructions="other"),
+            _key(input="other"),
+            _key(text_format=StockRecommendationTickerList),
+            _key(reasoning={"effort": "high"}),
+            _key(tools=None),
+        }) == 7
+
+
+class TestInMemoryResponseCache:
+    def test_round_trip_returns_pydantic_object(self):
+        cache = InMemoryResponseCache()
+        cache.set("k", RECS)
+
+        hit = cache.get("k", StockRecommendations)
+
+        assert isinstance(hit, StockRecommendations)
+        assert hit == RECS
+        assert cache.get("missing", StockRecommendations) is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_lru_eviction(self):
+        cache = InMemoryResponseCache(max_entries=2)
+        cache.set("a", RECS)
+        cache.set("b", RECS)
+        cache.get("a", StockRecommendations)
+        cache.set("c", RECS)
+
+        assert cache.get("b", StockRecommendations) is None
+        assert cache.get("a", StockRecommendations) is not None
+
+    def test_ttl(self):
+        cache = InMemoryResponseCache(ttl_seconds=0.01)
+        cache.set("k", RECS)
+        time.sleep(0.02)
+        assert cache.get("k", StockRecommendations) is None
+
+
+class TestSqlResponseCache:
+    def test_sqlite_round_trip_and_overwrite(self, tmp_path):
+        cache = SqlResponseCache(create_engine(f"sqlite:///{tmp_path / 'llm.sqlite'}"), create_table=True)
+        cache.set("k", StockRecommendations(recommendations=[]))
+        cache.set("k", RECS)
+
+        assert cache.get("k", StockRecommendations) == RECS
+
+    def test_concurrent_writes_of_the_same_key(self, tmp_path):
+        from concurrent.futures import ThreadPoolExecutor
+        cache = SqlResponseCache(create_engine(f"sqlite:///{tmp_path / 'llm.sqlite'}"), create_table=True)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda _: cache.set("k", RECS), range(32)))
+
+        assert cache.get("k", StockRecommendations) == RECS
+
+    def test_purge_expired_and_least_recently_used(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'llm.sqlite'}")
+        expired = SqlResponseCache(engine, ttl_seconds=-1, create_table=True)
+        expired.set("old", RECS)
+        cache = SqlResponseCache(engine, max_entries=2)
+        for key in ("a", "b", "c"):
+            cache.set(key, RECS)
+            time.sleep(0.01)
+        cache.get("a", StockRecommendations)
+
+        assert cache.purge() == 2  # "old" expired, "b" least recently used
+        assert cache.get("a", StockRecommendations) is not None
+        assert cache.get("b", StockRecommendations) is None
+        assert cache.get("c", StockRecommendations) is not None
+
+
+class TestBaseAgentCache:
+    def test_second_call_is_served_from_cache(self):
+        client = _FakeOpenAI(RECS)
+        agent = NewsAgent(client, response_cache=InMemoryResponseCache())
+        post = RedditPost(reddit_id="1", title="t", selftext="s", url="u", score=1, upvote_ratio=1.0,
+                          num_comments=0, created=datetime(2025, 1, 1), flair="News")
+
+        first = agent.act([post])
+        second = agent.act([post])
+
+        assert client.calls == 1
+        assert first == second == RECS
+
+    def test_failed_cache_write_still_returns_the_response(self):
+        class BrokenCache(InMemoryResponseCache):
+            def _set(self, key, raw):
+                raise RuntimeError("database is locked")
+        agent = NewsAgent(_FakeOpenAI(RECS), response_cache=BrokenCache())
+        post = RedditPost(reddit_id="1", title="t", selftext="s", url="u", score=1, upvote_ratio=1.0,
+                          num_comments=0, created=datetime(2025, 1, 1), flair="News")
+
+        assert agent.act([post]) == RECS
+
+    def test_no_cache_by_default(self, monkeypatch):
+        monkeypatch.delenv("LLM_CACHE", raising=False)
+        assert NewsAgent(_FakeOpenAI(RECS)).response_cache is None
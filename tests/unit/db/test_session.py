@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+from sqlalchemy import exc, make_url, text
+
+from stock_ai.db import session as db_session
+from stock_ai.db.session import EngineConfig, _engine_kwargs, get_pool_metrics, get_session, init_db, reset_db
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_TARGET", "LOCAL")
+    monkeypatch.setenv("DATABASE_URL_LOCAL", f"sqlite:///{tmp_path / 'test.db'}")
+    reset_db()
+    yield
+    reset_db()
+
+
+class TestEngineConfig:
+    def test_from_env(self, monkeypatch):
+        monkeypatch.setenv("DB_POOL_SIZE", "2")
+        monkeypatch.setenv("DB_POOL_PRE_PING", "0")
+        monkeypatch.setenv("DB_STATEMENT_TIMEOUT_MS", "15000")
+        monkeypatch.setenv("DB_EXECUTEMANY_MODE", "values_plus_batch")
+        monkeypatch.setenv("DB_PGBOUNCER", "true")
+
+        config = EngineConfig.from_env()
+
+        assert config.pool_size == 2
+        assert config.max_overflow == EngineConfig().max_overflow
+        assert config.pool_pre_ping is False
+        assert config.statement_timeout_ms == 15000
+        assert config.executemany_mode == "values_plus_batch"
+        assert config.pgbouncer is True
+
+    def test_postgres_kwargs(self):
+        url = make_url("postgresql+psycopg2://u:p@localhost/db")
+        kwargs = _engine_kwargs(url, EngineConfig(pool_size=3, statement_timeout_ms=5000,
+                                                  executemany_mode="values_plus_batch"))
+
+        assert kwargs["poolclass"] is db_session._InstrumentedQueuePool
+        assert kwargs["pool_size"] == 3
+        assert kwargs["executemany_mode"] == "values_plus_batch"
+        assert kwargs["connect_args"] == {"options": "-c statement_timeout=5000"}
+
+    def test_pgbouncer_kwargs(self):
+        url = make_url("postgresql+psycopg2://u:p@localhost:6543/db")
+        kwargs = _engine_kwargs(url, EngineConfig(pgbouncer=True, statement_timeout_ms=5000))
+
+        assert kwargs["poolclass"] is db_session._InstrumentedNullPool
+        assert "pool_size" not in kwargs
+        # set per transaction instead, poolers reject startup options
+        assert "connect_args" not in kwargs
+
+
+class TestPoolMetrics:
+    def test_hits_and_misses(self, sqlite_db):
+        init_db(config=EngineConfig(pool_size=2))
+        for _ in range(3):
+            with get_session() as s:
+                s.execute(text("SELECT 1"))
+
+        metrics = get_pool_metrics()
+        assert metrics.checkouts == 3
+        assert metrics.misses == 1
+        assert metrics.hits == 2
+
+    def test_checkout_timeout(self, sqlite_db):
+        init_db(config=EngineConfig(pool_size=1, max_overflow=0, pool_timeout=1))
+        held, release = threading.Event(), threading.Event()
+
+        def hold_connection():
+            with get_session() as s:
+                s.execute(text("SELECT 1"))
+                held.set()
+                release.wait(5)
+
+        t = threading.Thread(target=hold_connection)
+        t.start()
+        held.wait(5)
+        try:
+            with pytest.raises(exc.TimeoutError):
+                with get_session() as s:
+                    s.execute(text("SELECT 1"))
+        finally:
+            release.set()
+            t.join()
+
+        metrics = get_pool_metrics()
+        assert metrics.timeouts == 1
+        assert metrics.max_wait_seconds >= 1
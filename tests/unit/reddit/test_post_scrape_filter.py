@@ -305,3 +305,62 @@ class TestAfterScrapeFilter:
         # Should not raise any errors with long titles
         result = filter_instance._select_top_and_random_q2(posts, "DD")
         assert len(result) == 1
+
+
+def _post(i: int, score: int, flair: str = "DD") -> RedditPost:
+    return RedditPost(reddit_id=f"post_{i}", flair=flair, title=f"Test Post {i}", selftext="Content",
+                      score=score, num_comments=0, upvote_ratio=0.9, created=datetime.now(),
+                      url=f"https://reddit.com/{i}")
+
+
+class TestStreamingAfterScrapeFilter:
+    """add() / finish() keep online state instead of the full post lists."""
+
+    def test_running_median_matches_batch_median(self):
+        from stock_ai.reddit.post_scrape_filter import _FlairState
+        rng = random.Random(7)
+        state = _FlairState()
+        scores = []
+        for _ in range(200):
+            score = rng.randint(0, 1000)
+            scores.append(score)
+            state.add_score(score)
+            assert state.median() == AfterScrapeFilter()._get_quantiles(scores)[1] or len(scores) < 3
+
+    def test_selects_top_and_a_post_above_the_median(self, sample_posts):
+        random.seed(3)
+        stream = AfterScrapeFilter()
+        shuffled = list(sample_posts)
+        random.shuffle(shuffled)
+        for p in shuffled:
+            stream.add(p)
+
+        selected = stream.finish()["DD"]
+
+        assert selected[0].score == 100
+        assert len(selected) == 2
+        # the median of the sample scores is 45
+        assert selected[1].score >= 45 and selected[1] is not selected[0]
+
+    def test_reservoir_stays_bounded(self):
+        random.seed(11)
+        stream = AfterScrapeFilter(reservoir_size=4)
+        for i in range(1000):
+            stream.add(_post(i, i))
+
+        assert len(stream._states["DD"].reservoir) == 4
+        selected = stream.finish()["DD"]
+        assert selected[0].score == 999
+        assert len(selected) == 2 and 500 <= selected[1].score < 999
+
+    def test_few_posts_and_several_flairs(self):
+        stream = AfterScrapeFilter()
+        for p in [_post(1, 5, "News"), _post(2, 9, "News"), _post(3, 1, "YOLO")]:
+            stream.add(p)
+
+        filtered = stream.finish()
+
+        assert [p.reddit_id for p in filtered["News"]] == ["post_2"]
+        assert [p.reddit_id for p in filtered["YOLO"]] == ["post_3"]
+        # finish resets the state for the next stream
+        assert stream.finish() == {}
@@ -0,0 +1,224 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from stock_ai.reddit.reddit_scraper import RedditScraper
+from stock_ai.reddit.types import ScrapeCursor, ScrapeSource
+
+
+class FakeReddit:
+    """subreddit().new() over the given submissions, counting the ones the scraper pulled."""
+    def __init__(self, submissions):
+        self.submissions = submissions
+        self.pulled = 0
+
+    def subreddit(self, name):
+        return self
+
+    def new(self, limit):
+        for s in self.submissions[:limit]:
+            self.pulled += 1
+            yield s
+
+
+class FakeListings:
+    """subreddit(name).<listing>() over submissions per (subreddit, listing)."""
+    def __init__(self, listings: dict[tuple[str, str], list]):
+        self.listings = listings
+        self.top_time_filters = []
+
+    def subreddit(self, name):
+        listings = self
+
+        class Subreddit:
+            def new(self, limit):
+                return iter(listings.listings[(name, "new")][:limit])
+
+            def hot(self, limit):
+                return iter(listings.listings[(name, "hot")][:limit])
+
+            def top(self, time_filter, limit):
+                listings.top_time_filters.append(time_filter)
+                return iter(listings.listings[(name, "top")][:limit])
+        return Subreddit()
+
+
+def _submission(i: int, age_hours: float, flair: str = "DD", selftext: str = "body"):
+    return SimpleNamespace(
+        id=f"p{i}", link_flair_text=flair, title=f"post {i}", selftext=selftext, score=i,
+        num_comments=0, upvote_ratio=1.0, created_utc=time.time() - age_hours * 3600,
+        permalink=f"/r/wallstreetbets/comments/p{i}/")
+
+
+def _scraper(submissions) -> RedditScraper:
+    scraper = RedditScraper.__new__(RedditScraper)
+    scraper.reddit = FakeReddit(submissions)
+    return scraper
+
+
+class TestScrapeSince:
+    def test_without_cursor_walks_back_to_the_cut_off(self):
+        # newest first, like the new listing; the newest post has a flair we don't want
+        submissions = [_submission(0, 1, flair="Meme"), _submission(1, 2), _submission(2, 24 * 8)]
+        scraper = _scraper(submissions)
+
+        posts, cursor = scraper.scrape_since("wallstreetbets", None, {"DD"}, cut_off_days=7)
+
+        assert [p.reddit_id for p in posts["DD"]] == ["p1"]
+        assert cursor == ScrapeCursor("wallstreetbets", submissions[0].created_utc, "p0")
+
+    def test_stops_at_the_cursor_post(self):
+        submissions = [_submission(i, i) for i in range(10)]
+        scraper = _scraper(submissions)
+        cursor = ScrapeCursor("wallstreetbets", submissions[3].created_utc, "p3")
+
+        posts, new_cursor = scraper.scrape_since("wallstreetbets", cursor, {"DD"})
+
+        assert [p.reddit_id for p in posts["DD"]] == ["p0", "p1", "p2"]
+        assert new_cursor.reddit_id == "p0"
+        assert scraper.reddit.pulled == 4
+
+    def test_stops_before_older_posts_if_the_cursor_post_is_gone(self):
+        submissions = [_submission(0, 1), _submission(2, 3)]
+        scraper = _scraper(submissions)
+        # p1 was deleted since the last scrape
+        cursor = ScrapeCursor("wallstreetbets", time.time() - 2 * 3600, "p1")
+
+        posts, _ = scraper.scrape_since("wallstreetbets", cursor, {"DD"})
+
+        assert [p.reddit_id for p in posts["DD"]] == ["p0"]
+
+    def test_no_new_posts_keeps_the_cursor(self):
+        submissions = [_submission(0, 1)]
+        scraper = _scraper(submissions)
+        cursor = ScrapeCursor("wallstreetbets", submissions[0].created_utc, "p0")
+
+        posts, new_cursor = scraper.scrape_since("wallstreetbets", cursor, {"DD"})
+
+        assert posts == {}
+        assert new_cursor == cursor
+
+
+class TestScrapeMany:
+    def test_merges_listings_and_drops_duplicates(self):
+        shared = _submission(1, 2)
+        listings = FakeListings({
+            ("wallstreetbets", "new"): [_submission(0, 1), shared],
+            # hot isn't sorted by age: a post older than the cut off doesn't end it
+            ("wallstreetbets", "hot"): [shared, _submission(2, 24 * 8), _submission(3, 30)],
+            ("stocks", "top"): [_submission(4, 3, flair="Company Analysis"), _submission(5, 4, flair="Meme")],
+        })
+        scraper = _scraper([])
+        threads = []
+        scraper._new_reddit = lambda: threads.append(threading.current_thread().name) or listings
+        limiter = SimpleNamespace(acquire=lambda tokens: limiter.pages.append(tokens), pages=[])
+        sources = [ScrapeSource("wallstreetbets", "new", {"DD"}), ScrapeSource("wallstreetbets", "hot", {"DD"}),
+                   ScrapeSource("stocks", "top", {"Company Analysis"})]
+
+        posts, cursors = scraper.scrape_many(sources, max_workers=2, rate_limiter=limiter)
+
+        assert [p.reddit_id for p in posts["DD"]] == ["p0", "p1", "p3"]
+        assert [p.reddit_id for p in posts["Company Analysis"]] == ["p4"]
+        assert list(cursors) == ["wallstreetbets"] and cursors["wallstreetbets"].reddit_id == "p0"
+        assert listings.top_time_filters == ["week"]
+        # one praw.Reddit per worker thread, one page request per listing
+        assert len(threads) == len(set(threads)) <= 2
+        assert len(limiter.pages) == 3
+
+    def test_new_sources_stop_at_their_cursor(self):
+        submissions = [_submission(i, i) for i in range(5)]
+        listings = FakeListings({("wallstreetbets", "new"): submissions, ("stocks", "new"): submissions[:1]})
+        scraper = _scraper([])
+        scraper._new_reddit = lambda: listings
+        cursor = ScrapeCursor("wallstreetbets", submissions[2].created_utc, "p2")
+
+        posts, cursors = scraper.scrape_many([ScrapeSource("wallstreetbets"), ScrapeSource("stocks")],
+                                             {"wallstreetbets": cursor},
+                                             rate_limiter=SimpleNamespace(acquire=lambda tokens: None))
+
+        assert [p.reddit_id for p in posts["DD"]] == ["p0", "p1"]
+        assert {name: c.reddit_id for name, c in cursors.items()} == {"wallstreetbets": "p0", "stocks": "p0"}
+
+
+class TestScrapeSource:
+    def test_parse(self):
+        assert ScrapeSource.parse("wallstreetbets:new:News|DD") == ScrapeSource("wallstreetbets", "new", {"News", "DD"})
+        assert ScrapeSource.parse(" stocks:hot") == ScrapeSource("stocks", "hot", None)
+        assert ScrapeSource.parse("options") == ScrapeSource("options", "new", None)
+
+    def test_parse_renamed_flairs(self):
+        source = ScrapeSource.parse("stocks:hot:Company Discussion=DD|News")
+
+        assert source == ScrapeSource("stocks", "hot", {"Company Discussion", "News"}, {"Company Discussion": "DD"})
+        assert source.stored_flairs() == {"DD", "News"}
+
+    def test_scraped_posts_are_stored_under_the_renamed_flair(self):
+        listings = FakeListings({("stocks", "hot"): [
+            _submission(0, 1, flair="Company Discussion"), _submission(1, 1, flair="Meme")]})
+        scraper = RedditScraper.__new__(RedditScraper)
+        scraper._new_reddit = lambda: listings
+
+        posts, _ = scraper.scrape_many([ScrapeSource.parse("stocks:hot:Company Discussion=DD")], {},
+                                       rate_limiter=SimpleNamespace(acquire=lambda tokens: None))
+
+        assert {flair: [p.reddit_id for p in plist] for flair, plist in posts.items()} == {"DD": ["p0"]}
+
+    def test_parse_rejects_unknown_listing(self):
+        with pytest.raises(ValueError, match="rising"):
+            ScrapeSource.parse("stocks:rising")
+
+
+class TestIterPosts:
+    def test_streams_posts_of_all_sources_once_and_moves_cursors(self):
+        shared = _submission(1, 2)
+        listings = FakeListings({
+            ("wallstreetbets", "new"): [_submission(0, 1), shared, _submission(2, 3)],
+            ("wallstreetbets", "hot"): [shared, _submission(3, 4)],
+            ("stocks", "new"): [_submission(4, 1)],
+        })
+        scraper = _scraper([])
+        scraper._new_reddit = lambda: listings
+        cursors = {"wallstreetbets": ScrapeCursor("wallstreetbets", time.time() - 2.5 * 3600, "p9")}
+        sources = [ScrapeSource("wallstreetbets"), ScrapeSource("wallstreetbets", "hot"), ScrapeSource("stocks")]
+
+        posts = list(scraper.iter_posts(sources, cursors, rate_limiter=SimpleNamespace(acquire=lambda tokens: None)))
+
+        assert sorted(p.reddit_id for p in posts) == ["p0", "p1", "p3", "p4"]
+        assert {name: c.reddit_id for name, c in cursors.items()} == {"wallstreetbets": "p0", "stocks": "p4"}
+
+    def test_single_source_uses_the_scraper_reddit(self):
+        scraper = _scraper([_submission(0, 1), _submission(1, 2)])
+        scraper._new_reddit = None  # would fail if the worker asked for its own instance
+
+        posts = list(scraper.iter_posts([ScrapeSource("wallstreetbets")]))
+
+        assert [p.reddit_id for p in posts] == ["p0", "p1"]
+        assert scraper.reddit.pulled == 2
+
+    def test_listing_error_is_raised_to_the_consumer(self):
+        class Broken:
+            def subreddit(self, name):
+                raise RuntimeError("503 from reddit")
+        scraper = _scraper([])
+        scraper._new_reddit = Broken
+
+        with pytest.raises(RuntimeError, match="503"):
+            list(scraper.iter_posts([ScrapeSource("a"), ScrapeSource("b")],
+                                    rate_limiter=SimpleNamespace(acquire=lambda tokens: None)))
+
+    def test_workers_wait_for_the_consumer_and_stop_with_it(self):
+        scraper = _scraper([_submission(i, 1 + i / 100) for i in range(50)])
+        stream = scraper.iter_posts([ScrapeSource("wallstreetbets")], buffer_size=2)
+
+        assert next(stream).reddit_id == "p0"
+        time.sleep(0.3)
+        # the yielded post, a full queue and the one the worker waits to put
+        assert scraper.reddit.pulled <= 4
+
+        stream.close()
+        deadline = time.time() + 2
+        while any(t.name.startswith("reddit-scrape") for t in threading.enumerate()) and time.time() < deadline:
+            time.sleep(0.05)
+        assert not any(t.name.startswith("reddit-scrape") for t in threading.enumerate())
@@ -0,0 +1,45 @@
+from unittest.mock import Mock
+
+from stock_ai.workflows.common.utils import idempotency_check, prefetch_idempotency
+from stock_ai.workflows.persistence.in_memory import InMemoryPersistence
+
+
+class TestIdempotencyCheck:
+    def test_in_memory_exists(self):
+        persistence = InMemoryPersistence()
+        persistence.set("run_metadata", [{"run_id": "run"}])
+
+        assert idempotency_check(persistence, "run", "run_metadata")
+        assert not idempotency_check(persistence, "other", "run_metadata")
+        assert not idempotency_check(persistence, "run", "reddit_posts")
+
+    def test_prefetch_answers_first_check_only(self):
+        persistence = InMemoryPersistence()
+        persistence.exists_many = Mock(return_value={"run_metadata": True, "reddit_posts": False})
+        persistence.exists = Mock(return_value=True)
+
+        prefetch_idempotency(persistence, "run", ["run_metadata", "reddit_posts"])
+        persistence.exists_many.assert_called_once_with(["run_metadata", "reddit_posts"], run_id="run")
+
+        assert idempotency_check(persistence, "run", "run_metadata")
+        assert not idempotency_check(persistence, "run", "reddit_posts")
+        persistence.exists.assert_not_called()
+
+        assert idempotency_check(persistence, "run", "reddit_posts")
+        persistence.exists.assert_called_once_with("reddit_posts", run_id="run")
+
+    def test_prefetch_is_kept_per_persistence_instance(self):
+        prefetched = InMemoryPersistence()
+        prefetched.exists_many = Mock(return_value={"run_metadata": True})
+        prefetch_idempotency(prefetched, "run", ["run_metadata"])
+
+        # a later run of the same run_id with its own persistence doesn't see the stale answer
+        assert not idempotency_check(InMemoryPersistence(), "run", "run_metadata")
+
+    def test_no_idempotency_run(self):
+        persistence = Mock()
+        prefetch_idempotency(persistence, "no-idempotency-run", ["run_metadata"])
+
+        assert not idempotency_check(persistence, "no-idempotency-run", "run_metadata")
+        persistence.exists_many.assert_not_called()
+        persistence.exists.assert_not_called()
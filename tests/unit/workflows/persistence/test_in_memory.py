@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+from stock_ai.workflows.persistence.in_memory import InMemoryPersistence
+
+
+class TestInMemoryPersistence:
+    def test_exists(self):
+        persistence = InMemoryPersistence()
+        persistence.set("posts", [{"run_id": "run", "flair": "DD"}])
+
+        assert persistence.exists("posts")
+        assert persistence.exists("posts", run_id="run", flair="DD")
+        assert not persistence.exists("posts", run_id="other")
+        assert persistence.exists_many(["posts", "missing"], run_id="run") == {"posts": True, "missing": False}
+
+    def test_update_many(self):
+        persistence = InMemoryPersistence()
+        persistence.set("positions", [{"id": 1, "price": 1.0}, {"id": 2, "price": 2.0}])
+
+        assert persistence.update_many("positions", [{"id": 2, "price": 3.0}]) == 1
+        assert persistence.get("positions") == [{"id": 1, "price": 1.0}, {"id": 2, "price": 3.0}]
+
+    def test_upsert(self):
+        persistence = InMemoryPersistence()
+        persistence.set("states", [{"ticker": "AAPL", "last_date": "2024-01-01"}])
+
+        assert persistence.upsert("states", [{"ticker": "AAPL", "last_date": "2024-01-02"},
+                                             {"ticker": "MSFT", "last_date": "2024-01-02"}], key="ticker") == 2
+        assert persistence.get("states") == [{"ticker": "AAPL", "last_date": "2024-01-02"},
+                                             {"ticker": "MSFT", "last_date": "2024-01-02"}]
+
+    def test_transaction_rolls_back_on_error(self):
+        persistence = InMemoryPersistence()
+        persistence.set("trades", [{"id": 1}])
+
+        with pytest.raises(RuntimeError):
+            with persistence.transaction() as tx:
+                tx.set("trades", [{"id": 1}, {"id": 2}])
+                tx.set("positions", [{"id": 1}])
+                tx.update_many("trades", [{"id": 1, "price": 2.0}])
+                raise RuntimeError("boom")
+
+        assert persistence.get("trades") == [{"id": 1}]
+        assert persistence.get("positions") is None
+
+    def test_transaction_is_isolated_from_other_threads(self):
+        persistence = InMemoryPersistence()
+        seen = []
+
+        with persistence.transaction() as tx:
+            tx.set("trades", [{"id": 1}])
+            reader = threading.Thread(target=lambda: seen.append(persistence.get("trades")))
+            reader.start()
+            reader.join(timeout=0.1)
+            # the reader waits for the transaction to finish
+            assert seen == []
+            tx.set("trades", [{"id": 1}, {"id": 2}])
+        reader.join(timeout=2)
+
+        assert seen == [[{"id": 1}, {"id": 2}]]
@@ -1,5 +1,6 @@
 import pytest
 from unittest.mock import Mock, patch, MagicMock
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 # Now this import won't create a database connection
@@ -96,4 +97,168 @@ class TestSqlAlchemyPersistence:
 
     def test_set_unknown_table(self, persistence):
         with pytest.raises(KeyError, match="Unknown table \'unknown\'"):
-            persistence.set("unknown", [])
\ No newline at end of file
+            persistence.set("unknown", [])
+
+@pytest.fixture
+def sqlite_persistence(tmp_path, monkeypatch):
+    from stock_ai.db.base import Base
+    from stock_ai.db.models import IndicatorState, Position, RunMetaData, StepCheckpoint
+    from stock_ai.db.session import _get_engine, reset_db
+
+    monkeypatch.setenv("DB_TARGET", "LOCAL")
+    monkeypatch.setenv("DATABASE_URL_LOCAL", f"sqlite:///{tmp_path / 'test.db'}")
+    reset_db()
+    Base.metadata.create_all(_get_engine(), tables=[RunMetaData.__table__, StepCheckpoint.__table__,
+                                                    Position.__table__, IndicatorState.__table__])
+    yield SqlAlchemyPersistence({"run_metadata": RunMetaData, "step_checkpoints": StepCheckpoint,
+                                 "positions": Position, "indicator_states": IndicatorState})
+    reset_db()
+
+
+class TestSqlAlchemyPersistenceExists:
+    def test_exists(self, sqlite_persistence):
+        sqlite_persistence.set("run_metadata", [{"run_id": "run"}])
+
+        assert sqlite_persistence.exists("run_metadata", run_id="run")
+        assert not sqlite_persistence.exists("run_metadata", run_id="other")
+        assert not sqlite_persistence.exists("step_checkpoints")
+
+    def test_exists_many(self, sqlite_persistence):
+        sqlite_persistence.set("step_checkpoints", [{"run_id": "run", "step": "News agent", "work_unit": "a"}])
+
+        assert sqlite_persistence.exists_many(["run_metadata", "step_checkpoints"], run_id="run") == {
+            "run_metadata": False,
+            "step_checkpoints": True,
+        }
+        assert sqlite_persistence.exists_many([]) == {}
+
+    def test_exists_unknown_column(self, sqlite_persistence):
+        with pytest.raises(ValueError, match="Unknown column"):
+            sqlite_persistence.exists("run_metadata", unknown_column="x")
+
+
+class TestSqlAlchemyPersistenceBulkInsert:
+    def test_executemany_fallback_fills_defaults(self, sqlite_persistence):
+        rows = [{"run_id": "run", "step": "News agent", "work_unit": str(i)} for i in range(25)]
+
+        sqlite_persistence.bulk_insert("step_checkpoints", rows, chunk_size=10)
+
+        stored = sqlite_persistence.get("step_checkpoints", run_id="run")
+        assert sorted(int(r.work_unit) for r in stored) == list(range(25))
+        assert all(r.created_at is not None for r in stored)
+
+    def test_set_uses_bulk_insert_above_threshold(self, sqlite_persistence, monkeypatch):
+        import stock_ai.workflows.persistence.sql_alchemy_persistence as module
+        monkeypatch.setattr(module, "BULK_INSERT_THRESHOLD", 3)
+        bulk_insert = Mock()
+        monkeypatch.setattr(sqlite_persistence, "bulk_insert", bulk_insert)
+
+        sqlite_persistence.set("run_metadata", [{"run_id": "a"}, {"run_id": "b"}])
+        assert bulk_insert.call_count == 0
+        sqlite_persistence.set("run_metadata", [{"run_id": "c"}] * 3)
+        bulk_insert.assert_called_once_with("run_metadata", [{"run_id": "c"}] * 3)
+
+    def test_copy_requires_postgres(self, sqlite_persistence):
+        with pytest.raises(ValueError, match="COPY is not supported"):
+            sqlite_persistence.bulk_insert("run_metadata", [{"run_id": "a"}], method="copy")
+
+    def test_copy_chunk_csv(self):
+        from stock_ai.workflows.persistence.sql_alchemy_persistence import _copy_chunk
+
+        conn = MagicMock()
+        conn.dialect.identifier_preparer.quote = lambda name: f'"{name}"'
+        cursor = conn.connection.dbapi_connection.cursor.return_value.__enter__.return_value
+        copied = {}
+        cursor.copy_expert.side_effect = lambda sql, buf: copied.update(sql=sql, data=buf.read())
+
+        _copy_chunk(conn, "reddit_posts", ["title", "selftext", "meta", "ok"], [
+            ("a, \"quoted\"", None, {"k": 1}, True),
+            ("multi\nline", "", [1, 2], False),
+        ])
+
+        assert copied["sql"] == 'COPY "reddit_posts" ("title", "selftext", "meta", "ok") FROM STDIN WITH (FORMAT csv)'
+        assert copied["data"] == (
+            '"a, ""quoted""",,"{""k"": 1}","true"\n'
+            '"multi\nline","","[1, 2]","false"\n'
+        )
+
+
+class TestSqlAlchemyPersistenceTransaction:
+    def test_commits_once(self, sqlite_persistence):
+        with sqlite_persistence.transaction() as tx:
+            tx.set("run_metadata", [{"run_id": "run"}])
+            tx.set("step_checkpoints", [{"run_id": "run", "step": "News agent", "work_unit": "a"}])
+            # reads inside the transaction see its own writes
+            assert tx.exists("run_metadata", run_id="run")
+
+        assert sqlite_persistence.exists_many(["run_metadata", "step_checkpoints"], run_id="run") == {
+            "run_metadata": True,
+            "step_checkpoints": True,
+        }
+
+    def test_rolls_back_on_error(self, sqlite_persistence):
+        with pytest.raises(RuntimeError):
+            with sqlite_persistence.transaction() as tx:
+                tx.set("run_metadata", [{"run_id": "run"}])
+                tx.write(text("UPDATE run_metadata SET description = 'x'"), {})
+                with tx.transaction():  # nested blocks join the outer transaction
+                    tx.set("step_checkpoints", [{"run_id": "run", "step": "News agent", "work_unit": "a"}])
+                raise RuntimeError("boom")
+
+        assert not sqlite_persistence.exists("run_metadata")
+        assert not sqlite_persistence.exists("step_checkpoints")
+
+
+class TestSqlAlchemyPersistenceUpdateMany:
+    def _positions(self, persistence):
+        persistence.set("positions", [
+            {"portfolio_id": 1, "ticker": t, "quantity": 10, "avg_entry_price": 10.0,
+             "current_price": 10.0, "unrealized_pnl": 0.0}
+            for t in ("AAPL", "MSFT", "NVDA")
+        ])
+        return {p.ticker: p for p in persistence.get("positions")}
+
+    def test_updates_rows_by_key(self, sqlite_persistence):
+        positions = self._positions(sqlite_persistence)
+
+        updated = sqlite_persistence.update_many("positions", [
+            {"id": positions["AAPL"].id, "current_price": 12.0, "unrealized_pnl": 20.0},
+            {"id": positions["NVDA"].id, "current_price": 9.0, "unrealized_pnl": -10.0},
+        ])
+
+        assert updated == 2
+        after = {p.ticker: p for p in sqlite_persistence.get("positions")}
+        assert (after["AAPL"].current_price, after["AAPL"].unrealized_pnl) == (12.0, 20.0)
+        assert (after["MSFT"].current_price, after["MSFT"].unrealized_pnl) == (10.0, 0.0)
+        assert (after["NVDA"].current_price, after["NVDA"].unrealized_pnl) == (9.0, -10.0)
+
+    def test_custom_key(self, sqlite_persistence):
+        self._positions(sqlite_persistence)
+
+        sqlite_persistence.update_many("positions", [{"ticker": "MSFT", "quantity": 5}], key="ticker")
+
+        assert sqlite_persistence.get("positions", ticker="MSFT")[0].quantity == 5
+
+    def test_rejects_inconsistent_rows(self, sqlite_persistence):
+        with pytest.raises(ValueError, match="key column"):
+            sqlite_persistence.update_many("positions", [{"current_price": 1.0}])
+        with pytest.raises(ValueError, match="same columns"):
+            sqlite_persistence.update_many("positions", [{"id": 1, "current_price": 1.0}, {"id": 2}])
+
+
+class TestSqlAlchemyPersistenceUpsert:
+    def test_inserts_new_keys_and_updates_existing_ones(self, sqlite_persistence):
+        sqlite_persistence.set("indicator_states", [{"ticker": "AAPL", "last_date": "2024-01-01", "state": "{}"}])
+
+        upserted = sqlite_persistence.upsert("indicator_states", [
+            {"ticker": "AAPL", "last_date": "2024-01-02", "state": "{}"},
+            {"ticker": "MSFT", "last_date": "2024-01-02", "state": "{}"},
+        ], key="ticker")
+
+        assert upserted == 2
+        rows = {r.ticker: r.last_date for r in sqlite_persistence.get("indicator_states")}
+        assert rows == {"AAPL": "2024-01-02", "MSFT": "2024-01-02"}
+
+    def test_rejects_rows_without_key(self, sqlite_persistence):
+        with pytest.raises(ValueError, match="key column"):
+            sqlite_persistence.upsert("indicator_states", [{"last_date": "2024-01-02"}], key="ticker")
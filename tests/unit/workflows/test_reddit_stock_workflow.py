@@ -0,0 +1,342 @@
+import asyncio
+from contextlib import contextmanager
+from dataclasses import asdict
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+import httpx
+import openai
+import pytest
+from sqlalchemy import text
+
+from stock_ai.workflows.reddit_stock_workflow import (
+    _make_stock_batch_step_fn, _make_stock_step_fn, _pending_posts, get_reddit_sources)
+
+
+class FakePersistence:
+    """Rows as objects, with the simple equality filters of SqlAlchemyPersistence.get"""
+    def __init__(self, tables: dict[str, list[dict]] | None = None):
+        self.tables = {k: list(v) for k, v in (tables or {}).items()}
+
+    def get(self, table, **filters):
+        rows = self.tables.get(table, [])
+        return [SimpleNamespace(**r) for r in rows if all(r.get(k) == v for k, v in filters.items())]
+
+    def set(self, table, rows):
+        self.tables.setdefault(table, []).extend(rows)
+
+    @contextmanager
+    def transaction(self):
+        yield self
+
+
+def _post(reddit_id: str, flair: str = "News") -> dict:
+    return {"run_id": "run", "reddit_id": reddit_id, "flair": flair, "url": f"https://reddit.com/{reddit_id}"}
+
+
+def _agent() -> Mock:
+    """A Reddit agent whose evaluate keeps the recommendations as they are."""
+    agent = Mock()
+    agent.evaluate.side_effect = lambda recs, actual_reddit_post_url: recs
+    return agent
+
+
+class TestRedditSources:
+    def test_flairs_renamed_to_agent_flairs_are_accepted(self, monkeypatch):
+        monkeypatch.setenv("REDDIT_SOURCES", "wallstreetbets:new:News|DD|YOLO,stocks:hot:Company Discussion=DD")
+
+        sources = get_reddit_sources()
+
+        assert [s.stored_flairs() for s in sources] == [{"News", "DD", "YOLO"}, {"DD"}]
+
+    def test_sources_with_flairs_no_agent_analyzes_are_rejected(self, monkeypatch):
+        monkeypatch.setenv("REDDIT_SOURCES", "wallstreetbets:new:News,stocks:hot:Company Discussion")
+        with pytest.raises(ValueError, match="Company Discussion"):
+            get_reddit_sources()
+
+        monkeypatch.setenv("REDDIT_SOURCES", "stocks:hot")
+        with pytest.raises(ValueError, match="needs flairs"):
+            get_reddit_sources()
+
+
+class TestPerPostCheckpoints:
+    def test_pending_posts_skips_finished_work_units(self):
+        persistence = FakePersistence({
+            "reddit_filtered_posts": [_post("a"), _post("b"), _post("c"), _post("a"), _post("d", flair="DD")],
+            "step_checkpoints": [
+                {"run_id": "run", "step": "News agent", "work_unit": "a"},
+                {"run_id": "run", "step": "DD agent", "work_unit": "b"},
+                {"run_id": "other", "step": "News agent", "work_unit": "c"},
+            ],
+        })
+
+        pending = _pending_posts(persistence, "run", "News")
+
+        assert [p.reddit_id for p in pending] == ["b", "c"]
+
+    def test_step_fn_records_checkpoint_after_writing_recommendations(self):
+        persistence = FakePersistence()
+        agent = _agent()
+        agent.act.return_value = SimpleNamespace(recommendations=[])
+        post = SimpleNamespace(**_post("a"))
+
+        _make_stock_step_fn("News", agent, [post])(persistence, "run")
+
+        assert persistence.tables["step_checkpoints"] == [{"run_id": "run", "step": "News agent", "work_unit": "a"}]
+        assert [p.reddit_id for p in _pending_posts(persistence, "run", "News")] == []
+
+    def test_failed_step_fn_is_not_checkpointed(self):
+        persistence = FakePersistence({"reddit_filtered_posts": [_post("a")]})
+        agent = _agent()
+        agent.act.side_effect = RuntimeError("openai down")
+
+        try:
+            _make_stock_step_fn("News", agent, [SimpleNamespace(**_post("a"))])(persistence, "run")
+        except RuntimeError:
+            pass
+
+        assert [p.reddit_id for p in _pending_posts(persistence, "run", "News")] == ["a"]
+
+    def test_transient_failure_skips_posts_without_failing_the_step(self):
+        persistence = FakePersistence({"reddit_filtered_posts": [_post("a")]})
+        agent = _agent()
+        agent.act.side_effect = openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com"))
+
+        _make_stock_step_fn("News", agent, [SimpleNamespace(**_post("a"))])(persistence, "run")
+
+        assert [p.reddit_id for p in _pending_posts(persistence, "run", "News")] == ["a"]
+
+    def test_picker_fails_while_skipped_posts_are_unanalyzed(self, monkeypatch):
+        from stock_ai.workflows import reddit_stock_workflow
+        monkeypatch.setattr(reddit_stock_workflow, "idempotency_check", lambda *args: False)
+        persistence = FakePersistence({"reddit_filtered_posts": [_post("a"), _post("b", flair="DD")]})
+        agent = _agent()
+        agent.act.side_effect = openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com"))
+        _make_stock_step_fn("News", agent, [SimpleNamespace(**_post("a"))])(persistence, "run")
+        persistence.set("step_checkpoints", [{"run_id": "run", "step": "DD agent", "work_unit": "b"}])
+
+        try:
+            reddit_stock_workflow.a_picker_factory(persistence, "run")
+        except RuntimeError as e:
+            assert "'News': 1" in str(e)
+        else:
+            raise AssertionError("expected the picker to refuse a partial run")
+
+    def test_async_step_fn_uses_aact(self, monkeypatch):
+        monkeypatch.setenv("WORKFLOW_ASYNC", "1")
+        persistence = FakePersistence()
+        agent = _agent()
+        agent.aact = AsyncMock(return_value=SimpleNamespace(recommendations=[]))
+
+        asyncio.run(_make_stock_step_fn("DD", agent, [SimpleNamespace(**_post("a"))])(persistence, "run"))
+
+        agent.act.assert_not_called()
+        assert persistence.tables["step_checkpoints"] == [{"run_id": "run", "step": "DD agent", "work_unit": "a"}]
+
+
+class TestMultiPostBatches:
+    def test_batched_step_fn_splits_recommendations_per_post(self):
+        from stock_ai.agents.reddit_agents.news_agent import NewsAgent
+        from stock_ai.agents.reddit_agents.pydantic_models import StockRecommendation, StockRecommendations
+
+        persistence = FakePersistence()
+        agent = NewsAgent(Mock(), rate_limiter=Mock())
+        agent.act = Mock(return_value=StockRecommendations(recommendations=[
+            StockRecommendation(ticker="AAPL", decision="BUY", reason="r", confidence="high",
+                                reddit_post_url="https://reddit.com/a"),
+            StockRecommendation(ticker="MSFT", decision="BUY", reason="r", confidence="low",
+                                reddit_post_url="https://reddit.com/b/"),
+        ]))
+        posts = [SimpleNamespace(**_post("a")), SimpleNamespace(**_post("b")), SimpleNamespace(**_post("c"))]
+
+        _make_stock_step_fn("News", agent, posts)(persistence, "run")
+
+        agent.act.assert_called_once_with(posts)
+        # the post's own url, not the one the model wrote back
+        recs = {r["ticker"]: r["reddit_post_url"] for r in persistence.tables["news_recommendations"]}
+        assert recs == {"AAPL": "https://reddit.com/a", "MSFT": "https://reddit.com/b"}
+        assert [c["work_unit"] for c in persistence.tables["step_checkpoints"]] == ["a", "b", "c"]
+
+    def test_batch_execution_needs_an_openai_client(self, monkeypatch):
+        from stock_ai.workflows.reddit_stock_workflow import _generate_stock_agent_step_functions
+        monkeypatch.setenv("LLM_BACKEND", "simulated")
+        monkeypatch.setenv("AGENT_EXECUTION", "batch")
+
+        with pytest.raises(ValueError, match="LLM_BACKEND=simulated"):
+            _generate_stock_agent_step_functions("News", [SimpleNamespace(**_post("a"))])
+
+    def test_batch_api_step_fn_saves_successes_and_raises_for_failures(self):
+        persistence = FakePersistence()
+        agent = _agent()
+        agent.act_batch.return_value = [SimpleNamespace(recommendations=[]), RuntimeError("expired")]
+        groups = [[SimpleNamespace(**_post("a"))], [SimpleNamespace(**_post("b"))]]
+
+        try:
+            _make_stock_batch_step_fn("YOLO", agent, groups)(persistence, "run")
+        except RuntimeError as e:
+            assert "1 of 2" in str(e)
+        else:
+            raise AssertionError("expected the failed request to fail the step")
+
+        assert [c["work_unit"] for c in persistence.tables["step_checkpoints"]] == ["a"]
+
+
+class TestIncrementalScrape:
+    @staticmethod
+    def _submission(i: int, age_hours: float, flair: str = "DD"):
+        import time
+        return SimpleNamespace(
+            id=f"p{i}", link_flair_text=flair, title=f"post {i}", selftext="body", score=i,
+            num_comments=0, upvote_ratio=1.0, created_utc=time.time() - age_hours * 3600,
+            permalink=f"/r/wallstreetbets/comments/p{i}/")
+
+    def test_second_run_fetches_only_new_posts_and_reuses_stored_ones(self, tmp_path, monkeypatch):
+        from stock_ai.db.base import Base
+        from stock_ai.db.models import RedditCursor, RedditFilteredPost, RedditPost, StepCheckpoint
+        from stock_ai.db.session import _get_engine, reset_db
+        from stock_ai.reddit.reddit_scraper import RedditScraper
+        from stock_ai.workflows import reddit_stock_workflow
+        from stock_ai.workflows.common.utils import mark_work_unit_done
+        from stock_ai.workflows.persistence.sql_alchemy_persistence import SqlAlchemyPersistence
+
+        monkeypatch.setenv("DB_TARGET", "LOCAL")
+        monkeypatch.setenv("DATABASE_URL_LOCAL", f"sqlite:///{tmp_path / 'test.db'}")
+        monkeypatch.setenv("REDDIT_SCRAPE_INCREMENTAL", "1")
+        reset_db()
+        Base.metadata.create_all(_get_engine(), tables=[RedditPost.__table__, RedditCursor.__table__,
+                                                        StepCheckpoint.__table__, RedditFilteredPost.__table__])
+        persistence = SqlAlchemyPersistence({"reddit_posts": RedditPost, "reddit_cursors": RedditCursor,
+                                             "step_checkpoints": StepCheckpoint,
+                                             "reddit_filtered_posts": RedditFilteredPost})
+
+        pulled = []
+        listing = [self._submission(1, 5), self._submission(0, 30, flair="Meme"), self._submission(2, 24 * 8)]
+        reddit = SimpleNamespace(subreddit=lambda name: SimpleNamespace(
+            new=lambda limit: (pulled.append(s.id) or s for s in listing[:limit])))
+        scraper = RedditScraper.__new__(RedditScraper)
+        scraper.reddit = reddit
+        monkeypatch.setattr(reddit_stock_workflow, "get_reddit_scraper", lambda: scraper)
+
+        try:
+            reddit_stock_workflow.s_scrape(persistence, "run1")
+            listing.insert(0, self._submission(3, 1))
+            pulled.clear()
+            reddit_stock_workflow.s_scrape(persistence, "run2")
+
+            assert pulled == ["p3", "p1"]
+            assert sorted(p.reddit_id for p in persistence.get("reddit_posts", run_id="run2")) == ["p1", "p3"]
+            assert persistence.get("reddit_cursors", subreddit="wallstreetbets")[0].reddit_id == "p3"
+
+            # only the latest earlier run's copy of each post, and only of that subreddit
+            stored = reddit_stock_workflow._stored_posts(persistence, "run4", "wallstreetbets", None, 7)
+            assert [p.reddit_id for p in stored] == ["p1", "p3"]
+            assert reddit_stock_workflow._stored_posts(persistence, "run4", "wall_treetbets", None, 7) == []
+
+            # a streaming run that wrote a chunk but no filtered posts is not the latest earlier run
+            persistence.set("reddit_posts", [asdict(stored[0]) | {"run_id": "run3"}])
+            mark_work_unit_done(persistence, "run3", reddit_stock_workflow.STREAM_STEP, "chunk 0")
+            stored = reddit_stock_workflow._stored_posts(persistence, "run4", "wallstreetbets", None, 7)
+            assert [p.reddit_id for p in stored] == ["p1", "p3"]
+
+            # once it finished, it is
+            persistence.set("reddit_filtered_posts", [asdict(stored[0]) | {"run_id": "run3"}])
+            stored = reddit_stock_workflow._stored_posts(persistence, "run4", "wallstreetbets", None, 7)
+            assert [p.reddit_id for p in stored] == ["p1"]
+        finally:
+            reset_db()
+
+
+class TestStreamingScrape:
+    @staticmethod
+    def _persistence(tmp_path, monkeypatch):
+        from stock_ai.db.base import Base
+        from stock_ai.db.models import RedditCursor, RedditFilteredPost, RedditPost, StepCheckpoint
+        from stock_ai.db.session import _get_engine, reset_db
+        from stock_ai.workflows.persistence.sql_alchemy_persistence import SqlAlchemyPersistence
+
+        monkeypatch.setenv("DB_TARGET", "LOCAL")
+        monkeypatch.setenv("DATABASE_URL_LOCAL", f"sqlite:///{tmp_path / 'test.db'}")
+        monkeypatch.setenv("REDDIT_STREAM_CHUNK_SIZE", "2")
+        reset_db()
+        Base.metadata.create_all(_get_engine(), tables=[RedditPost.__table__, RedditFilteredPost.__table__,
+                                                        RedditCursor.__table__, StepCheckpoint.__table__])
+        return SqlAlchemyPersistence({"reddit_posts": RedditPost, "reddit_filtered_posts": RedditFilteredPost,
+                                      "reddit_cursors": RedditCursor, "step_checkpoints": StepCheckpoint})
+
+    @staticmethod
+    def _stored_post(reddit_id: str, score: int = 0) -> dict:
+        return {"run_id": "run", "reddit_id": reddit_id, "flair": "DD", "title": "", "selftext": "",
+                "score": score, "num_comments": 0, "upvote_ratio": 1.0, "created": datetime.now(), "url": ""}
+
+    def test_streams_chunks_and_filters_without_reading_posts_back(self, tmp_path, monkeypatch):
+        from stock_ai.db.session import reset_db
+        from stock_ai.reddit.reddit_scraper import RedditScraper
+        from stock_ai.workflows import reddit_stock_workflow
+        from stock_ai.workflows.common.utils import mark_work_unit_done
+
+        persistence = self._persistence(tmp_path, monkeypatch)
+        writes = []
+        set_rows = persistence.set
+        get_rows = persistence.get
+        monkeypatch.setattr(persistence, "set", lambda table, rows: writes.append((table, len(rows))) or set_rows(table, rows))
+
+        def get(table, **filters):
+            assert table == "step_checkpoints", "no reads of the posts expected"
+            return get_rows(table, **filters)
+        monkeypatch.setattr(persistence, "get", get)
+
+        listing = [TestIncrementalScrape._submission(i, i + 1) for i in range(5)]
+        scraper = RedditScraper.__new__(RedditScraper)
+        scraper.reddit = SimpleNamespace(subreddit=lambda name: SimpleNamespace(new=lambda limit: iter(listing)))
+        monkeypatch.setattr(reddit_stock_workflow, "get_reddit_scraper", lambda: scraper)
+        # a chunk left behind by a run that stopped mid-stream
+        set_rows("reddit_posts", [self._stored_post("p0")])
+        mark_work_unit_done(persistence, "run", reddit_stock_workflow.STREAM_STEP, "chunk 0")
+        writes.clear()
+
+        try:
+            reddit_stock_workflow.s_scrape_and_filter(persistence, "run")
+
+            # every chunk is written with its checkpoint
+            assert writes == [("reddit_posts", 2), ("step_checkpoints", 1), ("reddit_posts", 2), ("step_checkpoints", 1),
+                              ("reddit_posts", 1), ("step_checkpoints", 1), ("reddit_filtered_posts", 2)]
+            rows = persistence.query(text("SELECT reddit_id FROM reddit_posts WHERE run_id = 'run'"), {})
+            assert sorted(r.reddit_id for r in rows) == ["p0", "p1", "p2", "p3", "p4"]
+            filtered = persistence.query(text("SELECT reddit_id FROM reddit_filtered_posts"), {})
+            assert filtered[0].reddit_id == "p4"  # the top score
+            checkpoints = persistence.query(text("SELECT work_unit FROM step_checkpoints ORDER BY id"), {})
+            assert [c.work_unit for c in checkpoints] == ["chunk 0", "chunk 1", "chunk 2"]
+        finally:
+            reset_db()
+
+    def test_posts_of_a_finished_scrape_step_are_kept_and_filtered(self, tmp_path, monkeypatch):
+        from stock_ai.db.session import reset_db
+        from stock_ai.workflows import reddit_stock_workflow
+
+        persistence = self._persistence(tmp_path, monkeypatch)
+        monkeypatch.setattr(reddit_stock_workflow, "get_reddit_scraper",
+                            Mock(side_effect=AssertionError("no scrape expected")))
+        # written by s_scrape before the run switched to REDDIT_SCRAPE_STREAMING=1
+        persistence.set("reddit_posts", [self._stored_post("p0", score=1), self._stored_post("p1", score=2)])
+
+        try:
+            reddit_stock_workflow.s_scrape_and_filter(persistence, "run")
+
+            rows = persistence.query(text("SELECT reddit_id FROM reddit_posts WHERE run_id = 'run'"), {})
+            assert sorted(r.reddit_id for r in rows) == ["p0", "p1"]
+            filtered = persistence.query(text("SELECT reddit_id FROM reddit_filtered_posts"), {})
+            assert filtered[0].reddit_id == "p1"
+        finally:
+            reset_db()
+
+    def test_streaming_replaces_the_scrape_and_filter_steps(self, monkeypatch):
+        from stock_ai.workflows import reddit_stock_workflow
+        monkeypatch.setenv("REDDIT_SCRAPE_STREAMING", "1")
+        monkeypatch.setattr(reddit_stock_workflow, "prefetch_idempotency", Mock())
+
+        workflow = reddit_stock_workflow.init_workflow("run", Mock())
+
+        names = [step.name for step in workflow.steps]
+        assert "scrape and filter reddit" in names
+        assert "scrape reddit" not in names and "filter posts" not in names
@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+from stock_ai.workflows.persistence.in_memory import InMemoryPersistence
+from stock_ai.workflows.tracing import RunTracer, record_external_call, with_trace_attributes
+from stock_ai.workflows.workflow_base import Step, StepFnFactories, StepFns, Workflow
+
+
+def _writer(persistence, run_id):
+    persistence.set("posts", [{"id": 1}, {"id": 2}])
+    record_external_call("openai", 0.5)
+
+
+def _reader(persistence, run_id):
+    persistence.get("posts")
+
+
+def _workflow(persistence):
+    def factory(persistence, run_id):
+        return [with_trace_attributes(_reader, name="reader", reddit_id="abc")]
+
+    return Workflow("run", [
+        Step("write", StepFns(functions=[_writer]), writes=["posts"]),
+        Step("read", StepFnFactories(factories=[factory]), reads=["posts"]),
+    ], persistence, metrics_table="run_metrics")
+
+
+class TestRunTracer:
+    def test_spans_for_steps_factories_and_step_fns(self):
+        persistence = InMemoryPersistence()
+        wf = _workflow(persistence)
+        wf.run()
+
+        kinds = sorted((s.kind, s.name) for s in wf.tracer.spans)
+        assert kinds == [("factory", "factory"), ("step", "read"), ("step", "write"),
+                         ("step_fn", "_writer"), ("step_fn", "reader")]
+        by_name = {s.name: s for s in wf.tracer.spans}
+        assert by_name["reader"].attributes == {"reddit_id": "abc"}
+        assert by_name["reader"].parent_span_id == by_name["read"].span_id
+        assert all(s.success for s in wf.tracer.spans)
+
+    def test_counters_roll_up_to_step(self):
+        wf = _workflow(InMemoryPersistence())
+        wf.run()
+
+        by_name = {s.name: s for s in wf.tracer.spans}
+        assert by_name["_writer"].rows_written == 2
+        assert by_name["write"].rows_written == 2
+        assert by_name["write"].external_calls == {"openai": 1}
+        assert by_name["read"].rows_read == 2
+
+    def test_metrics_table_written_at_end_of_run(self):
+        persistence = InMemoryPersistence()
+        wf = _workflow(persistence)
+        asyncio.run(wf.arun())
+
+        rows = persistence.get("run_metrics")
+        assert len(rows) == len(wf.tracer.spans)
+        assert {r["run_id"] for r in rows} == {"run"}
+
+    def test_failed_span(self):
+        tracer = RunTracer("run")
+        try:
+            with tracer.span("boom", "step", "boom"):
+                raise RuntimeError("boom")
+        except RuntimeError:
+            pass
+        span = tracer.spans[0]
+        assert span.success is False
+        assert span.error == "RuntimeError: boom"
+
+    def test_otlp_export(self):
+        tracer = RunTracer("run")
+        with tracer.span("step", "step", "step") as parent:
+            with tracer.span("fn", "step_fn", "step", parent=parent):
+                pass
+
+        otlp = json.loads(json.dumps(tracer.to_otlp()))
+        spans = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert [s["name"] for s in spans] == ["step", "fn"]
+        assert spans[1]["parentSpanId"] == spans[0]["spanId"]
+        assert {s["traceId"] for s in spans} == {tracer.trace_id}
+        assert json.loads(tracer.to_jsonl().splitlines()[0])["name"] == "step"
@@ -0,0 +1,62 @@
+import threading
+import time
+
+from stock_ai.workflows.worker_pool import WorkerPool
+
+
+def _tracking_task(lock: threading.Lock, counters: dict[str, int], key: str):
+    def fn():
+        with lock:
+            counters[key] += 1
+            counters[f"max_{key}"] = max(counters[f"max_{key}"], counters[key])
+        time.sleep(0.02)
+        with lock:
+            counters[key] -= 1
+        return key
+    return fn
+
+
+class TestWorkerPool:
+    def test_resource_limit_is_respected(self):
+        lock = threading.Lock()
+        counters = {"openai": 0, "max_openai": 0}
+        with WorkerPool(max_workers=8, resource_limits={"openai": 2}) as pool:
+            futures = [pool.submit(_tracking_task(lock, counters, "openai"), step="agents", resources=["openai"])
+                       for _ in range(6)]
+            assert [f.result() for f in futures] == ["openai"] * 6
+        assert counters["max_openai"] == 2
+
+    def test_step_limit_is_respected(self):
+        lock = threading.Lock()
+        counters = {"s": 0, "max_s": 0}
+        with WorkerPool(max_workers=8) as pool:
+            futures = [pool.submit(_tracking_task(lock, counters, "s"), step="s", step_limit=3) for _ in range(9)]
+            for f in futures:
+                f.result()
+        assert counters["max_s"] == 3
+
+    def test_blocked_resource_does_not_block_other_tasks(self):
+        release = threading.Event()
+        with WorkerPool(max_workers=4, resource_limits={"openai": 1}) as pool:
+            first = pool.submit(release.wait, 2, step="agents", resources=["openai"])
+            blocked = pool.submit(lambda: "openai", step="agents", resources=["openai"])
+            other = pool.submit(lambda: "db", step="db step", resources=["db"])
+
+            assert other.result(timeout=2) == "db"
+            stats = pool.stats()
+            assert stats.queued == 1
+            assert stats.queued_by_step == {"agents": 1}
+            assert stats.active_by_resource["openai"] == 1
+
+            release.set()
+            assert first.result(timeout=2) is True
+            assert blocked.result(timeout=2) == "openai"
+        assert pool.stats().completed == 3
+
+    def test_exceptions_are_set_on_future(self):
+        def boom():
+            raise RuntimeError("boom")
+
+        with WorkerPool(max_workers=1) as pool:
+            future = pool.submit(boom, step="s")
+            assert isinstance(future.exception(timeout=2), RuntimeError)
@@ -0,0 +1,166 @@
+import asyncio
+import threading
+import pytest
+
+from stock_ai.workflows.persistence.in_memory import InMemoryPersistence
+from stock_ai.workflows.workflow_base import Step, StepFnFactories, StepFns, Workflow
+
+
+def _recorder(log: list[str], name: str, wait_for: threading.Event | None = None, signal: threading.Event | None = None):
+    def fn(persistence, run_id):
+        if signal:
+            signal.set()
+        if wait_for:
+            # fails the test instead of hanging if the steps are run serially
+            assert wait_for.wait(timeout=2), f"{name} was not run concurrently"
+        log.append(name)
+    return fn
+
+
+class TestWorkflowDependencies:
+    def test_undeclared_steps_run_serially(self):
+        wf = Workflow("run", [
+            Step("a", StepFns(functions=[lambda p, r: None])),
+            Step("b", StepFns(functions=[lambda p, r: None])),
+            Step("c", StepFns(functions=[lambda p, r: None])),
+        ], InMemoryPersistence())
+
+        assert wf.dependencies == {"a": set(), "b": {"a"}, "c": {"a", "b"}}
+
+    def test_table_dependencies(self):
+        wf = Workflow("run", [
+            Step("meta", StepFns(functions=[]), writes=["run_metadata"]),
+            Step("scrape", StepFns(functions=[]), writes=["posts"]),
+            Step("filter", StepFns(functions=[]), reads=["posts"], writes=["filtered"]),
+            Step("rewrite posts", StepFns(functions=[]), writes=["posts"]),
+        ], InMemoryPersistence())
+
+        assert wf.dependencies["meta"] == set()
+        assert wf.dependencies["scrape"] == set()
+        assert wf.dependencies["filter"] == {"scrape"}
+        # write after write on posts, write after read on posts
+        assert wf.dependencies["rewrite posts"] == {"scrape", "filter"}
+
+    def test_unknown_dependency(self):
+        with pytest.raises(ValueError, match="unknown step"):
+            Workflow("run", [Step("a", StepFns(functions=[]), depends_on=["missing"])], InMemoryPersistence())
+
+    def test_dependency_cycle(self):
+        with pytest.raises(ValueError, match="cycle"):
+            Workflow("run", [
+                Step("a", StepFns(functions=[]), depends_on=["b"]),
+                Step("b", StepFns(functions=[]), depends_on=["a"]),
+            ], InMemoryPersistence())
+
+
+class TestWorkflowRun:
+    def test_independent_steps_overlap(self):
+        log: list[str] = []
+        a_started, b_started = threading.Event(), threading.Event()
+        wf = Workflow("run", [
+            Step("a", StepFns(functions=[_recorder(log, "a", wait_for=b_started, signal=a_started)]), writes=["x"]),
+            Step("b", StepFns(functions=[_recorder(log, "b", wait_for=a_started, signal=b_started)]), writes=["y"]),
+            Step("c", StepFns(functions=[_recorder(log, "c")]), reads=["x", "y"]),
+        ], InMemoryPersistence())
+
+        wf.run()
+
+        assert sorted(log[:2]) == ["a", "b"]
+        assert log[2] == "c"
+
+    def test_failure_stops_downstream_steps(self):
+        log: list[str] = []
+
+        def boom(persistence, run_id):
+            raise RuntimeError("boom")
+
+        wf = Workflow("run", [
+            Step("a", StepFns(functions=[boom]), writes=["x"]),
+            Step("b", StepFns(functions=[_recorder(log, "b")]), reads=["x"]),
+        ], InMemoryPersistence())
+
+        with pytest.raises(RuntimeError, match="boom"):
+            wf.run()
+        assert log == []
+
+    def test_factories_share_bounded_pool(self):
+        log: list[str] = []
+
+        def factory(persistence, run_id):
+            return [_recorder(log, f"fn{i}") for i in range(5)]
+
+        wf = Workflow("run", [
+            Step("agents", StepFnFactories(factories=[factory, factory]), resources=["openai"]),
+            Step("after", StepFns(functions=[_recorder(log, "after")])),
+        ], InMemoryPersistence(), max_workers=2, resource_limits={"openai": 1})
+
+        wf.run()
+
+        assert len(log) == 11
+        assert log[-1] == "after"
+        assert wf.pool_stats() is None
+
+
+class TestWorkflowArun:
+    def test_mixes_async_and_sync_step_fns(self):
+        log: list[str] = []
+
+        async def async_fn(persistence, run_id):
+            await asyncio.sleep(0)
+            log.append(f"async {run_id}")
+
+        async def async_factory(persistence, run_id):
+            return [async_fn, _recorder(log, "sync")]
+
+        wf = Workflow("run", [
+            Step("a", StepFnFactories(factories=[async_factory]), writes=["x"], resources=["openai"]),
+            Step("b", StepFns(functions=[_recorder(log, "b")]), reads=["x"]),
+        ], InMemoryPersistence())
+
+        asyncio.run(wf.arun())
+
+        assert sorted(log[:2]) == ["async run", "sync"]
+        assert log[2] == "b"
+
+    def test_async_step_fns_bounded_by_resource_limit(self):
+        active = 0
+        max_active = 0
+
+        async def fn(persistence, run_id):
+            nonlocal active, max_active
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+        wf = Workflow("run", [
+            Step("agents", StepFns(functions=[fn] * 10), resources=["openai"]),
+        ], InMemoryPersistence(), resource_limits={"openai": 3})
+
+        asyncio.run(wf.arun())
+
+        assert max_active == 3
+
+    def test_failure_is_raised_unwrapped(self):
+        async def boom(persistence, run_id):
+            raise RuntimeError("boom")
+
+        log: list[str] = []
+        wf = Workflow("run", [
+            Step("a", StepFns(functions=[boom]), writes=["x"]),
+            Step("b", StepFns(functions=[_recorder(log, "b")]), reads=["x"]),
+        ], InMemoryPersistence())
+
+        with pytest.raises(RuntimeError, match="boom"):
+            asyncio.run(wf.arun())
+        assert log == []
+
+    def test_async_step_fn_in_threaded_run(self):
+        log: list[str] = []
+
+        async def async_fn(persistence, run_id):
+            log.append("async")
+
+        Workflow("run", [Step("a", StepFns(functions=[async_fn]))], InMemoryPersistence()).run()
+
+        assert log == ["async"]
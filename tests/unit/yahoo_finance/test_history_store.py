@@ -0,0 +1,87 @@
+import os
+from datetime import date, datetime, timezone
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from stock_ai.yahoo_finance.history_store import OhlcvHistoryStore
+from stock_ai.yahoo_finance.yahoo_finance_client import YahooFinanceClient
+
+
+def _bars(start: str, closes: list[float]) -> pd.DataFrame:
+    """Shape of yf.Ticker.history: tz-aware exchange-time index."""
+    index = pd.date_range(start, periods=len(closes), freq="B", tz="America/New_York", name="Date")
+    closes = np.asarray(closes, dtype="float64")
+    return pd.DataFrame({
+        "Open": closes, "High": closes + 1, "Low": closes - 1, "Close": closes,
+        "Adj Close": closes, "Volume": closes * 100, "Dividends": 0.0, "Stock Splits": 0.0,
+    }, index=index)
+
+
+class TestOhlcvHistoryStore:
+    def test_append_and_load(self, tmp_path):
+        store = OhlcvHistoryStore(str(tmp_path))
+        assert store.load("AAPL").empty
+        assert store.last_date("AAPL") is None
+
+        store.append("AAPL", _bars("2025-01-06", [1.0, 2.0, 3.0]))
+        # the last bar is replaced (it may have been intraday) and new ones appended
+        store.append("AAPL", _bars("2025-01-08", [3.5, 4.0]))
+
+        hist = store.load("AAPL")
+        assert list(hist["Close"]) == [1.0, 2.0, 3.5, 4.0]
+        assert list(hist["High"]) == [2.0, 3.0, 4.5, 5.0]
+        assert store.last_date("AAPL") == date(2025, 1, 9)
+        assert list(hist.index.strftime("%Y-%m-%d")) == ["2025-01-06", "2025-01-07", "2025-01-08", "2025-01-09"]
+
+    def test_interrupted_append_is_trimmed(self, tmp_path):
+        store = OhlcvHistoryStore(str(tmp_path))
+        store.append("^GSPC", _bars("2025-01-06", [1.0, 2.0]))
+        with open(os.path.join(tmp_path, "^GSPC", "close.f8"), "ab") as f:
+            f.write(np.array([9.0]).tobytes())
+
+        assert list(store.load("^GSPC")["Close"]) == [1.0, 2.0]
+
+
+class TestGetHistory:
+    def test_only_new_bars_are_downloaded(self, tmp_path):
+        client = YahooFinanceClient(history_store=OhlcvHistoryStore(str(tmp_path)))
+        start = datetime(2025, 1, 6, tzinfo=timezone.utc)
+
+        with patch.object(client, "_download_history", return_value=_bars("2025-01-06", [1.0, 2.0, 3.0])) as download:
+            client.get_history("AAPL", start, datetime(2025, 1, 9, tzinfo=timezone.utc))
+        assert download.call_args.args[1] == start
+
+        with patch.object(client, "_download_history", return_value=_bars("2025-01-08", [3.0, 4.0])) as download:
+            hist = client.get_history("AAPL", start, datetime(2025, 1, 10, tzinfo=timezone.utc))
+        # from the last cached date on
+        assert download.call_args.args[1] == datetime(2025, 1, 8, tzinfo=timezone.utc)
+        assert list(hist["Close"]) == [1.0, 2.0, 3.0, 4.0]
+
+    def test_stock_split_refreshes_history(self, tmp_path):
+        client = YahooFinanceClient(history_store=OhlcvHistoryStore(str(tmp_path)))
+        start = datetime(2025, 1, 6, tzinfo=timezone.utc)
+        with patch.object(client, "_download_history", return_value=_bars("2025-01-06", [10.0, 20.0])):
+            client.get_history("NVDA", start, datetime(2025, 1, 8, tzinfo=timezone.utc))
+
+        split = _bars("2025-01-07", [2.0, 2.5])
+        split.loc[split.index[1], "Stock Splits"] = 10.0
+        adjusted = _bars("2025-01-06", [1.0, 2.0, 2.5])
+        with patch.object(client, "_download_history", side_effect=[split, adjusted]):
+            hist = client.get_history("NVDA", start, datetime(2025, 1, 9, tzinfo=timezone.utc))
+
+        assert list(hist["Close"]) == [1.0, 2.0, 2.5]
+
+    def test_empty_refresh_keeps_the_cached_history(self, tmp_path):
+        client = YahooFinanceClient(history_store=OhlcvHistoryStore(str(tmp_path)))
+        start = datetime(2025, 1, 6, tzinfo=timezone.utc)
+        with patch.object(client, "_download_history", return_value=_bars("2025-01-06", [10.0, 20.0])):
+            client.get_history("NVDA", start, datetime(2025, 1, 8, tzinfo=timezone.utc))
+
+        split = _bars("2025-01-07", [2.0, 2.5])
+        split.loc[split.index[1], "Stock Splits"] = 10.0
+        with patch.object(client, "_download_history", side_effect=[split, _bars("2025-01-06", [])]):
+            hist = client.get_history("NVDA", start, datetime(2025, 1, 9, tzinfo=timezone.utc))
+
+        assert list(hist["Close"]) == [10.0, 20.0]
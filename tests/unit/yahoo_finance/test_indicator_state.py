@@ -0,0 +1,77 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from stock_ai.yahoo_finance.indicator_state import IndicatorState
+from stock_ai.yahoo_finance.indicators import compute_snapshots
+
+FIELDS = ["price", "sma20", "sma50", "sma200", "atr14", "high_52w", "low_52w", "rsi14"]
+
+
+def _history(n_days: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2023-01-02", periods=n_days, name="Date")
+    close = 100 + np.cumsum(rng.normal(0, 2, size=n_days))
+    return pd.DataFrame({
+        "High": close + rng.uniform(0, 3, size=n_days),
+        "Low": close - rng.uniform(0, 3, size=n_days),
+        "Close": close,
+    }, index=index)
+
+
+def _full(hist: pd.DataFrame):
+    return compute_snapshots(hist[["Close"]].set_axis(["T"], axis=1), hist[["High"]].set_axis(["T"], axis=1),
+                             hist[["Low"]].set_axis(["T"], axis=1))[0]
+
+
+def _assert_same(a, b):
+    for field in FIELDS:
+        x, y = getattr(a, field), getattr(b, field)
+        assert (math.isnan(x) and math.isnan(y)) or abs(x - y) <= 0.011, (field, x, y)
+
+
+class TestIndicatorState:
+    def test_matches_full_recomputation_bar_by_bar(self):
+        hist = _history(400)
+        state = IndicatorState(ticker="T")
+        for n in range(1, len(hist) + 1):
+            state.push_history(hist.iloc[n - 1:n])
+            if n in (1, 15, 20, 199, 200, 252, 253, 300, 400):
+                _assert_same(state.snapshot(), _full(hist.iloc[:n]))
+
+    def test_same_date_replaces_partial_bar(self):
+        hist = _history(260, seed=1)
+        state = IndicatorState(ticker="T")
+        state.push_history(hist.iloc[:-1])
+        last = hist.index[-1].date()
+        state.push(last, 1000.0, 1.0, 500.0)  # intraday bar, superseded at the close
+        state.push_history(hist.iloc[-1:])
+
+        assert state.bar_count == 260
+        _assert_same(state.snapshot(), _full(hist))
+
+    def test_older_bars_are_ignored(self):
+        hist = _history(30, seed=2)
+        state = IndicatorState(ticker="T")
+        state.push_history(hist)
+        state.push_history(hist.iloc[:10])
+
+        assert state.bar_count == 30
+        _assert_same(state.snapshot(), _full(hist))
+
+    def test_json_round_trip_continues_incrementally(self):
+        hist = _history(300, seed=3)
+        state = IndicatorState(ticker="T")
+        state.push_history(hist.iloc[:280])
+
+        restored = IndicatorState.from_json("T", state.to_json())
+        # the bar of the last run is re-downloaded along with the new ones
+        restored.push_history(hist.iloc[279:])
+
+        _assert_same(restored.snapshot(), _full(hist))
+
+    def test_empty_state(self):
+        snapshot = IndicatorState(ticker="T").snapshot()
+        assert snapshot.error == "No historical data found"
+        assert math.isnan(snapshot.price)
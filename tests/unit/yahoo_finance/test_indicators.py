@@ -0,0 +1,63 @@
+import math
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from stock_ai.yahoo_finance.indicators import compute_snapshots
+from stock_ai.yahoo_finance.yahoo_finance_client import YahooFinanceClient
+
+FIELDS = ["price", "sma20", "sma50", "sma200", "atr14", "high_52w", "low_52w", "rsi14"]
+
+
+def _panel(n_days: int, tickers: list[str], seed: int = 0) -> dict[str, pd.DataFrame]:
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2024-01-01", periods=n_days, name="Date")
+    close = 100 + np.cumsum(rng.normal(0, 2, size=(n_days, len(tickers))), axis=0)
+    high = close + rng.uniform(0, 3, size=close.shape)
+    low = close - rng.uniform(0, 3, size=close.shape)
+    return {name: pd.DataFrame(values, index=index, columns=tickers)
+            for name, values in (("Close", close), ("High", high), ("Low", low))}
+
+
+def _per_ticker(panel: dict[str, pd.DataFrame], ticker: str):
+    """The current path: get_yf_snapshot on the ticker's own history."""
+    hist = pd.DataFrame({col: panel[col][ticker] for col in ("Close", "High", "Low")})
+    hist = hist[hist["Close"].notna()]
+    client = YahooFinanceClient()
+    with patch.object(client, "get_history", return_value=hist):
+        return client.get_yf_snapshot(ticker)
+
+
+def _assert_same(a, b):
+    for field in FIELDS:
+        x, y = getattr(a, field), getattr(b, field)
+        assert (math.isnan(x) and math.isnan(y)) or abs(x - y) <= 0.011, (a.ticker, field, x, y)
+
+
+class TestComputeSnapshots:
+    def test_matches_per_ticker_path(self):
+        panel = _panel(300, ["AAPL", "MSFT", "NVDA"])
+        snapshots = compute_snapshots(panel["Close"], panel["High"], panel["Low"])
+
+        assert [s.ticker for s in snapshots] == ["AAPL", "MSFT", "NVDA"]
+        for s in snapshots:
+            assert s.error is None
+            _assert_same(s, _per_ticker(panel, s.ticker))
+
+    def test_gaps_and_short_histories(self):
+        panel = _panel(260, ["OLD", "IPO", "GAPS", "NONE", "FLAT"])
+        for frame in panel.values():
+            frame.iloc[:230, 1] = np.nan  # listed 30 bars ago, no SMA50/200
+            frame.iloc[::7, 2] = np.nan  # holidays on its exchange
+            frame.iloc[:, 3] = np.nan
+        # no down moves, RSI is undefined
+        panel["Close"]["FLAT"] = np.arange(260, dtype="float64")
+
+        snapshots = compute_snapshots(panel["Close"], panel["High"], panel["Low"])
+
+        assert snapshots[3].error == "No historical data found"
+        assert math.isnan(snapshots[1].sma50) and not math.isnan(snapshots[1].sma20)
+        assert math.isnan(snapshots[4].rsi14)
+        for s in snapshots[:3] + snapshots[4:]:
+            _assert_same(s, _per_ticker(panel, s.ticker))
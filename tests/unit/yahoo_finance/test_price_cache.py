@@ -0,0 +1,127 @@
+import math
+import threading
+from datetime import datetime
+
+from stock_ai.yahoo_finance.price_cache import MARKET_TZ, PriceCache, is_market_open, next_market_open
+
+
+def _ts(s: str) -> float:
+    """New York wall time -> unix timestamp."""
+    return datetime.fromisoformat(s).replace(tzinfo=MARKET_TZ).timestamp()
+
+
+class _Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _Fetcher:
+    def __init__(self, prices: dict[str, float]):
+        self.prices = prices
+        self.calls: list[list[str]] = []
+
+    def __call__(self, tickers: list[str]) -> dict[str, float]:
+        self.calls.append(tickers)
+        return {t: self.prices[t] for t in tickers if t in self.prices}
+
+
+class TestMarketHours:
+    def test_open_and_closed(self):
+        assert is_market_open(_ts("2025-01-08T10:00"))  # Wednesday
+        assert not is_market_open(_ts("2025-01-08T09:00"))
+        assert not is_market_open(_ts("2025-01-08T17:00"))
+        assert not is_market_open(_ts("2025-01-11T12:00"))  # Saturday
+
+    def test_next_open_skips_weekend(self):
+        assert next_market_open(_ts("2025-01-08T08:00")) == _ts("2025-01-08T09:30")
+        assert next_market_open(_ts("2025-01-10T17:00")) == _ts("2025-01-13T09:30")
+
+
+class TestPriceCache:
+    def test_ttl_during_market_hours(self):
+        clock = _Clock(_ts("2025-01-08T10:00"))
+        cache = PriceCache(ttl_seconds=60, clock=clock)
+        fetch = _Fetcher({"AAPL": 1.0})
+
+        cache.get_many(["AAPL"], fetch)
+        clock.now += 30
+        cache.get_many(["AAPL"], fetch)
+        assert len(fetch.calls) == 1
+
+        clock.now += 31
+        cache.get_many(["AAPL"], fetch)
+        assert len(fetch.calls) == 2
+
+    def test_after_close_valid_until_next_open(self):
+        clock = _Clock(_ts("2025-01-10T18:00"))  # Friday evening
+        cache = PriceCache(ttl_seconds=60, clock=clock)
+        fetch = _Fetcher({"AAPL": 1.0})
+
+        cache.get_many(["AAPL"], fetch)
+        clock.now = _ts("2025-01-13T09:00")
+        cache.get_many(["AAPL"], fetch)
+        assert len(fetch.calls) == 1
+
+        clock.now = _ts("2025-01-13T09:31")
+        cache.get_many(["AAPL"], fetch)
+        assert len(fetch.calls) == 2
+
+    def test_only_missing_tickers_are_fetched_and_nan_is_not_cached(self):
+        cache = PriceCache(clock=_Clock(_ts("2025-01-08T10:00")))
+        fetch = _Fetcher({"AAPL": 1.0, "MSFT": 2.0})
+
+        cache.get_many(["AAPL"], fetch)
+        prices = cache.get_many(["AAPL", "MSFT", "XYZ"], fetch)
+        cache.get_many(["XYZ"], fetch)
+
+        assert fetch.calls == [["AAPL"], ["MSFT", "XYZ"], ["XYZ"]]
+        assert prices["AAPL"] == 1.0 and prices["MSFT"] == 2.0
+        assert math.isnan(prices["XYZ"])
+
+    def test_single_flight(self):
+        cache = PriceCache()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def slow_fetch(tickers):
+            calls.append(tickers)
+            started.set()
+            assert release.wait(timeout=2)
+            return {t: 5.0 for t in tickers}
+
+        results = []
+        first = threading.Thread(target=lambda: results.append(cache.get_many(["AAPL"], slow_fetch)))
+        first.start()
+        assert started.wait(timeout=2)
+        second = threading.Thread(target=lambda: results.append(cache.get_many(["AAPL"], slow_fetch)))
+        second.start()
+        release.set()
+        first.join()
+        second.join()
+
+        assert calls == [["AAPL"]]
+        assert results == [{"AAPL": 5.0}, {"AAPL": 5.0}]
+
+    def test_failed_fetch_releases_waiters(self):
+        cache = PriceCache()
+
+        def boom(tickers):
+            raise RuntimeError("rate limited")
+
+        try:
+            cache.get_many(["AAPL"], boom)
+        except RuntimeError:
+            pass
+        assert cache.get_many(["AAPL"], _Fetcher({"AAPL": 3.0})) == {"AAPL": 3.0}
+
+    def test_shared_through_file(self, tmp_path):
+        path = str(tmp_path / "prices.json")
+        clock = _Clock(_ts("2025-01-08T10:00"))
+        PriceCache(path=path, clock=clock).get_many(["AAPL"], _Fetcher({"AAPL": 1.0}))
+
+        fetch = _Fetcher({"AAPL": 9.0})
+        assert PriceCache(path=path, clock=clock).get_many(["AAPL"], fetch) == {"AAPL": 1.0}
+        assert fetch.calls == []
@@ -0,0 +1,147 @@
+import math
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_ai.yahoo_finance.price_cache import PriceCache
+from stock_ai.yahoo_finance.yahoo_finance_client import YahooFinanceClient
+from stock_ai.workflows.tracing import Span, _current_span, record_external_call
+
+
+@pytest.fixture(autouse=True)
+def _no_price_cache(monkeypatch):
+    monkeypatch.setenv("PRICE_CACHE", "0")
+
+
+def _download_frame(closes: dict[str, list[float]]) -> pd.DataFrame:
+    """Shape of yf.download for several tickers: (Price, Ticker) column levels."""
+    index = pd.date_range("2025-01-06", periods=3, freq="D", name="Date")
+    columns = pd.MultiIndex.from_product([["Close", "Open"], list(closes)], names=["Price", "Ticker"])
+    data = np.column_stack([closes[t] for t in closes] * 2)
+    return pd.DataFrame(data, index=index, columns=columns)
+
+
+class TestGetCurrentPricesBatch:
+    @patch("stock_ai.yahoo_finance.yahoo_finance_client.yf.download")
+    def test_one_download_for_all_tickers(self, mock_download):
+        mock_download.return_value = _download_frame({
+            "AAPL": [1.0, 2.0, 3.456],
+            # no bar for today yet, the last close is used
+            "MSFT": [4.0, 5.0, float("nan")],
+        })
+        client = YahooFinanceClient()
+
+        with patch.object(client, "get_current_price") as fallback:
+            prices = client.get_current_prices_batch(["AAPL", "MSFT", "AAPL"])
+
+        mock_download.assert_called_once()
+        assert mock_download.call_args.args[0] == ["AAPL", "MSFT"]
+        fallback.assert_not_called()
+        assert prices.to_dict() == {"AAPL": 3.46, "MSFT": 5.0}
+
+    @patch("stock_ai.yahoo_finance.yahoo_finance_client.yf.download")
+    def test_missing_tickers_fall_back_to_single_lookups(self, mock_download):
+        mock_download.return_value = _download_frame({"AAPL": [1.0, 2.0, 3.0], "XYZ": [np.nan] * 3})
+        client = YahooFinanceClient()
+
+        with patch.object(client, "get_current_price", side_effect=lambda t: {"XYZ": 7.0, "BAD": float("nan")}[t]):
+            prices = client.get_current_prices_batch(["AAPL", "XYZ", "BAD"])
+
+        assert prices["AAPL"] == 3.0
+        assert prices["XYZ"] == 7.0
+        assert math.isnan(prices["BAD"])
+
+    @patch("stock_ai.yahoo_finance.yahoo_finance_client.yf.download", side_effect=RuntimeError("rate limited"))
+    def test_download_error_falls_back(self, mock_download):
+        client = YahooFinanceClient()
+
+        with patch.object(client, "get_current_price", return_value=1.5):
+            prices = client.get_current_prices_batch(["AAPL"])
+
+        assert prices.to_dict() == {"AAPL": 1.5}
+
+    @patch("stock_ai.yahoo_finance.yahoo_finance_client.yf.download", side_effect=RuntimeError("rate limited"))
+    def test_fallback_lookups_record_calls_in_the_callers_span(self, mock_download):
+        client = YahooFinanceClient(price_cache=PriceCache(ttl_seconds=60))
+        span = Span(run_id="run", name="prices", kind="step_fn", step="prices", span_id="1")
+        token = _current_span.set(span)
+
+        def lookup(ticker):
+            record_external_call("yahoo")
+            return 1.0
+
+        try:
+            with patch.object(client, "get_current_price", side_effect=lookup):
+                client.get_current_prices_batch(["AAPL", "MSFT"])
+        finally:
+            _current_span.reset(token)
+
+        assert span.external_calls["yahoo"] == 2
+
+    def test_empty(self):
+        assert YahooFinanceClient().get_current_prices_batch([]).empty
+
+    @patch("stock_ai.yahoo_finance.yahoo_finance_client.yf.download")
+    def test_cached_prices_are_not_fetched_again(self, mock_download):
+        mock_download.return_value = _download_frame({"AAPL": [1.0, 2.0, 3.0], "MSFT": [4.0, 5.0, 6.0]})
+        client = YahooFinanceClient(price_cache=PriceCache(ttl_seconds=60))
+
+        client.get_current_prices_batch(["AAPL"])
+        prices = client.get_current_prices_batch(["MSFT", "AAPL"])
+
+        assert mock_download.call_count == 2
+        assert mock_download.call_args.args[0] == ["MSFT"]
+        assert prices.to_dict() == {"MSFT": 6.0, "AAPL": 3.0}
+
+
+def _bars(dates: list[str], closes: list[float], splits: float = 0.0) -> pd.DataFrame:
+    closes = np.array(closes)
+    return pd.DataFrame({"High": closes + 1, "Low": closes - 1, "Close": closes, "Stock Splits": splits},
+                        index=pd.DatetimeIndex(dates, name="Date"))
+
+
+class TestGetIncrementalSnapshot:
+    def test_without_state_builds_from_history(self):
+        client = YahooFinanceClient(history_store=None)
+        hist = _bars(["2025-01-06", "2025-01-07"], [10.0, 11.0])
+
+        with patch.object(client, "get_history", return_value=hist) as get_history, \
+                patch.object(client, "_download_history") as download:
+            snapshot, state = client.get_incremental_snapshot("^GSPC")
+
+        get_history.assert_called_once()
+        download.assert_not_called()
+        assert snapshot.price == 11.0
+        assert state.last_date == "2025-01-07"
+
+    def test_with_state_downloads_only_new_bars(self):
+        client = YahooFinanceClient(history_store=None)
+        with patch.object(client, "get_history", return_value=_bars(["2025-01-06", "2025-01-07"], [10.0, 11.0])):
+            _, state = client.get_incremental_snapshot("^GSPC")
+
+        new_bars = _bars(["2025-01-07", "2025-01-08"], [11.5, 12.0])
+        with patch.object(client, "get_history") as get_history, \
+                patch.object(client, "_download_history", return_value=new_bars) as download:
+            snapshot, state = client.get_incremental_snapshot("^GSPC", state)
+
+        get_history.assert_not_called()
+        assert download.call_args.args[1].date().isoformat() == "2025-01-07"
+        assert state.bar_count == 3
+        assert snapshot.price == 12.0
+        assert snapshot.low_52w == 9.0
+
+    def test_split_rebuilds_state(self):
+        client = YahooFinanceClient(history_store=None)
+        with patch.object(client, "get_history", return_value=_bars(["2025-01-06"], [10.0])):
+            _, state = client.get_incremental_snapshot("X")
+
+        split_bars = _bars(["2025-01-06", "2025-01-07"], [10.0, 5.0], splits=2.0)
+        rebuilt = _bars(["2025-01-06", "2025-01-07"], [5.0, 5.0])
+        with patch.object(client, "_download_history", return_value=split_bars), \
+                patch.object(client, "get_history", return_value=rebuilt):
+            snapshot, state = client.get_incremental_snapshot("X", state)
+
+        assert state.bar_count == 2
+        assert snapshot.high_52w == 6.0